@@ -11,9 +11,13 @@ init_db(app)
 # 2. NOW import and register blueprints
 from routes.attendance_routes import attendance_bp
 from routes.office_routes import office_bp
+from routes.roster_routes import roster_bp
+from routes.analytics_routes import analytics_bp
 
 app.register_blueprint(attendance_bp, url_prefix="/api/attendance")
 app.register_blueprint(office_bp, url_prefix="/api/office")
+app.register_blueprint(roster_bp, url_prefix="/api/roster")
+app.register_blueprint(analytics_bp, url_prefix="/api/analytics")
 
 @app.route("/")
 def home():
@@ -0,0 +1,144 @@
+"""
+Throughput and latency of the Flask blueprints on the in-memory MongoDB
+(no Atlas, no network). Seeds office config and attendance history, then
+drives the routes through Flask's test client and reports per endpoint:
+requests/s and p50 / p95 / p99 latency.
+
+    python benchmark_api.py --employees 500 --days 30 --requests 300
+    python benchmark_api.py --json          # for CI
+
+Run from backend/. The figures cover the Python side of each request
+(routing, services, serialization); the fake has no network or disk cost.
+"""
+import os
+
+os.environ["DB_BACKEND"] = "memory"  # Before db.py is imported
+
+import io
+import sys
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import seed_office
+from app import app
+from db import db
+from services import hours_cube
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else 0.0
+
+
+def run(name, requests, expected=(200,)):
+    """
+    Send (method, url, kwargs) requests one after another.
+    Returns: (name, figures)
+    """
+    client = app.test_client()
+    latencies = []
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for method, url, kwargs in requests:
+            t0 = time.perf_counter()
+            response = client.open(url, method=method, **kwargs)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if response.status_code not in expected:
+                raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    seconds = time.perf_counter() - start
+    return name, {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3)
+    }
+
+
+def seed(employees, days, branches, seed_value):
+    """Offices, `days` of completed attendance ending yesterday, and the hours cube"""
+    seed_office.seed_offices(db, branches)
+    records = seed_office.seed_attendance(db, employees, days, seed_office.branch_configs(branches), seed=seed_value)
+    today = datetime.utcnow().date()
+    for year in sorted({today.year, (today - timedelta(days=days)).year}):
+        hours_cube.rebuild(db, year)
+    return records
+
+
+def scenarios(employees, count, days):
+    office = seed_office.office_data
+    location = dict(office["location"])
+    bssid = office["wifi"]["allowed_bssids"][-1]
+    ids = [f"EMP{1 + i % employees:03d}" for i in range(count)]
+    active = ids[:min(count, employees)]
+    month = (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m")
+    start = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    yield run("punch-in", [
+        ("POST", "/api/attendance/punch-in",
+         {"json": {"employeeId": e, "location": location, "wifiBSSID": bssid}}) for e in active
+    ])
+    yield run("punch-out", [
+        ("POST", "/api/attendance/punch-out", {"json": {"employeeId": e}}) for e in active
+    ])
+
+    now = datetime.utcnow()
+    events = [
+        {"clientEventId": f"bench-{e}-{n}", "type": kind, "employeeId": e,
+         "timestamp": (now + timedelta(seconds=n)).isoformat() + "Z", "location": location, "wifiBSSID": bssid}
+        for e in active[:50] for n, kind in enumerate(("PUNCH_IN", "PUNCH_OUT"))
+    ]
+    batches = [events[i:i + 20] for i in range(0, len(events), 20)]
+    yield run("sync (20 events)", [("POST", "/api/attendance/sync", {"json": {"events": b}}) for b in batches])
+
+    summary = [("GET", f"/api/attendance/summary?employeeId={e}", {}) for e in ids]
+    yield run("summary", summary)
+    etags = {}
+    client = app.test_client()
+    for e in active:
+        etags[e] = client.get(f"/api/attendance/summary?employeeId={e}").headers["ETag"]
+    yield run("summary (304)", [
+        ("GET", f"/api/attendance/summary?employeeId={e}", {"headers": {"If-None-Match": etags[e]}}) for e in ids
+    ], expected=(304,))
+
+    yield run("export/monthly", [
+        ("GET", f"/api/attendance/export/monthly?employeeId={e}&month={month}", {}) for e in ids
+    ], expected=(200, 404))
+    yield run("today", [("GET", "/api/attendance/today", {})] * max(1, count // 10))
+    yield run("analytics/hours", [
+        ("GET", f"/api/analytics/hours?start={start}&employeeIds={e}", {}) for e in ids
+    ])
+    yield run("roster/day", [("GET", "/api/roster/day", {})] * max(1, count // 10))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Flask API on an in-memory MongoDB")
+    parser.add_argument("--employees", type=int, default=300, help="Employees with attendance history")
+    parser.add_argument("--days", type=int, default=30, help="Days of seeded attendance")
+    parser.add_argument("--branches", type=int, default=1, help="Office configs to seed")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the seeded data")
+    parser.add_argument("--json", action="store_true", help="Print the figures as JSON")
+    args = parser.parse_args()
+
+    print(f"🌱 Seeding {args.employees} employees x {args.days} days...", file=sys.stderr)
+    with redirect_stdout(io.StringIO()):
+        records = seed(args.employees, args.days, args.branches, args.seed)
+    print(f"✅ {records} attendance records in memory", file=sys.stderr)
+
+    report = {}
+    for name, figures in scenarios(args.employees, args.requests, args.days):
+        report[name] = figures
+        if not args.json:
+            print(f"⏱️ {name:<18} {figures['requests_per_second']:9.1f} req/s   p50 {figures['p50_ms']:7.2f} ms   "
+                  f"p95 {figures['p95_ms']:7.2f} ms   p99 {figures['p99_ms']:7.2f} ms")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
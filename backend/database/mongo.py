@@ -0,0 +1,735 @@
+"""
+In-memory MongoDB for offline runs, tests and benchmarks.
+
+Implements the pymongo surface the backend uses, with server semantics
+where they matter to the routes:
+
+    find / find_one (filter, projection, sort, limit, skip), count_documents,
+    distinct, insert_one / insert_many, update_one / update_many, replace_one,
+    delete_one / delete_many, bulk_write, create_index (unique, partial)
+
+Filters: equality (array fields match any element), $eq $ne $gt $gte $lt $lte
+$in $nin $exists, $and $or $nor. Updates: $set $unset $inc $setOnInsert
+$addToSet $push (with $each) and upserts.
+
+Like a real server: documents are copied in and out, datetimes are stored
+naive UTC at millisecond precision, inserts add `_id` to the caller's
+document, comparisons only match values of the same BSON type bracket,
+unique indexes raise DuplicateKeyError / BulkWriteError (code 11000), and
+watch() fails as on a standalone server. Results and errors are pymongo's
+own classes, so calling code can't tell the difference.
+
+Equality on `_id` and on the first field of a non-partial index is served
+from a hash index; anything else scans the collection.
+
+Selected in db.py with DB_BACKEND=memory.
+"""
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from bson import ObjectId
+from flask_pymongo import PyMongo
+from flask_pymongo.helpers import BSONObjectIdConverter, BSONProvider
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure
+from pymongo.results import InsertOneResult, InsertManyResult, UpdateResult, DeleteResult, BulkWriteResult
+
+DUPLICATE_KEY_ERROR = 11000
+CHANGE_STREAM_UNSUPPORTED = 40573
+_MISSING = object()
+
+
+# -------------------- VALUES --------------------
+def _store(value):
+    """Copy a value the way BSON round-trips it"""
+    if isinstance(value, dict):
+        return {k: _store(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_store(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _bracket(value):
+    """BSON comparison order; values only compare within one bracket"""
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value):
+    if isinstance(value, list):
+        value = min(value, key=_sort_key, default=None) if value else None
+    bracket = _bracket(value)
+    if bracket in (1, 4, 10):
+        return bracket, str(value) if bracket != 1 else ""
+    return bracket, value
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _get(doc, path):
+    """Value at a dotted path, or _MISSING"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+# -------------------- QUERIES --------------------
+def _compare(value, op, target):
+    if _bracket(value) != _bracket(target):
+        return False
+    try:
+        if op == "$gt":
+            return value > target
+        if op == "$gte":
+            return value >= target
+        if op == "$lt":
+            return value < target
+        return value <= target
+    except TypeError:
+        return False
+
+
+def _equals(value, target):
+    if value is _MISSING:
+        return target is None
+    if value == target and _bracket(value) == _bracket(target):
+        return True
+    return isinstance(value, list) and not isinstance(target, list) and any(_equals(v, target) for v in value)
+
+
+def _match_operator(value, op, target):
+    if op == "$eq":
+        return _equals(value, target)
+    if op == "$ne":
+        return not _equals(value, target)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        if value is _MISSING:
+            return False
+        if isinstance(value, list):
+            return any(_compare(v, op, target) for v in value)
+        return _compare(value, op, target)
+    if op == "$in":
+        return any(_equals(value, t) for t in target)
+    if op == "$nin":
+        return not any(_equals(value, t) for t in target)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(target)
+    raise OperationFailure(f"unknown operator: {op}", code=2)
+
+
+def _is_operator_doc(condition):
+    return isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition)
+
+
+def matches(doc, query):
+    """True if a document satisfies a Mongo filter"""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}", code=2)
+        else:
+            value = _get(doc, key)
+            if _is_operator_doc(condition):
+                if not all(_match_operator(value, op, target) for op, target in condition.items()):
+                    return False
+            elif not _equals(value, condition):
+                return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return _copy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    result = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+    if any(fields.values()):
+        result.update((k, _copy(doc[k])) for k in fields if k in doc)
+    else:
+        result.update((k, _copy(v)) for k, v in doc.items() if k not in fields and k != "_id")
+    return result
+
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return [(k, d) for k, d in key_or_list]
+
+
+def _sorted(docs, spec):
+    docs = list(docs)
+    for field, direction in reversed(spec):
+        docs.sort(key=lambda d: _sort_key(None if _get(d, field) is _MISSING else _get(d, field)),
+                  reverse=direction == -1)
+    return docs
+
+
+# -------------------- UPDATES --------------------
+def _apply_update(doc, update, inserting=False):
+    """Apply update operators to `doc` in place"""
+    if not update or not all(k.startswith("$") for k in update):
+        raise ValueError("update only works with $ operators")
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if path == "_id" and not inserting:
+                continue
+            if op == "$set":
+                _set(doc, path, _store(value))
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set(doc, path, _store(value))
+            elif op == "$unset":
+                _unset(doc, path)
+            elif op == "$inc":
+                current = _get(doc, path)
+                _set(doc, path, value if current is _MISSING else current + value)
+            elif op in ("$addToSet", "$push"):
+                current = _get(doc, path)
+                items = current if isinstance(current, list) else []
+                values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                for item in _store(values):
+                    if op == "$push" or item not in items:
+                        items.append(item)
+                _set(doc, path, items)
+            else:
+                raise OperationFailure(f"Unknown modifier: {op}", code=9)
+
+
+def _upsert_seed(query):
+    """Fields an upsert inherits from the equality parts of its filter"""
+    doc = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if _is_operator_doc(condition):
+            if "$eq" in condition:
+                _set(doc, key, _store(condition["$eq"]))
+        else:
+            _set(doc, key, _store(condition))
+    return doc
+
+
+class _Index:
+    """A secondary index: equality lookups on its first field, uniqueness on the full key"""
+
+    def __init__(self, name, keys, unique=False, partial=None):
+        self.name = name
+        self.keys = keys
+        self.fields = [field for field, _ in keys]
+        self.unique = unique
+        self.partial = partial
+        self.by_first = {}
+        self.by_key = {}
+
+    def _first_values(self, doc):
+        value = _get(doc, self.fields[0])
+        value = None if value is _MISSING else value
+        values = [_hashable(value)]
+        if isinstance(value, list):
+            values += [_hashable(v) for v in value]
+        return values
+
+    def _key(self, doc):
+        return tuple(_hashable(None if _get(doc, f) is _MISSING else _get(doc, f)) for f in self.fields)
+
+    def covers(self, doc):
+        return self.partial is None or matches(doc, self.partial)
+
+    def conflict(self, doc):
+        """_id of another document holding this document's unique key, if any"""
+        if not self.unique or not self.covers(doc):
+            return None
+        owner = self.by_key.get(self._key(doc))
+        return owner if owner is not None and owner != doc.get("_id") else None
+
+    def add(self, doc):
+        if not self.covers(doc):
+            return
+        for value in self._first_values(doc):
+            self.by_first.setdefault(value, set()).add(doc["_id"])
+        if self.unique:
+            self.by_key[self._key(doc)] = doc["_id"]
+
+    def remove(self, doc):
+        if not self.covers(doc):
+            return
+        for value in self._first_values(doc):
+            ids = self.by_first.get(value)
+            if ids:
+                ids.discard(doc["_id"])
+        if self.unique and self.by_key.get(self._key(doc)) == doc["_id"]:
+            del self.by_key[self._key(doc)]
+
+    def info(self):
+        info = {"key": list(self.keys), "v": 2}
+        if self.unique:
+            info["unique"] = True
+        if self.partial is not None:
+            info["partialFilterExpression"] = self.partial
+        return info
+
+
+# -------------------- COLLECTION --------------------
+class MemoryCursor:
+    """Lazily evaluated find() result supporting sort / skip / limit chaining"""
+
+    def __init__(self, collection, query=None, projection=None, sort=None, limit=0, skip=0):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort = _sort_spec(sort) if sort else None
+        self._limit = limit
+        self._skip = skip
+        self._results = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    def _evaluate(self):
+        docs = self.collection._select(self.query)
+        if self._sort:
+            docs = _sorted(docs, self._sort)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return iter([_project(d, self.projection) for d in docs])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._results is None:
+            with self.collection._lock:
+                self._results = self._evaluate()
+        return next(self._results)
+
+    def close(self):
+        self._results = iter(())
+
+
+class MemoryCollection:
+    """One collection: documents by _id in insertion order, plus secondary indexes"""
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._docs = {}
+        self._seq = {}
+        self._inserted = 0
+        self._indexes = {}
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f"MemoryCollection({self.full_name!r}, {len(self._docs)} documents)"
+
+    # ---- internals (call with the lock held) ----
+    def _candidates(self, query):
+        """Documents that can match, narrowed by _id or an index when the filter allows"""
+        for field in ["_id"] + [i.fields[0] for i in self._indexes.values() if i.partial is None]:
+            condition = query.get(field, _MISSING)
+            if condition is _MISSING:
+                continue
+            if _is_operator_doc(condition):
+                if "$eq" in condition:
+                    values = [condition["$eq"]]
+                elif "$in" in condition:
+                    values = condition["$in"]
+                else:
+                    continue
+            else:
+                values = [condition]
+            if field == "_id":
+                ids = {_hashable(v) for v in values}
+            else:
+                index = next(i for i in self._indexes.values() if i.partial is None and i.fields[0] == field)
+                ids = set().union(*(index.by_first.get(_hashable(v), ()) for v in values))
+            # Natural (insertion) order, as a collection scan would return them
+            return sorted((self._docs[i] for i in ids if i in self._docs), key=lambda d: self._seq[d["_id"]])
+        return list(self._docs.values())
+
+    def _select(self, query, limit=0):
+        docs = []
+        for doc in self._candidates(query):
+            if matches(doc, query):
+                docs.append(doc)
+                if limit and len(docs) >= limit:
+                    break
+        return docs
+
+    def _check_unique(self, doc):
+        for index in self._indexes.values():
+            owner = index.conflict(doc)
+            if owner is not None:
+                key = {f: _get(doc, f) for f in index.fields}
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.full_name} index: {index.name} dup key: {key}",
+                    DUPLICATE_KEY_ERROR, {"keyPattern": dict(index.keys), "keyValue": key}
+                )
+
+    def _insert(self, document):
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        doc = _store(document)
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} index: _id_ dup key: {{ _id: {doc['_id']!r} }}",
+                DUPLICATE_KEY_ERROR, {"keyPattern": {"_id": 1}, "keyValue": {"_id": doc["_id"]}}
+            )
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        self._seq[doc["_id"]] = self._inserted
+        self._inserted += 1
+        for index in self._indexes.values():
+            index.add(doc)
+        return doc["_id"]
+
+    def _replace_doc(self, old, new):
+        """Swap a stored document for its new version; returns True if it changed"""
+        if new == old:
+            return False
+        self._check_unique(new)
+        for index in self._indexes.values():
+            index.remove(old)
+        self._docs[old["_id"]] = new
+        for index in self._indexes.values():
+            index.add(new)
+        return True
+
+    def _update(self, query, update, upsert=False, many=False):
+        """(matched, modified, upserted_id)"""
+        matched = modified = 0
+        for doc in self._select(query, limit=0 if many else 1):
+            new = _copy(doc)
+            _apply_update(new, update)
+            matched += 1
+            modified += self._replace_doc(doc, new)
+        if matched or not upsert:
+            return matched, modified, None
+        doc = _upsert_seed(query)
+        _apply_update(doc, update, inserting=True)
+        return 0, 0, self._insert(doc)
+
+    def _replace(self, query, replacement, upsert=False):
+        if any(k.startswith("$") for k in replacement):
+            raise ValueError("replacement can not include $ operators")
+        found = self._select(query, limit=1)
+        if found:
+            new = _store({k: v for k, v in replacement.items() if k != "_id"})
+            new["_id"] = found[0]["_id"]
+            return 1, int(self._replace_doc(found[0], new)), None
+        if not upsert:
+            return 0, 0, None
+        doc = {**_upsert_seed(query), **_store(replacement)}
+        return 0, 0, self._insert(doc)
+
+    def _delete(self, query, many=False):
+        docs = self._select(query, limit=0 if many else 1)
+        for doc in docs:
+            for index in self._indexes.values():
+                index.remove(doc)
+            del self._docs[doc["_id"]]
+            del self._seq[doc["_id"]]
+        return len(docs)
+
+    # ---- reads ----
+    def find(self, filter=None, projection=None, sort=None, limit=0, skip=0, **kwargs):
+        return MemoryCursor(self, filter, projection, sort, limit, skip)
+
+    def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        return next(iter(MemoryCursor(self, filter, projection, sort, limit=1)), None)
+
+    def count_documents(self, filter, **kwargs):
+        with self._lock:
+            return len(self._select(filter))
+
+    def estimated_document_count(self, **kwargs):
+        return len(self._docs)
+
+    def distinct(self, key, filter=None):
+        values = []
+        with self._lock:
+            for doc in self._select(filter or {}):
+                value = _get(doc, key)
+                for v in (value if isinstance(value, list) else [value]):
+                    if v is not _MISSING and v not in values:
+                        values.append(_copy(v))
+        return values
+
+    # ---- writes ----
+    def insert_one(self, document, **kwargs):
+        with self._lock:
+            return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        documents = list(documents)
+        self.bulk_write([InsertOne(d) for d in documents], ordered=ordered)
+        return InsertManyResult([d["_id"] for d in documents], True)
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        with self._lock:
+            matched, modified, upserted = self._update(filter, update, upsert)
+        return UpdateResult(_update_raw(matched, modified, upserted), True)
+
+    def update_many(self, filter, update, upsert=False, **kwargs):
+        with self._lock:
+            matched, modified, upserted = self._update(filter, update, upsert, many=True)
+        return UpdateResult(_update_raw(matched, modified, upserted), True)
+
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        with self._lock:
+            matched, modified, upserted = self._replace(filter, replacement, upsert)
+        return UpdateResult(_update_raw(matched, modified, upserted), True)
+
+    def delete_one(self, filter, **kwargs):
+        with self._lock:
+            return DeleteResult({"n": self._delete(filter)}, True)
+
+    def delete_many(self, filter, **kwargs):
+        with self._lock:
+            return DeleteResult({"n": self._delete(filter, many=True)}, True)
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        """Apply InsertOne / UpdateOne / UpdateMany / ReplaceOne / DeleteOne / DeleteMany requests"""
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                  "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+        with self._lock:
+            for i, op in enumerate(requests):
+                try:
+                    upserted = None
+                    if isinstance(op, InsertOne):
+                        self._insert(op._doc)
+                        result["nInserted"] += 1
+                    elif isinstance(op, (UpdateOne, UpdateMany)):
+                        matched, modified, upserted = self._update(
+                            op._filter, op._doc, bool(op._upsert), many=isinstance(op, UpdateMany)
+                        )
+                        result["nMatched"] += matched
+                        result["nModified"] += modified
+                    elif isinstance(op, ReplaceOne):
+                        matched, modified, upserted = self._replace(op._filter, op._doc, bool(op._upsert))
+                        result["nMatched"] += matched
+                        result["nModified"] += modified
+                    elif isinstance(op, (DeleteOne, DeleteMany)):
+                        result["nRemoved"] += self._delete(op._filter, many=isinstance(op, DeleteMany))
+                    else:
+                        raise TypeError(f"{op!r} is not a valid request")
+                    if upserted is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": i, "_id": upserted})
+                except DuplicateKeyError as e:
+                    result["writeErrors"].append({"index": i, "code": e.code, "errmsg": str(e), "op": _op_doc(op)})
+                    if ordered:
+                        break
+
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    # ---- indexes / admin ----
+    def create_index(self, keys, unique=False, partialFilterExpression=None, name=None, **kwargs):
+        keys = _sort_spec(keys, 1)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        with self._lock:
+            if name not in self._indexes:
+                index = _Index(name, keys, unique, partialFilterExpression)
+                for doc in self._docs.values():
+                    if unique and index.conflict(doc) is not None:
+                        raise DuplicateKeyError(f"E11000 duplicate key error building index {name}", DUPLICATE_KEY_ERROR)
+                    index.add(doc)
+                self._indexes[name] = index
+        return name
+
+    def index_information(self):
+        info = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        info.update({name: index.info() for name, index in self._indexes.items()})
+        return info
+
+    def drop(self):
+        with self._lock:
+            self._docs.clear()
+            self._seq.clear()
+            self._indexes.clear()
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure(
+            "The $changeStream stage is only supported on replica sets", code=CHANGE_STREAM_UNSUPPORTED
+        )
+
+
+def _update_raw(matched, modified, upserted):
+    raw = {"n": matched + (upserted is not None), "nModified": modified}
+    if upserted is not None:
+        raw["upserted"] = upserted
+    return raw
+
+
+def _op_doc(op):
+    return getattr(op, "_doc", None) or {"q": getattr(op, "_filter", None)}
+
+
+# -------------------- DATABASE / CLIENT --------------------
+class MemoryDatabase:
+    """Collections created on first access, like a real database"""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name)
+            return self._collections[name]
+
+    def get_collection(self, name, **kwargs):
+        return self[name]
+
+    def list_collection_names(self, **kwargs):
+        return [name for name, c in self._collections.items() if c._docs or c._indexes]
+
+    def drop_collection(self, name):
+        self[name].drop()
+
+    def command(self, command, **kwargs):
+        if command == "ping" or (isinstance(command, dict) and "ping" in command):
+            return {"ok": 1.0}
+        raise OperationFailure(f"no such command: {command}", code=59)
+
+
+class MemoryClient:
+    """Stand-in for MongoClient; the URI only supplies the default database name"""
+
+    def __init__(self, host=None, **kwargs):
+        self.default_database = urlparse(host).path.lstrip("/") if host else None
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(self, name)
+            return self._databases[name]
+
+    def get_database(self, name=None, **kwargs):
+        return self[name or self.default_database or "test"]
+
+    def get_default_database(self, default=None, **kwargs):
+        return self[self.default_database or default or "test"]
+
+    def list_database_names(self):
+        return list(self._databases)
+
+    def close(self):
+        pass
+
+
+class MemoryPyMongo(PyMongo):
+    """flask_pymongo.PyMongo over a MemoryClient (same JSON provider and ObjectId converter)"""
+
+    def __init__(self, app=None, uri=None, client=None):
+        self._client = client
+        super().__init__(app, uri)
+
+    def init_app(self, app, uri=None, *args, **kwargs):
+        uri = uri or app.config.get("MONGO_URI")
+        self.cx = self._client or MemoryClient(uri)
+        self.db = self.cx.get_default_database()
+        app.url_map.converters["ObjectId"] = BSONObjectIdConverter
+        app.json = BSONProvider(app)
@@ -16,4 +16,23 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * math.asin(math.sqrt(a)) 
     r = 6371 # Radius of earth in kilometers. Use 3956 for miles.
     
-    return c * r
\ No newline at end of file
+    return c * r
+
+def haversine_many(lat1, lon1, lats, lons):
+    """
+    Vectorized haversine from one point to many points.
+    Same formula and units as haversine(); returns a numpy array.
+    """
+    import numpy as np
+
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+
+    dlon = lons - lon1
+    dlat = lats - lat1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lats) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    r = 6371 # Same units as haversine()
+
+    return c * r
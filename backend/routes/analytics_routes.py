@@ -0,0 +1,81 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from db import db
+from services import hours_cube, roster_service
+
+analytics_bp = Blueprint("analytics", __name__)
+
+
+def _date_range(source):
+    """start/end (YYYY-MM-DD, inclusive) from query args or a JSON body"""
+    today = datetime.utcnow().date()
+    start = roster_service.parse_day(source.get("start") or today.replace(day=1))
+    end = roster_service.parse_day(source.get("end") or today)
+    if end < start:
+        raise ValueError("end is before start")
+    return start, end
+
+
+def _hours(seconds):
+    return round(seconds / 3600, 2)
+
+
+# -------------------- HOURS BY EMPLOYEE --------------------
+@analytics_bp.route("/hours", methods=["GET"])
+def hours_worked():
+    """
+    Hours worked per employee over a date range, from the hours cube.
+    ?start=2025-12-01&end=2025-12-31&employeeIds=EMP001,EMP002 (default: everyone)
+    """
+    try:
+        start, end = _date_range(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid range: {e}. Use YYYY-MM-DD"}), 400
+
+    employee_ids = None
+    if request.args.get("employeeIds"):
+        employee_ids = [e.strip() for e in request.args["employeeIds"].split(",") if e.strip()]
+
+    totals = hours_cube.range_seconds(db, start, end, employee_ids)
+    return jsonify({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "totalHours": _hours(sum(totals.values())),
+        "employees": {emp: _hours(seconds) for emp, seconds in sorted(totals.items())}
+    }), 200
+
+
+# -------------------- HOURS BY GROUP --------------------
+@analytics_bp.route("/hours", methods=["POST"])
+def hours_by_group():
+    """
+    Hours worked per group (e.g. department) over a date range. Employee
+    records live in Firestore, so the caller sends the membership:
+    {"start": "2025-12-01", "end": "2025-12-31", "groups": {"Engineering": ["EMP001", "EMP002"]}}
+    """
+    data = request.get_json(silent=True) or {}
+    groups = data.get("groups")
+    if not isinstance(groups, dict) or not groups:
+        return jsonify({"error": "groups ({name: [employeeIds]}) is required"}), 400
+    invalid = [name for name, ids in groups.items()
+               if not isinstance(ids, list) or not all(isinstance(emp, str) for emp in ids)]
+    if invalid:
+        return jsonify({"error": f"groups must map names to lists of employeeIds: {', '.join(sorted(invalid))}"}), 400
+    try:
+        start, end = _date_range(data)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid range: {e}. Use YYYY-MM-DD"}), 400
+
+    members = {emp for ids in groups.values() for emp in ids}
+    totals = hours_cube.range_seconds(db, start, end, members)
+    return jsonify({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "groups": {
+            name: {
+                "totalHours": _hours(sum(totals.get(emp, 0.0) for emp in ids)),
+                "employees": len(ids)
+            }
+            for name, ids in groups.items()
+        }
+    }), 200
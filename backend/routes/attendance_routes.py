@@ -1,14 +1,20 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime
 import geo_utils
 import csv
 import io
-from db import attendance_collection, mongo  # Import mongo to access office_config
+from db import attendance_collection, db
+from services import (decision_engine, attendance_sync, anomaly_engine, archive_service, roster_service,
+                      hours_cube, live_attendance, http_cache)
+from services.http_cache import conditional
+from services.idempotency import idempotent, cache as idempotency_cache
+from services.office_cache import get_office_config
 
 attendance_bp = Blueprint("attendance", __name__)
 
 # -------------------- PUNCH IN (DYNAMIC) --------------------
 @attendance_bp.route("/punch-in", methods=["POST"])
+@idempotent("punch-in", resets=("punch-out",))
 def punch_in():
     data = request.get_json()
 
@@ -27,7 +33,7 @@ def punch_in():
             "status": "INVALID_REQUEST"
         }), 400
 
-    office_config = mongo.db.office_config.find_one({"branch_name": "Main Office"})
+    office_config = get_office_config()
     if not office_config:
         print("❌ ERROR: 'Main Office' not found!")
         return jsonify({
@@ -89,6 +95,9 @@ def punch_in():
     }
 
     attendance_collection.insert_one(record)
+    anomaly_engine.on_insert(db, [record])
+    http_cache.bump_records(db, [record])
+    live_attendance.publish_record(record)
 
     print(f"✅ SUCCESS: {employee_id} punched in.")
 
@@ -98,8 +107,9 @@ def punch_in():
     }), 200
 
 
-# -------------------- PUNCH OUT (UNCHANGED) --------------------
+# -------------------- PUNCH OUT --------------------
 @attendance_bp.route("/punch-out", methods=["POST"])
+@idempotent("punch-out", resets=("punch-in",))
 def punch_out():
     data = request.get_json()
     employee_id = data.get("employeeId")
@@ -121,38 +131,177 @@ def punch_out():
             "status": "ALREADY_PUNCHED_OUT"
         }), 409   # ✅ Correct semantic code
 
-    attendance_collection.update_one(
-        {"_id": record["_id"]},
+    punch_out_time = datetime.utcnow()
+    office_config = get_office_config()
+
+    # 🧮 Derive hours + day status once (against the rostered shift), so payroll never recomputes it
+    shift = roster_service.shift_for(employee_id, record["punchInTime"])
+    derived = decision_engine.evaluate_record(record, punch_out_time, office_config, shift)
+
+    # Only an open record is closed: a racing punch-out or sync may have closed it first
+    closed = attendance_collection.update_one(
+        {"_id": record["_id"], "punchOutTime": {"$exists": False}},
         {
             "$set": {
-                "punchOutTime": datetime.utcnow(),
-                "status": "PUNCHED_OUT"
+                "punchOutTime": punch_out_time,
+                **derived
             }
         }
     )
+    if closed.modified_count != 1:
+        return jsonify({
+            "message": "Already punched out",
+            "status": "ALREADY_PUNCHED_OUT"
+        }), 409
+
+    hours_cube.record_shift(db, record, punch_out_time)
+    http_cache.bump_records(db, [record])
+    live_attendance.publish_record({**record, "punchOutTime": punch_out_time, **derived})
 
     return jsonify({
         "message": "Punch-out successful",
-        "status": "PUNCHED_OUT"
+        "status": "PUNCHED_OUT",
+        "dayStatus": derived["status"],
+        "hoursWorked": derived["hoursWorked"]
+    }), 200
+
+
+# -------------------- SYNC (OFFLINE BATCH) --------------------
+@attendance_bp.route("/sync", methods=["POST"])
+def sync_attendance():
+    """
+    Apply punch events queued on a device while offline.
+    Each event gets its own result; replaying the same batch is safe.
+    """
+    data = request.get_json(silent=True)
+    data = data if isinstance(data, dict) else {}
+    events = data.get("events")
+
+    if not isinstance(events, list) or not events:
+        return jsonify({
+            "message": "events list is required",
+            "status": "INVALID_REQUEST"
+        }), 400
+
+    if len(events) > attendance_sync.MAX_EVENTS:
+        return jsonify({
+            "message": f"At most {attendance_sync.MAX_EVENTS} events per sync",
+            "status": "INVALID_REQUEST"
+        }), 413
+
+    office_config = get_office_config()
+    if not office_config:
+        return jsonify({
+            "message": "Office not configured",
+            "status": "OFFICE_NOT_CONFIGURED"
+        }), 500
+
+    closed = []
+    results, inserted, updated = attendance_sync.sync_events(
+        attendance_collection, events, office_config, data.get("employeeId"), roster_service.current(),
+        on_punch_out=closed.append
+    )
+    anomaly_engine.on_insert(db, inserted)
+    for record in closed:
+        hours_cube.record_shift(db, record)
+    # Punched in and out within the batch: one record, published once in its closed state
+    changed = list({record["_id"]: record for record in inserted + closed}.values())
+    http_cache.bump_records(db, changed)
+    for record in changed:
+        live_attendance.publish_record(record)
+    print(f"🔄 SYNC: {len(events)} events, {len(inserted)} inserted, {updated} updated")
+
+    return jsonify({
+        "message": "Sync complete",
+        "status": "SYNCED",
+        "processed": len(events),
+        "inserted": len(inserted),
+        "updated": updated,
+        "results": results
+    }), 200
+
+
+# -------------------- IDEMPOTENCY STATS --------------------
+@attendance_bp.route("/idempotency/stats", methods=["GET"])
+def idempotency_stats():
+    """Hit rate of the punch replay cache"""
+    return jsonify(idempotency_cache.stats()), 200
+
+
+# -------------------- ANOMALIES --------------------
+@attendance_bp.route("/anomalies", methods=["GET"])
+def attendance_anomalies():
+    """
+    Recent suspicious punches (impossible travel, shared coordinates,
+    BSSID seen far apart), newest first. Optional employeeId / type / limit.
+    """
+    query = {}
+    if request.args.get("employeeId"):
+        query["employeeId"] = request.args["employeeId"]
+    if request.args.get("type"):
+        query["type"] = request.args["type"].upper()
+    try:
+        limit = min(int(request.args.get("limit", 100)), 1000)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    anomalies = list(db.attendance_anomalies.find(query, {"_id": 0}).sort("detectedAt", -1).limit(limit))
+    for anomaly in anomalies:
+        attendance_id = anomaly.get("attendanceId")
+        anomaly["attendanceId"] = str(attendance_id) if attendance_id is not None else None
+
+    return jsonify({
+        "anomalies": anomalies,
+        "engine": anomaly_engine.engine.stats()
     }), 200
 
 
-# -------------------- SUMMARY (UNCHANGED) --------------------
+# -------------------- RESPONSE CACHE --------------------
+def summary_resources():
+    employee_id = request.args.get("employeeId")
+    return ([http_cache.employee_key(employee_id)], None) if employee_id else None
+
+
+def export_resources():
+    employee_id = request.args.get("employeeId", "").strip()
+    try:
+        year, month_num = map(int, request.args.get("month", "").strip().split("-"))
+    except ValueError:
+        return None
+    if not employee_id:
+        return None
+    return [http_cache.month_key(employee_id, f"{year}-{month_num:02d}")], None
+
+
+def today_resources():
+    # Rostered shifts starting move people into not_punched without any write
+    now = datetime.utcnow()
+    table = roster_service.current().day_table(now.date())
+    started = sum(1 for w in table.values() if w is not None and w.late_after <= now)
+    return [http_cache.day_key(now.date())], started
+
+
+@attendance_bp.route("/cache/stats", methods=["GET"])
+def response_cache_stats():
+    """Hit rate of the read-endpoint response cache and 304 count"""
+    return jsonify(http_cache.stats()), 200
+
+
+# -------------------- SUMMARY (CONDITIONAL GET) --------------------
 @attendance_bp.route("/summary", methods=["GET"])
+@conditional(db, summary_resources)
 def attendance_summary():
     employee_id = request.args.get("employeeId")
 
     if not employee_id:
         return jsonify({"error": "employeeId is required"}), 400
 
-    records = list(
-        attendance_collection.find(
-            {"employeeId": employee_id},
-            {"_id": 0}
-        ).sort("punchInTime", -1)  # 🔥 FIX HERE
-    )
+    # Hot records plus archived months, newest first
+    records = archive_service.load_records(db, employee_id, newest_first=True)
+    roster = roster_service.current()
 
     total_seconds = 0
+    late_days = 0
     summary = []
 
     for record in records:
@@ -165,23 +314,32 @@ def attendance_summary():
             total_seconds += diff.total_seconds()
             working_hours = round(diff.total_seconds() / 3600, 2)
 
+        shift = roster.window_for_punch(employee_id, punch_in)
+        late = decision_engine.is_late_for(punch_in, shift)
+        late_days += late
+
         summary.append({
             "employeeId": record.get("employeeId"),
             "punchInTime": punch_in,
             "punchOutTime": punch_out,
             "status": record.get("status"),
-            "workingHours": working_hours
+            "workingHours": working_hours,
+            "shiftId": shift.shift_id if shift else None,
+            "expectedStart": shift.start if shift else None,
+            "isLate": late
         })
 
     total_hours = round(total_seconds / 3600, 2)
 
     return jsonify({
         "totalWorkingHours": total_hours,
+        "lateDays": late_days,
         "records": summary
     }), 200
 
-# -------------------- EXPORT (UNCHANGED) --------------------
+# -------------------- EXPORT (CONDITIONAL GET) --------------------
 @attendance_bp.route("/export/monthly", methods=["GET"])
+@conditional(db, export_resources)
 def export_monthly_attendance():
     employee_id = request.args.get("employeeId", "").strip()
     month = request.args.get("month", "").strip()
@@ -201,12 +359,7 @@ def export_monthly_attendance():
         start_date = datetime(year, month_num, 1)
         end_date = datetime(year, month_num + 1, 1)
 
-    records = list(
-        attendance_collection.find({
-            "employeeId": employee_id,
-            "punchInTime": {"$gte": start_date, "$lt": end_date}
-        })
-    )
+    records = archive_service.load_records(db, employee_id, start_date, end_date)
 
     if not records:
         return jsonify({"error": "No attendance data found"}), 404
@@ -253,69 +406,29 @@ def minutes_to_hhmm(minutes):
 
 # -------------------- TODAY'S ATTENDANCE (FOR HR PORTAL) --------------------
 @attendance_bp.route("/today", methods=["GET"])
+@conditional(db, today_resources)
 def attendance_today():
     """
     Endpoint for HR Portal integration
     Returns today's attendance grouped by status
     """
-    from datetime import datetime, time
-    
-    today = datetime.utcnow().date()
-    today_start = datetime.combine(today, time.min)
-    today_end = datetime.combine(today, time.max)
-    
-    # Get all attendance records for today
-    records = list(
-        attendance_collection.find({
-            "punchInTime": {"$gte": today_start, "$lte": today_end}
-        })
+    return jsonify(live_attendance.build_today(attendance_collection)), 200
+
+
+# -------------------- LIVE ATTENDANCE (SSE) --------------------
+@attendance_bp.route("/stream", methods=["GET"])
+def attendance_stream():
+    """
+    Server-sent events: today's snapshot, then each punch as it's committed.
+    Replaces polling /today.
+    """
+    return Response(
+        stream_with_context(live_attendance.stream(attendance_collection)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    
-    result = {
-        "present": [],
-        "absent": [],
-        "late": [],
-        "not_punched": []
-    }
-    
-    for record in records:
-        employee_id = record.get("employeeId")
-        punch_in = record.get("punchInTime")
-        punch_out = record.get("punchOutTime")
-        
-        # Determine status
-        status = "present"
-        if punch_in:
-            # Check if late (after 9:00 AM)
-            if punch_in.hour >= 9 and punch_in.minute > 0:
-                status = "late"
-        else:
-            status = "not_punched"
-        
-        # Calculate hours worked
-        hours_worked = None
-        if punch_in and punch_out:
-            duration = (punch_out - punch_in).total_seconds() / 3600
-            hours_worked = round(duration, 2)
-        
-        # Format for HR portal
-        attendance_data = {
-            "id": str(record.get("_id")),
-            "employee_id": employee_id,
-            "employeeId": employee_id,  # Keep both for compatibility
-            "employeeName": f"Employee {employee_id}",  # Placeholder - should fetch from employee service
-            "department": "General",  # Placeholder - should fetch from employee service
-            "date": today.isoformat(),
-            "status": status,
-            "checkIn": punch_in.strftime("%H:%M") if punch_in else None,
-            "checkOut": punch_out.strftime("%H:%M") if punch_out else None,
-            "check_in_time": punch_in.strftime("%H:%M:%S") if punch_in else None,
-            "check_out_time": punch_out.strftime("%H:%M:%S") if punch_out else None,
-            "hoursWorked": hours_worked,
-            "location": record.get("location"),
-            "wifiBSSID": record.get("wifiBSSID")
-        }
-        
-        result[status].append(attendance_data)
-    
-    return jsonify(result), 200
+
+
+@attendance_bp.route("/stream/stats", methods=["GET"])
+def attendance_stream_stats():
+    return jsonify(live_attendance.broker.stats()), 200
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from db import mongo
+from db import mongo, db
+from services import office_cache, roster_service, http_cache
 
 office_bp = Blueprint('office', __name__)
 
@@ -28,6 +29,9 @@ def set_office_config():
             {"$set": config}, 
             upsert=True
         )
+        office_cache.invalidate("Main Office")
+        roster_service.invalidate()
+        http_cache.bump(db, [http_cache.GLOBAL_KEY])
 
         return jsonify({"message": "Office Configuration Saved!"}), 200
 
@@ -294,7 +294,18 @@ router.put("/policies", async (req, res) => {
 
         await db.collection('payroll_policies').doc('current_policy').set(policies);
 
-        console.log('✅ Payroll policies updated');
+        // Append an immutable version so payroll can compute past months
+        // against the policy that was in effect at the time
+        const now = new Date();
+        const version = `v${now.toISOString().replace(/[-:TZ.]/g, '').slice(0, 14)}`;
+        await db.collection('payroll_policy_versions').doc(version).set({
+            ...policies,
+            version,
+            effectiveFrom: req.body.effectiveFrom || now.toISOString().split('T')[0],
+            createdAt: now.toISOString()
+        });
+
+        console.log('✅ Payroll policies updated:', version);
         res.json({ message: "Policies updated successfully", policies });
     } catch (error) {
         res.status(500).json({ error: error.message });
@@ -0,0 +1,87 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from db import db
+from services import roster_service, http_cache
+
+roster_bp = Blueprint("roster", __name__)
+
+
+# -------------------- SHIFTS --------------------
+@roster_bp.route("/shifts", methods=["GET"])
+def list_shifts():
+    return jsonify({"shifts": list(db.shifts.find())}), 200
+
+
+@roster_bp.route("/shifts", methods=["POST"])
+def save_shift():
+    """
+    Create or replace a shift:
+    {"shiftId": "NIGHT", "start": "22:00", "end": "06:00", "timezone": "Asia/Kolkata",
+     "graceMinutes": 10, "weekdays": [0, 1, 2, 3, 4]}
+    """
+    try:
+        shift = roster_service.validate_shift(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db.shifts.replace_one({"_id": shift["_id"]}, shift, upsert=True)
+    roster_service.invalidate()
+    http_cache.bump(db, [http_cache.GLOBAL_KEY])
+    return jsonify({"message": "Shift saved", "shift": shift}), 200
+
+
+# -------------------- ASSIGNMENTS --------------------
+@roster_bp.route("/assignments", methods=["POST"])
+def assign_shift():
+    """
+    Put an employee (or a whole branch) on a shift from a date:
+    {"employeeId": "EMP001" | "branch": "Main Office", "shiftId": "NIGHT",
+     "effectiveFrom": "2025-12-01", "effectiveTo": "2025-12-31"}
+    """
+    data = request.get_json(silent=True) or {}
+    employee_id = data.get("employeeId")
+    branch = data.get("branch")
+    shift_id = str(data.get("shiftId", "")).strip().upper()
+
+    if bool(employee_id) == bool(branch) or not shift_id:
+        return jsonify({"error": "shiftId and exactly one of employeeId / branch are required"}), 400
+    if not db.shifts.find_one({"_id": shift_id}):
+        return jsonify({"error": f"Unknown shift: {shift_id}"}), 404
+
+    try:
+        effective_from = roster_service.parse_day(data.get("effectiveFrom") or datetime.utcnow().date())
+        effective_to = roster_service.parse_day(data["effectiveTo"]) if data.get("effectiveTo") else None
+    except ValueError:
+        return jsonify({"error": "effectiveFrom / effectiveTo must be YYYY-MM-DD"}), 400
+    if effective_to and effective_to < effective_from:
+        return jsonify({"error": "effectiveTo is before effectiveFrom"}), 400
+
+    owner = {"employeeId": employee_id} if employee_id else {"branch": branch}
+    assignment = {
+        **owner,
+        "shiftId": shift_id,
+        "effectiveFrom": effective_from.isoformat(),
+        "effectiveTo": effective_to.isoformat() if effective_to else None
+    }
+    db.roster_assignments.replace_one(
+        {**owner, "effectiveFrom": assignment["effectiveFrom"]}, assignment, upsert=True
+    )
+    roster_service.invalidate()
+    http_cache.bump(db, [http_cache.GLOBAL_KEY])
+    return jsonify({"message": "Shift assigned", "assignment": assignment}), 200
+
+
+# -------------------- DAY TABLE --------------------
+@roster_bp.route("/day", methods=["GET"])
+def roster_day():
+    """Expected shift windows (UTC) for everyone rostered on ?date=YYYY-MM-DD (default today)"""
+    try:
+        day = roster_service.parse_day(request.args.get("date") or datetime.utcnow().date())
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+
+    table = roster_service.current().day_table(day)
+    return jsonify({
+        "date": day.isoformat(),
+        "employees": {owner: roster_service.window_doc(w) for owner, w in table.items()}
+    }), 200
@@ -0,0 +1,152 @@
+"""
+Streaming anomaly engine for attendance inserts.
+
+Feeds each new attendance record through the GPS and WiFi detectors. Findings
+are stored in `attendance_anomalies` and the punch is tagged with
+`anomalyFlags`, so HR sees suspicious punches as they happen.
+
+Punch routes feed the engine in-process. With several backend workers, set
+ANOMALY_ENGINE_INLINE=0 and run a single change-stream consumer instead so one
+process sees every punch:
+
+    python -m services.anomaly_engine --watch --warm-up-hours 24
+"""
+import os
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from services.gps_service import ImpossibleTravelDetector, CoordinateReuseDetector
+from services.wifi_service import BssidSpreadDetector
+
+RECENT_LIMIT = 1000
+INLINE = os.environ.get("ANOMALY_ENGINE_INLINE", "1") != "0"
+
+
+class AnomalyEngine:
+    """Runs every detector over a punch and keeps a bounded log of findings"""
+
+    def __init__(self):
+        self.travel = ImpossibleTravelDetector()
+        self.reuse = CoordinateReuseDetector()
+        self.bssid = BssidSpreadDetector()
+        self.recent = deque(maxlen=RECENT_LIMIT)
+        self.counts = Counter()
+        self.observed = 0
+        self._lock = threading.Lock()
+
+    def observe(self, record):
+        """
+        Check one attendance record (needs employeeId, punchInTime, location).
+        Returns: list of anomaly dicts, empty for a clean punch
+        """
+        location = record.get("location") or {}
+        lat, lon = location.get("latitude"), location.get("longitude")
+        employee_id = record.get("employeeId")
+        timestamp = record.get("punchInTime")
+        if employee_id is None or timestamp is None or lat is None or lon is None:
+            return []
+
+        lat, lon = float(lat), float(lon)
+        found = [
+            self.travel.observe(employee_id, timestamp, lat, lon),
+            self.reuse.observe(employee_id, timestamp, lat, lon)
+        ]
+        if record.get("wifiBSSID"):
+            found.append(self.bssid.observe(employee_id, timestamp, lat, lon, record["wifiBSSID"]))
+
+        anomalies = []
+        for anomaly in filter(None, found):
+            anomaly.update({"attendanceId": record.get("_id"), "punchInTime": timestamp})
+            anomalies.append(anomaly)
+
+        with self._lock:
+            self.observed += 1
+            for anomaly in anomalies:
+                self.counts[anomaly["type"]] += 1
+                self.recent.append(anomaly)
+        return anomalies
+
+    def stats(self):
+        with self._lock:
+            return {
+                "observed": self.observed,
+                "flagged": dict(self.counts),
+                "trackedEmployees": self.travel.size(),
+                "trackedCoordinates": self.reuse.size(),
+                "trackedBssids": self.bssid.size()
+            }
+
+
+engine = AnomalyEngine()
+
+
+def process_inserts(db, records):
+    """
+    Run newly inserted attendance records through the engine and persist findings.
+    Never raises: anomaly detection must not fail a punch.
+    Returns: list of anomalies found
+    """
+    try:
+        anomalies = [a for record in records for a in engine.observe(record)]
+        if not anomalies:
+            return []
+
+        db.attendance_anomalies.insert_many([dict(a, detectedAt=datetime.utcnow()) for a in anomalies])
+        flags = {}
+        for a in anomalies:
+            if a.get("attendanceId") is not None:
+                flags.setdefault(a["attendanceId"], set()).add(a["type"])
+        for attendance_id, types in flags.items():
+            db.attendances.update_one(
+                {"_id": attendance_id},
+                {"$addToSet": {"anomalyFlags": {"$each": sorted(types)}}}
+            )
+        for a in anomalies:
+            print(f"🚨 ANOMALY {a['type']}: {a['employeeId']}")
+        return anomalies
+    except Exception as e:
+        print(f"⚠️ Anomaly engine error: {e}")
+        return []
+
+
+def on_insert(db, records):
+    """Hook for the punch routes; a no-op when a change-stream consumer owns detection"""
+    if INLINE:
+        return process_inserts(db, records)
+    return []
+
+
+def warm_up(db, hours):
+    """Replay recent punches (without persisting) so detectors start with state"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    replayed = 0
+    for record in db.attendances.find({"punchInTime": {"$gte": since}}).sort("punchInTime", 1):
+        engine.observe(record)
+        replayed += 1
+    return replayed
+
+
+def watch(db):
+    """Consume attendance inserts from a change stream (requires a replica set)"""
+    pipeline = [{"$match": {"operationType": "insert"}}]
+    with db.attendances.watch(pipeline) as stream:
+        for change in stream:
+            process_inserts(db, [change["fullDocument"]])
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m services.anomaly_engine --watch
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Attendance anomaly engine")
+    parser.add_argument("--watch", action="store_true", help="Consume inserts from a MongoDB change stream")
+    parser.add_argument("--warm-up-hours", type=int, default=24, help="Replay this much history before watching")
+    args = parser.parse_args()
+
+    from db import db as database
+
+    print(f"♻️ Replayed {warm_up(database, args.warm_up_hours)} recent punches")
+    if args.watch:
+        print("👀 Watching attendance inserts...")
+        watch(database)
@@ -0,0 +1,199 @@
+"""
+Attendance archive.
+
+Closed months are moved out of the hot `attendances` collection into
+`attendance_archive`, one document per employee-month:
+
+    {_id: "EMP001:2025-11", employeeId, month: "2025-11", count, totalSeconds,
+     records: <zlib-compressed BSON of the month's attendance records>, archivedAt}
+
+The hot collection (and its indexes) then only holds the current month and
+anything not yet archived. Open shifts (no punchOutTime) are never
+archived: they stay hot until punch-out closes them and a later run moves
+them. load_records() merges both sources, so readers don't need to know
+where a month lives.
+
+    python -m services.archive_service --keep-months 1 [--dry-run]
+"""
+import zlib
+from datetime import datetime
+
+import bson
+from pymongo import UpdateOne, DeleteMany
+
+ARCHIVE_COLLECTION = "attendance_archive"
+DELETE_CHUNK = 1000
+
+_indexes_ready = False
+
+
+def month_key(dt):
+    return f"{dt.year}-{dt.month:02d}"
+
+
+def month_start(year, month):
+    return datetime(year, month, 1)
+
+
+def next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def pack(records):
+    """Compress a list of attendance records (types such as datetime/ObjectId survive)"""
+    return bson.Binary(zlib.compress(bson.encode({"records": records}), 6))
+
+
+def unpack(blob):
+    return bson.decode(zlib.decompress(blob))["records"]
+
+
+def ensure_indexes(db):
+    global _indexes_ready
+    if not _indexes_ready:
+        db[ARCHIVE_COLLECTION].create_index([("employeeId", 1), ("month", 1)])
+        _indexes_ready = True
+
+
+def _bucket_update(existing, employee_id, key, records):
+    """Archive document for one employee-month, merged with what's already archived"""
+    merged = {r["_id"]: r for r in (unpack(existing["records"]) if existing else [])}
+    merged.update((r["_id"], r) for r in records)
+    records = sorted(merged.values(), key=lambda r: r.get("punchInTime") or datetime.min)
+
+    total_seconds = sum(
+        (r["punchOutTime"] - r["punchInTime"]).total_seconds()
+        for r in records if r.get("punchInTime") and r.get("punchOutTime")
+    )
+    return {
+        "employeeId": employee_id,
+        "month": key,
+        "count": len(records),
+        "totalSeconds": total_seconds,
+        "records": pack(records),
+        "archivedAt": datetime.utcnow()
+    }
+
+
+def archive_month(db, year, month, dry_run=False):
+    """
+    Move one month of closed hot attendance into the archive.
+    The archive is written before hot records are deleted, so a crash in
+    between leaves duplicates (which readers drop) rather than gaps.
+    Returns: number of records archived
+    """
+    ensure_indexes(db)
+    start = month_start(year, month)
+    end = month_start(*next_month(year, month))
+    key = month_key(start)
+
+    by_employee = {}
+    closed = {"punchOutTime": {"$exists": True}}
+    for record in db.attendances.find({"punchInTime": {"$gte": start, "$lt": end}, **closed}):
+        by_employee.setdefault(record.get("employeeId"), []).append(record)
+    count = sum(len(r) for r in by_employee.values())
+    if dry_run or not by_employee:
+        return count
+
+    ids = [f"{emp}:{key}" for emp in by_employee]
+    existing = {d["_id"]: d for d in db[ARCHIVE_COLLECTION].find({"_id": {"$in": ids}})}
+    db[ARCHIVE_COLLECTION].bulk_write([
+        UpdateOne(
+            {"_id": f"{emp}:{key}"},
+            {"$set": _bucket_update(existing.get(f"{emp}:{key}"), emp, key, records)},
+            upsert=True
+        )
+        for emp, records in by_employee.items()
+    ], ordered=False)
+
+    hot_ids = [r["_id"] for records in by_employee.values() for r in records]
+    db.attendances.bulk_write([
+        DeleteMany({"_id": {"$in": hot_ids[i:i + DELETE_CHUNK]}, **closed})
+        for i in range(0, len(hot_ids), DELETE_CHUNK)
+    ], ordered=False)
+    return count
+
+
+def archive_closed_months(db, keep_months=1, now=None, dry_run=False):
+    """
+    Archive every month older than the newest `keep_months` (the current
+    month counts as one).
+    Returns: {"YYYY-MM": records archived}
+    """
+    now = now or datetime.utcnow()
+    year, month = now.year, now.month
+    for _ in range(keep_months - 1):
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    cutoff = month_start(year, month)
+
+    oldest = db.attendances.find_one({"punchInTime": {"$lt": cutoff}}, sort=[("punchInTime", 1)])
+    if not oldest:
+        return {}
+
+    archived = {}
+    y, m = oldest["punchInTime"].year, oldest["punchInTime"].month
+    while month_start(y, m) < cutoff:
+        count = archive_month(db, y, m, dry_run)
+        if count:
+            archived[f"{y}-{m:02d}"] = count
+        y, m = next_month(y, m)
+    return archived
+
+
+def load_records(db, employee_id, start=None, end=None, newest_first=False):
+    """
+    An employee's attendance from the hot collection and the archive.
+    Args:
+        start / end: Optional punchInTime range [start, end)
+    Returns: records sorted by punchInTime
+    """
+    time_filter = {}
+    if start:
+        time_filter["$gte"] = start
+    if end:
+        time_filter["$lt"] = end
+
+    hot_query = {"employeeId": employee_id}
+    if time_filter:
+        hot_query["punchInTime"] = time_filter
+    records = {r["_id"]: r for r in db.attendances.find(hot_query)}
+
+    archive_query = {"employeeId": employee_id}
+    if start or end:
+        archive_query["month"] = {}
+        if start:
+            archive_query["month"]["$gte"] = month_key(start)
+        if end:
+            archive_query["month"]["$lte"] = month_key(end)
+    for bucket in db[ARCHIVE_COLLECTION].find(archive_query):
+        for record in unpack(bucket["records"]):
+            punch_in = record.get("punchInTime")
+            if start and (not punch_in or punch_in < start):
+                continue
+            if end and (not punch_in or punch_in >= end):
+                continue
+            # Hot copy wins if a record exists in both (interrupted archive run)
+            records.setdefault(record["_id"], record)
+
+    return sorted(
+        records.values(),
+        key=lambda r: r.get("punchInTime") or datetime.min,
+        reverse=newest_first
+    )
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m services.archive_service [--keep-months 1] [--dry-run]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archive closed attendance months")
+    parser.add_argument("--keep-months", type=int, default=1, help="Months kept hot, including the current one")
+    parser.add_argument("--dry-run", action="store_true", help="Count records without moving them")
+    args = parser.parse_args()
+
+    from db import db
+
+    result = archive_closed_months(db, args.keep_months, dry_run=args.dry_run)
+    for key, count in result.items():
+        print(f"📦 {key}: {'would archive' if args.dry_run else 'archived'} {count} records")
+    print(f"✅ {sum(result.values())} records {'to archive' if args.dry_run else 'archived'}")
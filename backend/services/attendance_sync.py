@@ -0,0 +1,277 @@
+"""
+Batch sync of queued punch events from offline devices.
+
+A device posts everything it queued while offline in one request:
+
+    {"employeeId": "EMP001",
+     "events": [{"clientEventId": "a1", "type": "PUNCH_IN", "timestamp": "2025-12-01T03:31:00Z",
+                 "location": {"latitude": .., "longitude": ..}, "wifiBSSID": ".."},
+                {"clientEventId": "a2", "type": "PUNCH_OUT", "timestamp": "2025-12-01T12:02:00Z"}]}
+
+Events are validated together (one vectorized geofence check), deduplicated by
+clientEventId against the batch and the database, replayed in time order
+against each employee's open record in memory, and written with a single
+unordered bulk_write. Every event gets its own result; replaying a batch is safe.
+Malformed events (bad location, coordinates or timestamp) get INVALID_EVENT
+without failing the rest of the batch.
+
+Punch-outs only close a record that is still open when the write lands; one
+closed first by an online punch-out is reported as ALREADY_PUNCHED_OUT and
+is not passed to on_punch_out.
+"""
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import geo_utils
+from services import decision_engine
+
+EVENT_TYPES = ("PUNCH_IN", "PUNCH_OUT")
+MAX_EVENTS = 500
+DUPLICATE_KEY_ERROR = 11000
+
+_indexes_ready = False
+
+
+def ensure_indexes(collection):
+    """Unique client event IDs make concurrent replays of one batch harmless"""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    for field in ("clientEventId", "punchOutEventId"):
+        collection.create_index(
+            field, unique=True,
+            partialFilterExpression={field: {"$exists": True}}
+        )
+    _indexes_ready = True
+
+
+def parse_timestamp(value):
+    """ISO-8601 string -> naive UTC datetime (how punch times are stored)"""
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _result(event, status, message, **extra):
+    return {"clientEventId": event.get("clientEventId"), "status": status, "message": message, **extra}
+
+
+def _normalize(events, employee_id, results):
+    """Validate event shape; returns [(index, event)] of usable events"""
+    valid, seen = [], set()
+    for i, event in enumerate(events):
+        if not isinstance(event, dict):
+            results[i] = {"clientEventId": None, "status": "INVALID_EVENT", "message": "Event must be an object"}
+            continue
+        event_id = event.get("clientEventId")
+        event_type = str(event.get("type", "")).upper()
+        emp = event.get("employeeId") or employee_id
+
+        if not event_id or not isinstance(emp, str) or not emp or event_type not in EVENT_TYPES:
+            results[i] = _result(event, "INVALID_EVENT", "clientEventId, employeeId and type (PUNCH_IN/PUNCH_OUT) required")
+            continue
+        if event_id in seen:
+            results[i] = _result(event, "DUPLICATE", "Repeated in this batch")
+            continue
+        try:
+            timestamp = parse_timestamp(event.get("timestamp"))
+        except (TypeError, ValueError):
+            results[i] = _result(event, "INVALID_EVENT", "timestamp must be ISO-8601")
+            continue
+        normalized = {**event, "employeeId": emp, "type": event_type, "timestamp": timestamp}
+        if event_type == "PUNCH_IN":
+            location = _coordinates(event.get("location"))
+            if location is None or not isinstance(event.get("wifiBSSID"), str) or not event["wifiBSSID"]:
+                results[i] = _result(event, "INVALID_EVENT",
+                                     "PUNCH_IN needs location {latitude, longitude} as numbers and wifiBSSID")
+                continue
+            normalized["location"] = location
+
+        seen.add(event_id)
+        valid.append((i, normalized))
+    return valid
+
+
+def _coordinates(location):
+    """Location with numeric latitude/longitude, or None if it isn't one"""
+    if not isinstance(location, dict):
+        return None
+    try:
+        latitude, longitude = float(location["latitude"]), float(location["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):  # Also rejects NaN
+        return None
+    return {**location, "latitude": latitude, "longitude": longitude}
+
+
+def _already_applied(collection, event_ids):
+    """clientEventIds that an earlier sync (or a concurrent one) already stored"""
+    if not event_ids:
+        return set()
+    applied = set()
+    for doc in collection.find(
+        {"$or": [{"clientEventId": {"$in": event_ids}}, {"punchOutEventId": {"$in": event_ids}}]},
+        {"clientEventId": 1, "punchOutEventId": 1}
+    ):
+        applied.update(v for v in (doc.get("clientEventId"), doc.get("punchOutEventId")) if v)
+    return applied
+
+
+def _geofence(events, office_config):
+    """Distances and pass/fail for all punch-ins in one vectorized pass"""
+    punch_ins = [(i, e) for i, e in events if e["type"] == "PUNCH_IN"]
+    if not punch_ins:
+        return {}
+    location = office_config["location"]
+    distances = geo_utils.haversine_many(
+        location["latitude"], location["longitude"],
+        [float(e["location"]["latitude"]) for _, e in punch_ins],
+        [float(e["location"]["longitude"]) for _, e in punch_ins]
+    )
+    inside = distances <= location["allowed_radius_meters"]
+    return {i: (float(d), bool(ok)) for (i, _), d, ok in zip(punch_ins, distances, inside)}
+
+
+def sync_events(collection, events, office_config, employee_id=None, roster=None, on_punch_out=None):
+    """
+    Apply a batch of punch events.
+    Args:
+        collection: Attendance collection
+        events: List of raw event dicts from the device
+        office_config: Office config document used for validation
+        employee_id: Default employeeId for events that don't carry one
+        roster: roster_service.Roster for shift-aware late/half-day status (optional)
+        on_punch_out: Callback invoked with each record closed by this batch, once written (optional)
+    Returns: (results in input order, inserted records, number of records updated)
+    """
+    ensure_indexes(collection)
+    results = [None] * len(events)
+    valid = _normalize(events, employee_id, results)
+
+    applied = _already_applied(collection, [e["clientEventId"] for _, e in valid])
+    pending = []
+    for i, event in valid:
+        if event["clientEventId"] in applied:
+            results[i] = _result(event, "DUPLICATE", "Already synced")
+        else:
+            pending.append((i, event))
+
+    distances = _geofence(pending, office_config)
+    allowed_bssids = [b.lower() for b in office_config["wifi"]["allowed_bssids"]]
+
+    # Each employee's open record, from the database or created earlier in this batch
+    employees = sorted({e["employeeId"] for _, e in pending})
+    open_records = {
+        r["employeeId"]: r
+        for r in collection.find({"employeeId": {"$in": employees}, "punchOutTime": {"$exists": False}})
+    } if employees else {}
+
+    inserts = {}   # _id -> (new record, [event indexes])
+    updates = {}   # _id -> ($set, [event indexes])
+    closed = {}    # _id -> finished record
+
+    for i, event in sorted(pending, key=lambda p: p[1]["timestamp"]):
+        emp = event["employeeId"]
+        record = open_records.get(emp)
+
+        if event["type"] == "PUNCH_IN":
+            distance, inside = distances[i]
+            if record is not None:
+                results[i] = _result(event, "ALREADY_PUNCHED_IN", "Already punched in")
+            elif not inside:
+                results[i] = _result(event, "GEOFENCE_FAILED", "Outside office geofence",
+                                     distance_meters=round(distance, 2),
+                                     allowed_radius=office_config["location"]["allowed_radius_meters"])
+            elif event["wifiBSSID"].lower() not in allowed_bssids:
+                results[i] = _result(event, "WIFI_FAILED", "Invalid office WiFi", your_bssid=event["wifiBSSID"])
+            else:
+                record = {
+                    "_id": ObjectId(),
+                    "employeeId": emp,
+                    "punchInTime": event["timestamp"],
+                    "location": event["location"],
+                    "wifiBSSID": event["wifiBSSID"],
+                    "gpsValid": True,
+                    "wifiValid": True,
+                    "status": "PUNCHED_IN",
+                    "distance_from_office": distance,
+                    "clientEventId": event["clientEventId"]
+                }
+                open_records[emp] = record
+                inserts[record["_id"]] = (record, [i])
+                results[i] = _result(event, "PUNCHED_IN", "Punch-in successful")
+            continue
+
+        # PUNCH_OUT
+        if record is None:
+            results[i] = _result(event, "ALREADY_PUNCHED_OUT", "No active punch-in found")
+            continue
+        if event["timestamp"] < record["punchInTime"]:
+            results[i] = _result(event, "INVALID_EVENT", "Punch-out is earlier than punch-in")
+            continue
+
+        shift = roster.window_for_punch(emp, record["punchInTime"]) if roster else decision_engine.OFFICE_HOURS
+        derived = decision_engine.evaluate_record(record, event["timestamp"], office_config, shift)
+        fields = {"punchOutTime": event["timestamp"], "punchOutEventId": event["clientEventId"], **derived}
+        if record["_id"] in inserts:
+            # Punched in and out within this batch: write the finished record once
+            record.update(fields)
+            inserts[record["_id"]][1].append(i)
+        else:
+            updates[record["_id"]] = (fields, [i])
+        closed[record["_id"]] = {**record, **fields}
+        del open_records[emp]
+        results[i] = _result(event, "PUNCHED_OUT", "Punch-out successful",
+                             dayStatus=derived["status"], hoursWorked=derived["hoursWorked"])
+
+    ops, owners = [], []
+    for record, indexes in inserts.values():
+        ops.append(InsertOne(record))
+        owners.append(indexes)
+    for _id, (fields, indexes) in updates.items():
+        ops.append(UpdateOne({"_id": _id, "punchOutTime": {"$exists": False}}, {"$set": fields}))
+        owners.append(indexes)
+
+    updated, failed = 0, set()
+    if ops:
+        try:
+            updated = collection.bulk_write(ops, ordered=False).modified_count
+        except BulkWriteError as e:
+            details = e.details
+            updated = details.get("nModified", 0)
+            for error in details.get("writeErrors", []):
+                failed.add(error["index"])
+                duplicate = error.get("code") == DUPLICATE_KEY_ERROR
+                for i in owners[error["index"]]:
+                    results[i] = _result(
+                        events[i],
+                        "DUPLICATE" if duplicate else "WRITE_FAILED",
+                        "Already synced" if duplicate else error.get("errmsg", "Write failed")
+                    )
+
+    written = {_id for n, _id in enumerate(list(inserts) + list(updates)) if n not in failed}
+    attempted = [_id for _id in updates if _id in written]
+    if updated < len(attempted):
+        # Some conditional punch-outs matched nothing: the record was closed first elsewhere
+        won = {
+            doc["_id"]
+            for doc in collection.find({"_id": {"$in": attempted}}, {"punchOutEventId": 1})
+            if doc.get("punchOutEventId") == updates[doc["_id"]][0]["punchOutEventId"]
+        }
+        for _id in attempted:
+            if _id not in won:
+                written.discard(_id)
+                for i in updates[_id][1]:
+                    results[i] = _result(events[i], "ALREADY_PUNCHED_OUT", "Already punched out")
+
+    inserted = [record for n, (record, _) in enumerate(inserts.values()) if n not in failed]
+    if on_punch_out:
+        for _id, record in closed.items():
+            if _id in written:
+                on_punch_out(record)
+    return results, inserted, updated
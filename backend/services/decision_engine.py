@@ -0,0 +1,187 @@
+"""
+Attendance decision engine.
+
+Single home for the daily attendance rules (PRESENT / LATE / HALF_DAY / ABSENT)
+so punch-out, backfill jobs and test-data generators all classify a day the
+same way. Payroll and dashboards read the stored `status` and `hoursWorked`
+instead of recomputing them from raw timestamps.
+"""
+from datetime import datetime, time
+
+DEFAULT_OFFICE_START = time(9, 0)
+DEFAULT_WORKING_HOURS = 8
+HALF_DAY_BUFFER_HOURS = 0.5
+# evaluate_record default: no roster consulted, judge against the office hours
+OFFICE_HOURS = object()
+
+
+def parse_office_start(value):
+    """Accept "09:00", a datetime.time or None and return a datetime.time"""
+    if value is None:
+        return DEFAULT_OFFICE_START
+    if isinstance(value, time):
+        return value
+    hour, minute = map(int, str(value).split(':')[:2])
+    return time(hour, minute)
+
+
+def hours_between(punch_in, punch_out):
+    """Hours worked between two datetimes (or ISO strings), rounded to 2 dp"""
+    if not punch_in or not punch_out:
+        return 0.0
+    if isinstance(punch_in, str):
+        punch_in = datetime.fromisoformat(punch_in)
+    if isinstance(punch_out, str):
+        punch_out = datetime.fromisoformat(punch_out)
+    seconds = (punch_out - punch_in).total_seconds()
+    return round(max(seconds, 0) / 3600, 2)
+
+
+def is_late(punch_in, office_start=None):
+    """True if the punch-in is after the office start time"""
+    if not punch_in:
+        return False
+    if isinstance(punch_in, str):
+        punch_in = datetime.fromisoformat(punch_in)
+    start = parse_office_start(office_start)
+    return punch_in.time().replace(second=0, microsecond=0) > start
+
+
+def is_late_for(punch_in, window):
+    """
+    True if the punch-in is after the rostered shift start plus grace.
+    window: roster_service.ShiftWindow (None = not rostered, never late)
+    """
+    if not punch_in or window is None:
+        return False
+    if isinstance(punch_in, str):
+        punch_in = datetime.fromisoformat(punch_in)
+    return punch_in.replace(second=0, microsecond=0) > window.late_after
+
+
+def classify_day(hours, late=False, wifi_valid=True, geo_valid=True,
+                 punched_in=True, working_hours=DEFAULT_WORKING_HOURS):
+    """
+    Classify a single day.
+
+    Mirrors the rules used by the Firestore punch-out route:
+      - no punch or failed WiFi/geo validation  -> ABSENT
+      - under 50% of working hours              -> ABSENT
+      - around 50% (+/- 30 min)                 -> HALF_DAY
+      - full hours, arrived late                -> LATE
+      - full hours, on time                     -> PRESENT
+      - anything in between                     -> HALF_DAY
+    """
+    if not punched_in:
+        return 'ABSENT'
+    if not wifi_valid or not geo_valid:
+        return 'ABSENT'
+
+    half = working_hours * 0.5
+    if hours < half:
+        return 'ABSENT'
+    if abs(hours - half) <= HALF_DAY_BUFFER_HOURS:
+        return 'HALF_DAY'
+    if hours >= working_hours:
+        return 'LATE' if late else 'PRESENT'
+    return 'HALF_DAY'
+
+
+def evaluate_record(record, punch_out=None, office_config=None, shift=OFFICE_HOURS):
+    """
+    Compute the derived fields for an attendance record.
+
+    Args:
+        record: Attendance document (needs punchInTime, optionally punchOutTime)
+        punch_out: Punch-out time to use instead of record['punchOutTime']
+        office_config: Office document; `officeStartTime` / `workingHours` are honoured
+        shift: Rostered ShiftWindow for the punch; overrides the office hours.
+               None = not rostered (a day off): never late, default working hours,
+               the same rule /summary, /today and payroll apply
+    Returns:
+        dict with hoursWorked, isLate and status, ready for a `$set`
+    """
+    office_config = office_config or {}
+    punch_in = record.get('punchInTime')
+    punch_out = punch_out or record.get('punchOutTime')
+
+    hours = hours_between(punch_in, punch_out)
+    if shift is OFFICE_HOURS:
+        late = is_late(punch_in, office_config.get('officeStartTime'))
+        working_hours = office_config.get('workingHours', DEFAULT_WORKING_HOURS)
+    else:
+        late = is_late_for(punch_in, shift)
+        working_hours = shift.working_hours if shift else DEFAULT_WORKING_HOURS
+    status = classify_day(
+        hours,
+        late=late,
+        wifi_valid=record.get('wifiValid', True),
+        geo_valid=record.get('gpsValid', True),
+        punched_in=bool(punch_in),
+        working_hours=working_hours
+    )
+
+    return {
+        'hoursWorked': hours,
+        'isLate': late,
+        'status': status
+    }
+
+
+def backfill_attendance(collection, office_config=None, batch_size=500, dry_run=False, roster=None):
+    """
+    Bulk-compute status/hoursWorked for closed records that don't have them yet.
+
+    Streams punched-out records lacking `hoursWorked` and writes the derived
+    fields back with one `bulk_write` per batch. With a roster, each record
+    is judged against the employee's shift for that day.
+    Returns: number of records updated (or that would be updated on dry run)
+    """
+    from pymongo import UpdateOne
+
+    cursor = collection.find(
+        {
+            "punchOutTime": {"$exists": True},
+            "hoursWorked": {"$exists": False}
+        },
+        {"employeeId": 1, "punchInTime": 1, "punchOutTime": 1, "wifiValid": 1, "gpsValid": 1}
+    ).batch_size(batch_size)
+
+    updated = 0
+    ops = []
+    for record in cursor:
+        shift = roster.window_for_punch(record.get("employeeId"), record.get("punchInTime")) if roster else OFFICE_HOURS
+        ops.append(UpdateOne({"_id": record["_id"]}, {"$set": evaluate_record(record, office_config=office_config, shift=shift)}))
+        if len(ops) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+
+    if ops:
+        if not dry_run:
+            collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    return updated
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m services.decision_engine [--dry-run]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backfill derived attendance status')
+    parser.add_argument('--batch-size', type=int, default=500, help='Records per bulk write')
+    parser.add_argument('--dry-run', action='store_true', help='Count records without writing')
+    args = parser.parse_args()
+
+    from db import attendance_collection, db
+    from services import roster_service
+
+    office = db.office_config.find_one({"branch_name": "Main Office"})
+    count = backfill_attendance(attendance_collection, office, args.batch_size, args.dry_run,
+                                roster=roster_service.load(db))
+    if count and not args.dry_run:
+        from services import http_cache
+        http_cache.bump(db, [http_cache.GLOBAL_KEY])
+    print(f"✅ {'Would update' if args.dry_run else 'Updated'} {count} attendance records")
@@ -0,0 +1,129 @@
+"""
+GPS anomaly detectors.
+
+Both detectors keep compact, bounded state (LRU by key) and look at one punch
+at a time, so they can run inline on the punch path or from a change stream.
+Distances here are real kilometres.
+"""
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+import geo_utils
+
+MAX_SPEED_KMH = 250          # Faster than any commute
+MIN_TRAVEL_KM = 2            # Ignore GPS jitter around one office
+REUSE_WINDOW_SECONDS = 3600
+REUSE_THRESHOLD = 3          # Distinct employees on the exact same fix
+REUSE_PRECISION = 6          # Decimal places (~0.1 m); real fixes jitter beyond this
+
+
+def seconds_between(a, b):
+    """Absolute gap between two datetimes (or epoch seconds)"""
+    if isinstance(a, datetime) and isinstance(b, datetime):
+        return abs((b - a).total_seconds())
+    return abs(float(b) - float(a))
+
+
+class BoundedLRU:
+    """OrderedDict used as an LRU with a fixed number of keys"""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ImpossibleTravelDetector:
+    """Flags consecutive punches by one employee that imply an impossible speed"""
+
+    def __init__(self, max_speed_kmh=MAX_SPEED_KMH, min_distance_km=MIN_TRAVEL_KM, max_employees=100000):
+        self.max_speed_kmh = max_speed_kmh
+        self.min_distance_km = min_distance_km
+        self._last = BoundedLRU(max_employees)
+        self._lock = threading.Lock()
+
+    def observe(self, employee_id, timestamp, lat, lon):
+        """
+        Record a punch and compare it with the employee's previous one.
+        Returns: anomaly dict or None
+        """
+        with self._lock:
+            previous = self._last.get(employee_id)
+            self._last.put(employee_id, (timestamp, lat, lon))
+        if previous is None:
+            return None
+
+        prev_ts, prev_lat, prev_lon = previous
+        distance_km = geo_utils.haversine(prev_lat, prev_lon, lat, lon)
+        if distance_km < self.min_distance_km:
+            return None
+
+        hours = max(seconds_between(prev_ts, timestamp) / 3600, 1 / 3600)
+        speed = distance_km / hours
+        if speed <= self.max_speed_kmh:
+            return None
+        return {
+            "type": "IMPOSSIBLE_TRAVEL",
+            "employeeId": employee_id,
+            "distanceKm": round(distance_km, 2),
+            "minutes": round(hours * 60, 1),
+            "speedKmh": round(speed, 1),
+            "previous": {"latitude": prev_lat, "longitude": prev_lon, "time": prev_ts}
+        }
+
+    def size(self):
+        return len(self._last)
+
+
+class CoordinateReuseDetector:
+    """Flags the exact same GPS fix reported by several employees (mock-location apps)"""
+
+    def __init__(self, window_seconds=REUSE_WINDOW_SECONDS, threshold=REUSE_THRESHOLD,
+                 precision=REUSE_PRECISION, max_points=50000, max_sightings=32):
+        self.window_seconds = window_seconds
+        self.threshold = threshold
+        self.precision = precision
+        self.max_sightings = max_sightings
+        self._points = BoundedLRU(max_points)
+        self._lock = threading.Lock()
+
+    def observe(self, employee_id, timestamp, lat, lon):
+        key = (round(float(lat), self.precision), round(float(lon), self.precision))
+        with self._lock:
+            sightings = self._points.get(key)
+            if sightings is None:
+                sightings = deque(maxlen=self.max_sightings)
+            sightings.append((timestamp, employee_id))
+            self._points.put(key, sightings)
+            employees = {
+                emp for ts, emp in sightings
+                if seconds_between(ts, timestamp) <= self.window_seconds
+            }
+
+        if len(employees) < self.threshold:
+            return None
+        return {
+            "type": "COORDINATE_REUSE",
+            "employeeId": employee_id,
+            "coordinates": {"latitude": key[0], "longitude": key[1]},
+            "employees": sorted(employees),
+            "windowMinutes": self.window_seconds // 60
+        }
+
+    def size(self):
+        return len(self._points)
@@ -0,0 +1,224 @@
+"""
+Work-hours cube.
+
+One `hours_cube` document per employee-year holds the running total of
+seconds worked, day by day, as a packed float64 prefix-sum array:
+
+    {_id: "EMP001:2025", employeeId, year, prefix: <367 float64>, version}
+
+prefix[d] is the seconds worked before day-of-year index d (Jan 1 = 0), so
+the total for any date range is prefix[end + 1] - prefix[start]: two lookups
+per employee-year, however long the range. A shift counts towards the
+day of its punch-in (UTC), like /summary and /export/monthly.
+
+Punch-out and sync add each finished shift with record_shift(). Cubes can be
+rebuilt from the hot collection plus the archive at any time:
+
+    python -m services.hours_cube --rebuild [--year 2025]
+"""
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import bson
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+CUBE_COLLECTION = "hours_cube"
+DAYS = 367          # prefix entries: one per day of a leap year, plus the start
+MAX_RETRIES = 5
+WRITE_CHUNK = 500
+
+_indexes_ready = False
+
+
+def ensure_indexes(db):
+    global _indexes_ready
+    if not _indexes_ready:
+        db[CUBE_COLLECTION].create_index([("year", 1), ("employeeId", 1)])
+        _indexes_ready = True
+
+
+def cube_id(employee_id, year):
+    return f"{employee_id}:{year}"
+
+
+def day_index(day):
+    return day.timetuple().tm_yday - 1
+
+
+def pack(prefix):
+    return bson.Binary(np.asarray(prefix, dtype="<f8").tobytes())
+
+
+def unpack(blob):
+    return np.frombuffer(blob, dtype="<f8")
+
+
+def shift_seconds(record, punch_out=None):
+    """(punch-in day, seconds worked) for a finished shift, or None"""
+    punch_in = record.get("punchInTime")
+    punch_out = punch_out or record.get("punchOutTime")
+    if not punch_in or not punch_out or punch_out <= punch_in:
+        return None
+    return punch_in.date(), (punch_out - punch_in).total_seconds()
+
+
+def add_seconds(db, employee_id, day, seconds):
+    """
+    Add a day's seconds to an employee-year cube, creating it if needed.
+    Uses a version check so concurrent punch-outs never lose an update.
+    """
+    collection = db[CUBE_COLLECTION]
+    _id = cube_id(employee_id, day.year)
+    index = day_index(day)
+
+    for _ in range(MAX_RETRIES):
+        doc = collection.find_one({"_id": _id}, {"prefix": 1, "version": 1})
+        prefix = unpack(doc["prefix"]).copy() if doc else np.zeros(DAYS)
+        prefix[index + 1:] += seconds
+
+        if doc is None:
+            try:
+                collection.insert_one({
+                    "_id": _id, "employeeId": employee_id, "year": day.year,
+                    "prefix": pack(prefix), "version": 1
+                })
+                return True
+            except DuplicateKeyError:
+                continue
+        result = collection.update_one(
+            {"_id": _id, "version": doc["version"]},
+            {"$set": {"prefix": pack(prefix)}, "$inc": {"version": 1}}
+        )
+        if result.modified_count:
+            return True
+    return False
+
+
+def record_shift(db, record, punch_out=None):
+    """
+    Hook for punch-out and sync: fold a finished shift into the cube.
+    Never raises: analytics must not fail a punch.
+    """
+    try:
+        shift = shift_seconds(record, punch_out)
+        if shift is None:
+            return False
+        ok = add_seconds(db, record["employeeId"], *shift)
+        if not ok:
+            print(f"⚠️ Hours cube busy, run a rebuild: {record['employeeId']}")
+        return ok
+    except Exception as e:
+        print(f"⚠️ Hours cube error: {e}")
+        return False
+
+
+def _year_ranges(start, end):
+    """Split an inclusive date range into (year, first index, last index) pieces"""
+    for year in range(start.year, end.year + 1):
+        first = start if year == start.year else date(year, 1, 1)
+        last = end if year == end.year else date(year, 12, 31)
+        yield year, day_index(first), day_index(last)
+
+
+def range_seconds(db, start, end, employee_ids=None):
+    """
+    Seconds worked per employee between two dates (inclusive).
+    Args:
+        employee_ids: Employees to include (None = everyone with a cube)
+    Returns: {employeeId: seconds}
+    """
+    ensure_indexes(db)
+    pieces = {year: (first, last) for year, first, last in _year_ranges(start, end)}
+    query = {"year": {"$in": list(pieces)}}
+    if employee_ids is not None:
+        query["employeeId"] = {"$in": list(employee_ids)}
+
+    totals = {emp: 0.0 for emp in employee_ids or []}
+    for doc in db[CUBE_COLLECTION].find(query, {"employeeId": 1, "year": 1, "prefix": 1}):
+        first, last = pieces[doc["year"]]
+        prefix = unpack(doc["prefix"])
+        totals[doc["employeeId"]] = totals.get(doc["employeeId"], 0.0) + float(prefix[last + 1] - prefix[first])
+    return totals
+
+
+def daily_seconds(db, employee_id, year):
+    """Seconds worked on each day of a year (a numpy array, Jan 1 first)"""
+    doc = db[CUBE_COLLECTION].find_one({"_id": cube_id(employee_id, year)}, {"prefix": 1})
+    if doc is None:
+        return np.zeros(DAYS - 1)
+    return np.diff(unpack(doc["prefix"]))
+
+
+def rebuild(db, year=None):
+    """
+    Recompute cubes from hot and archived attendance.
+    Args:
+        year: Only rebuild this year (default: all)
+    Returns: number of employee-year cubes written
+    """
+    from services.archive_service import ARCHIVE_COLLECTION, unpack as unpack_records
+
+    daily = {}
+
+    def add(record):
+        shift = shift_seconds(record)
+        if shift is None or (year and shift[0].year != year):
+            return
+        day, seconds = shift
+        key = (record["employeeId"], day.year)
+        if key not in daily:
+            daily[key] = np.zeros(DAYS - 1)
+        daily[key][day_index(day)] += seconds
+
+    hot_query = {"punchOutTime": {"$exists": True}}
+    archive_query = {}
+    if year:
+        hot_query["punchInTime"] = {"$gte": datetime(year, 1, 1), "$lt": datetime(year + 1, 1, 1)}
+        archive_query["month"] = {"$gte": f"{year}-01", "$lte": f"{year}-12"}
+
+    seen = set()
+    for record in db.attendances.find(hot_query, {"employeeId": 1, "punchInTime": 1, "punchOutTime": 1}):
+        seen.add(record["_id"])
+        add(record)
+    for bucket in db[ARCHIVE_COLLECTION].find(archive_query, {"records": 1}):
+        for record in unpack_records(bucket["records"]):
+            if record["_id"] not in seen:
+                add(record)
+
+    ops = []
+    for (employee_id, cube_year), days in daily.items():
+        prefix = np.concatenate(([0.0], np.cumsum(days)))
+        ops.append(ReplaceOne(
+            {"_id": cube_id(employee_id, cube_year)},
+            {"_id": cube_id(employee_id, cube_year), "employeeId": employee_id, "year": cube_year,
+             # Fresh version so in-flight punch-outs re-read the rebuilt cube
+             "prefix": pack(prefix), "version": time.time_ns()},
+            upsert=True
+        ))
+    ensure_indexes(db)
+    for i in range(0, len(ops), WRITE_CHUNK):
+        db[CUBE_COLLECTION].bulk_write(ops[i:i + WRITE_CHUNK], ordered=False)
+    return len(ops)
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m services.hours_cube --rebuild [--year 2025]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Work-hours cube tools")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute cubes from attendance records")
+    parser.add_argument("--year", type=int, help="Only this year")
+    args = parser.parse_args()
+
+    from db import db
+
+    if args.rebuild:
+        count = rebuild(db, args.year)
+        print(f"🧊 Rebuilt {count} employee-year hours cubes")
+    else:
+        today = datetime.utcnow().date()
+        totals = range_seconds(db, today - timedelta(days=6), today)
+        for employee_id, seconds in sorted(totals.items()):
+            print(f"{employee_id}: {seconds / 3600:.2f}h in the last 7 days")
@@ -0,0 +1,150 @@
+"""
+Conditional GETs for attendance reads.
+
+Writes bump version stamps in `resource_versions`, one per resource:
+
+    {_id: "employee:EMP001" | "day:2025-12-01" | "month:EMP001:2025-12" | "global", version, updatedAt}
+
+A read endpoint names the stamps its response depends on. The ETag is a hash
+of the request and those versions, so it changes exactly when a relevant
+punch is written. A matching If-None-Match gets a 304. Last-Modified is
+informational only: stamps have one-second resolution and punches arrive in
+bursts, so If-Modified-Since could call a response fresh after a second
+write in the same second. Otherwise a bounded LRU keyed by
+ETag returns the already-serialized body, and the view only runs after a
+real change. Stamps live in Mongo, so every worker agrees on them.
+
+"global" is bumped by changes that can alter any response (rosters, office
+config, status backfills).
+"""
+import os
+import hashlib
+from functools import wraps
+from datetime import datetime
+
+from flask import request, Response
+from pymongo import UpdateOne
+
+from services.idempotency import IdempotencyCache
+
+VERSIONS_COLLECTION = "resource_versions"
+GLOBAL_KEY = "global"
+CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 2000))
+
+# Serialized 200 responses by ETag (same LRU as the punch replay cache)
+responses = IdempotencyCache(ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+not_modified = 0
+
+
+def employee_key(employee_id):
+    return f"employee:{employee_id}"
+
+
+def day_key(day):
+    return f"day:{day.isoformat()}"
+
+
+def month_key(employee_id, month):
+    return f"month:{employee_id}:{month}"
+
+
+def keys_for_record(record):
+    """Stamps an attendance record's write invalidates"""
+    employee_id = record.get("employeeId")
+    punch_in = record.get("punchInTime")
+    keys = [employee_key(employee_id)]
+    if punch_in:
+        keys += [day_key(punch_in.date()), month_key(employee_id, f"{punch_in.year}-{punch_in.month:02d}")]
+    return keys
+
+
+def bump(db, keys):
+    """
+    Advance version stamps after a write.
+    Never raises: the write has already happened.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    try:
+        now = datetime.utcnow().replace(microsecond=0)
+        db[VERSIONS_COLLECTION].bulk_write([
+            UpdateOne({"_id": key}, {"$inc": {"version": 1}, "$set": {"updatedAt": now}}, upsert=True)
+            for key in keys
+        ], ordered=False)
+    except Exception as e:
+        print(f"⚠️ Version stamp error: {e}")
+
+
+def bump_records(db, records):
+    bump(db, [key for record in records for key in keys_for_record(record)])
+
+
+def _validators(db, keys, extra):
+    """(ETag, Last-Modified or None) for the current request"""
+    stamps = {d["_id"]: d for d in db[VERSIONS_COLLECTION].find({"_id": {"$in": keys}})}
+    parts = [request.path, request.query_string.decode()]
+    parts += [f"{key}={stamps[key]['version'] if key in stamps else 0}" for key in keys]
+    if extra is not None:
+        parts.append(str(extra))
+    etag = '"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:20] + '"'
+    modified = [d["updatedAt"] for d in stamps.values() if d.get("updatedAt")]
+    return etag, max(modified) if modified else None
+
+
+def _is_fresh(etag):
+    # Only the ETag tracks every write; If-Modified-Since is ignored
+    return bool(request.if_none_match) and request.if_none_match.contains(etag.strip('"'))
+
+
+def _finish(response, etag, last_modified):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def conditional(db, resources):
+    """
+    Route decorator adding ETag / Last-Modified, 304s and the response LRU.
+    Args:
+        resources: callable() -> (stamp keys, extra validator) for the current
+                   request, or None to serve it uncached (e.g. invalid input)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            global not_modified
+            spec = resources()
+            if spec is None:
+                return view(*args, **kwargs)
+            keys, extra = spec
+            etag, last_modified = _validators(db, list(keys) + [GLOBAL_KEY], extra)
+
+            if _is_fresh(etag):
+                not_modified += 1
+                return _finish(Response(status=304), etag, last_modified)
+
+            cached = responses.get(etag)
+            if cached is None:
+                result = view(*args, **kwargs)
+                body, status = result if isinstance(result, tuple) else (result, None)
+                if not isinstance(body, Response) or (status or body.status_code) != 200:
+                    return result
+                cached = {
+                    "body": body.get_data(),
+                    "mimetype": body.mimetype,
+                    "headers": {k: v for k, v in body.headers.items() if k == "Content-Disposition"}
+                }
+                responses.put(etag, cached)
+
+            response = Response(cached["body"], status=200, mimetype=cached["mimetype"], headers=cached["headers"])
+            return _finish(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def stats():
+    return {**responses.stats(), "notModified": not_modified}
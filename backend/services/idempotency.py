@@ -0,0 +1,203 @@
+"""
+Idempotency cache for punch requests.
+
+Retries and double-taps resend the same punch within seconds. The first
+response is cached under employeeId + the client's `Idempotency-Key` header
+(or, when there is none, the current time bucket) and repeats are answered
+from the cache without touching Mongo. Only outcomes a retry can't change
+are cached: successes and 409 conflicts. Validation, geofence and WiFi
+failures are not, so moving into range and retrying re-evaluates the punch.
+
+The cache is in-process by default. Set IDEMPOTENCY_REDIS_URL to share it
+between workers (requires the `redis` package). If Redis is unreachable the
+cache is bypassed and punches are processed normally.
+"""
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, Response
+
+TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 30))
+BUCKET_SECONDS = int(os.environ.get("IDEMPOTENCY_BUCKET_SECONDS", 10))
+MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000))
+CACHEABLE_ERRORS = (409,)
+REDIS_URL = os.environ.get("IDEMPOTENCY_REDIS_URL")
+
+
+class IdempotencyCache:
+    """LRU of recent responses with TTL eviction and hit/miss counters"""
+
+    def __init__(self, ttl_seconds=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stores = self.evictions = self.errors = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "ttlSeconds": self.ttl_seconds
+        }
+
+
+class RedisIdempotencyCache(IdempotencyCache):
+    """
+    Same interface backed by Redis, so every worker sees the same entries.
+    Redis errors are counted and treated as a miss (get) or a no-op (put, delete).
+    """
+
+    PREFIX = "idem:"
+
+    def __init__(self, url, ttl_seconds=TTL_SECONDS):
+        import redis
+
+        super().__init__(ttl_seconds)
+        self._redis = redis.Redis.from_url(url)
+        self._redis_errors = redis.RedisError
+
+    def _call(self, method, *args, **kwargs):
+        """(ok, result) of a Redis command"""
+        try:
+            return True, method(*args, **kwargs)
+        except self._redis_errors as e:
+            with self._lock:
+                self.errors += 1
+            print(f"⚠️ Idempotency cache unavailable: {e}")
+            return False, None
+
+    def get(self, key):
+        _, raw = self._call(self._redis.get, self.PREFIX + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def put(self, key, value):
+        ok, _ = self._call(self._redis.set, self.PREFIX + key, json.dumps(value), ex=self.ttl_seconds)
+        if ok:
+            with self._lock:
+                self.stores += 1
+
+    def delete(self, key):
+        self._call(self._redis.delete, self.PREFIX + key)
+
+    def size(self):
+        return None
+
+    def stats(self):
+        return {**super().stats(), "backend": "redis"}
+
+
+def build_cache():
+    if REDIS_URL:
+        try:
+            return RedisIdempotencyCache(REDIS_URL)
+        except ImportError:
+            print("⚠️ IDEMPOTENCY_REDIS_URL set but redis is not installed; using in-memory cache")
+    return IdempotencyCache()
+
+
+cache = build_cache()
+
+
+def bucket_token():
+    return f"t{int(time.time() // BUCKET_SECONDS)}"
+
+
+def request_key(scope):
+    """Cache key for the current request, or None if it has no employeeId"""
+    data = request.get_json(silent=True) or {}
+    employee_id = data.get("employeeId")
+    if not employee_id:
+        return None
+    token = request.headers.get("Idempotency-Key") or bucket_token()
+    return f"{scope}:{employee_id}:{token}"
+
+
+def idempotent(scope, resets=()):
+    """
+    Route decorator: replay the cached response for a repeated request.
+    Only 2xx and 409 responses are cached: a rejected or failed punch
+    (400, 403, 5xx) is evaluated again when retried.
+    Args:
+        scope: Name of the action, part of the cache key
+        resets: Scopes whose time-bucket entry for the employee is dropped
+                after a success (a punch-out makes a new punch-in legitimate)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request_key(scope)
+            if key is None:
+                return view(*args, **kwargs)
+
+            cached = cache.get(key)
+            if cached is not None:
+                response = Response(cached["body"], status=cached["status"], mimetype=cached["mimetype"])
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+
+            response = view(*args, **kwargs)
+            body, status = response if isinstance(response, tuple) else (response, None)
+            if not isinstance(body, Response):
+                return response
+            status = status or body.status_code
+            if 200 <= status < 300 or status in CACHEABLE_ERRORS:
+                cache.put(key, {
+                    "body": body.get_data(as_text=True),
+                    "status": status,
+                    "mimetype": body.mimetype
+                })
+            if status < 300:
+                employee_id = request.get_json(silent=True)["employeeId"]
+                for other in resets:
+                    cache.delete(f"{other}:{employee_id}:{bucket_token()}")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,214 @@
+"""
+Today's attendance view and its live feed.
+
+build_today() produces the grouped payload served by GET /api/attendance/today.
+The punch routes hand every committed record to publish_record(), and
+GET /api/attendance/stream pushes it to connected HR portals as
+server-sent events:
+
+    event: snapshot    data: {"sequence": 41, "present": [...], "late": [...], ...}
+    id: 42
+    event: punch       data: {"bucket": "late", "entry": {...same shape as /today entries...}}
+
+A client renders the snapshot, then upserts each `entry` by employeeId into
+`bucket` (removing it from any other bucket). Load then follows punch volume,
+not viewers x poll rate. Comment lines are sent as keep-alives.
+
+The broker is in-process: with several backend workers, each worker's
+subscribers only see that worker's punches, so run the stream on one worker
+or behind sticky sessions.
+"""
+import json
+import queue
+import threading
+from datetime import datetime, time
+
+from services import decision_engine, roster_service
+
+BUCKETS = ("present", "absent", "late", "not_punched")
+SUBSCRIBER_QUEUE = 1000
+KEEPALIVE_SECONDS = 15
+
+
+def _entry(employee_id, day, status, shift, record=None):
+    """One /today row in the shape the HR portal expects"""
+    record = record or {}
+    punch_in = record.get("punchInTime")
+    punch_out = record.get("punchOutTime")
+
+    hours_worked = None
+    if punch_in and punch_out:
+        hours_worked = round((punch_out - punch_in).total_seconds() / 3600, 2)
+
+    return {
+        "id": str(record["_id"]) if record.get("_id") else None,
+        "employee_id": employee_id,
+        "employeeId": employee_id,  # Keep both for compatibility
+        "employeeName": f"Employee {employee_id}",  # Placeholder - should fetch from employee service
+        "department": "General",  # Placeholder - should fetch from employee service
+        "date": day.isoformat(),
+        "status": status,
+        "checkIn": punch_in.strftime("%H:%M") if punch_in else None,
+        "checkOut": punch_out.strftime("%H:%M") if punch_out else None,
+        "check_in_time": punch_in.strftime("%H:%M:%S") if punch_in else None,
+        "check_out_time": punch_out.strftime("%H:%M:%S") if punch_out else None,
+        "hoursWorked": hours_worked,
+        "location": record.get("location"),
+        "wifiBSSID": record.get("wifiBSSID"),
+        "shiftId": shift.shift_id if shift else None,
+        "expectedStart": shift.start.strftime("%H:%M") if shift else None
+    }
+
+
+def today_entry(record, roster=None):
+    """(bucket, entry) for an attendance record, judged against the employee's shift"""
+    roster = roster or roster_service.current()
+    employee_id = record.get("employeeId")
+    punch_in = record.get("punchInTime")
+    shift = roster.window_for_punch(employee_id, punch_in)
+
+    status = "present"
+    if punch_in:
+        if decision_engine.is_late_for(punch_in, shift):
+            status = "late"
+    else:
+        status = "not_punched"
+
+    day = punch_in.date() if punch_in else datetime.utcnow().date()
+    return status, _entry(employee_id, day, status, shift, record)
+
+
+def build_today(collection, now=None):
+    """
+    Today's (UTC) attendance grouped by status, plus rostered employees
+    whose shift has started without a punch-in.
+    """
+    now = now or datetime.utcnow()
+    today = now.date()
+    records = collection.find({
+        "punchInTime": {"$gte": datetime.combine(today, time.min), "$lte": datetime.combine(today, time.max)}
+    })
+
+    result = {bucket: [] for bucket in BUCKETS}
+    roster = roster_service.current()
+    punched = set()
+
+    for record in records:
+        punched.add(record.get("employeeId"))
+        bucket, entry = today_entry(record, roster)
+        result[bucket].append(entry)
+
+    for employee_id, shift in roster.day_table(today).items():
+        if employee_id.startswith("*") or employee_id in punched or shift is None or shift.late_after > now:
+            continue
+        result["not_punched"].append(_entry(employee_id, today, "not_punched", shift))
+
+    return result
+
+
+class AttendanceBroker:
+    """Fans punch deltas out to SSE subscribers; slow subscribers are dropped"""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.sequence = 0
+        self.published = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        q = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event, data):
+        """Queue an event for every subscriber. Returns: its sequence number"""
+        with self._lock:
+            self.sequence += 1
+            self.published += 1
+            message = (self.sequence, event, json.dumps(data, default=str))
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait(message)
+                except queue.Full:
+                    # The client fell behind; it reconnects and gets a fresh snapshot
+                    self._subscribers.discard(q)
+                    self._close(q)
+                    self.dropped += 1
+            return self.sequence
+
+    @staticmethod
+    def _close(q):
+        """Make room for the end-of-stream marker without blocking: the reader may never drain"""
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            q.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": self.dropped,
+                "sequence": self.sequence
+            }
+
+
+broker = AttendanceBroker()
+
+
+def publish_record(record):
+    """
+    Hook for the punch routes: push a committed record if it belongs to today.
+    Never raises: the live feed must not fail a punch.
+    """
+    try:
+        punch_in = record.get("punchInTime")
+        if not punch_in or punch_in.date() != datetime.utcnow().date():
+            return None
+        bucket, entry = today_entry(record)
+        return broker.publish("punch", {"bucket": bucket, "entry": entry})
+    except Exception as e:
+        print(f"⚠️ Live attendance error: {e}")
+        return None
+
+
+def format_event(event, data, sequence=None):
+    lines = [f"id: {sequence}"] if sequence is not None else []
+    lines += [f"event: {event}", f"data: {data}", "", ""]
+    return "\n".join(lines)
+
+
+def stream(collection, keepalive=KEEPALIVE_SECONDS):
+    """
+    SSE generator: a snapshot of today, then punch deltas as they're published.
+    Subscribes before reading the snapshot so no punch falls in between.
+    """
+    q = broker.subscribe()
+    try:
+        snapshot = build_today(collection)
+        snapshot["sequence"] = broker.sequence
+        yield format_event("snapshot", json.dumps(snapshot, default=str))
+        while True:
+            try:
+                message = q.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                return
+            sequence, event, data = message
+            yield format_event(event, data, sequence)
+    finally:
+        broker.unsubscribe(q)
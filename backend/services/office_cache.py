@@ -0,0 +1,39 @@
+"""
+In-process cache of office configuration documents.
+
+Every punch used to re-read `office_config`; configs change rarely, so they are
+kept for a short TTL and dropped immediately when HR saves a new config.
+"""
+import threading
+import time
+
+from db import mongo
+
+DEFAULT_BRANCH = "Main Office"
+TTL_SECONDS = 60
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_office_config(branch_name=DEFAULT_BRANCH):
+    """Office config for a branch (None if not configured), served from cache when fresh"""
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(branch_name)
+        if entry and now - entry[0] < TTL_SECONDS:
+            return entry[1]
+
+    config = mongo.db.office_config.find_one({"branch_name": branch_name})
+    with _lock:
+        _cache[branch_name] = (now, config)
+    return config
+
+
+def invalidate(branch_name=None):
+    """Forget one branch (or all) so the next read hits the database"""
+    with _lock:
+        if branch_name is None:
+            _cache.clear()
+        else:
+            _cache.pop(branch_name, None)
@@ -0,0 +1,384 @@
+"""
+Shift rosters.
+
+Shift definitions and who works them live in two collections:
+
+    shifts:             {_id: "NIGHT", name, start: "22:00", end: "06:00", timezone: "Asia/Kolkata",
+                         graceMinutes: 10, workingHours: 8, weekdays: [0, 1, 2, 3, 4]}
+    roster_assignments: {employeeId: "EMP001" | branch: "Main Office", shiftId: "NIGHT",
+                         effectiveFrom: "2025-12-01", effectiveTo: "2025-12-31" (optional)}
+
+An employee assignment wins over a branch assignment, which wins over the
+branch's office config (officeStartTime / workingHours / timezone, default
+09:00 UTC for 8 hours - the rule punch-out has always used).
+
+Rosters are loaded once into a Roster snapshot (cached for a short TTL and
+dropped when shifts or assignments change). Each (shift, day) resolves to a
+ShiftWindow of naive UTC datetimes, so classifying a punch is a dict lookup
+and a comparison:
+
+    window = roster_service.shift_for("EMP001", punch_in)
+    late = decision_engine.is_late_for(punch_in, window)
+
+Day tables can also be written to `roster_days` for readers outside this
+process, or exported as JSON for payroll, which reads Firestore attendance
+and reclassifies it against the same tables (payroll_system.py --roster):
+
+    python -m services.roster_service --precompute --days 31
+    python -m services.roster_service --export roster_2025-12.json --start 2025-11-30 --days 33
+"""
+import threading
+import time as clock
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta, timezone
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from db import db
+
+DEFAULT_BRANCH = "Main Office"
+DEFAULT_START = "09:00"
+DEFAULT_WORKING_HOURS = 8
+TTL_SECONDS = 60
+# A punch up to this long before a shift starts or after it ends still belongs to it
+SHIFT_SLACK_HOURS = 6
+ALL_WEEKDAYS = list(range(7))
+
+# All datetimes are naive UTC, like punchInTime/punchOutTime
+ShiftWindow = namedtuple("ShiftWindow", "shift_id start end late_after working_hours")
+
+_snapshot = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def parse_hhmm(value):
+    hour, minute = map(int, str(value).split(":")[:2])
+    return time(hour, minute)
+
+
+def parse_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def validate_shift(data):
+    """
+    Normalize a shift definition from the API.
+    Raises: ValueError with a readable message
+    """
+    shift_id = str(data.get("shiftId") or data.get("_id") or "").strip().upper()
+    if not shift_id:
+        raise ValueError("shiftId is required")
+    try:
+        start = parse_hhmm(data["start"])
+        end = parse_hhmm(data.get("end") or data["start"])
+    except (KeyError, ValueError):
+        raise ValueError("start (and end) must be HH:MM")
+    tz_name = data.get("timezone", "UTC")
+    try:
+        if not isinstance(tz_name, str):
+            raise ValueError(tz_name)
+        ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {tz_name}")
+
+    try:
+        weekdays = sorted({int(d) for d in data.get("weekdays", ALL_WEEKDAYS)})
+    except (TypeError, ValueError):
+        raise ValueError("weekdays must be a list of day numbers")
+    if any(d < 0 or d > 6 for d in weekdays):
+        raise ValueError("weekdays are 0 (Monday) to 6 (Sunday)")
+
+    default_hours = ((datetime.combine(date.min, end) - datetime.combine(date.min, start)).seconds / 3600) \
+        if end != start else DEFAULT_WORKING_HOURS
+    try:
+        grace_minutes = int(data.get("graceMinutes", 0))
+        working_hours = float(data.get("workingHours", default_hours))
+    except (TypeError, ValueError):
+        raise ValueError("graceMinutes and workingHours must be numbers")
+    return {
+        "_id": shift_id,
+        "name": data.get("name", shift_id),
+        "start": start.strftime("%H:%M"),
+        "end": end.strftime("%H:%M"),
+        "timezone": tz_name,
+        "graceMinutes": grace_minutes,
+        "workingHours": working_hours,
+        "weekdays": weekdays
+    }
+
+
+def office_shift(branch, office_config=None):
+    """The implicit shift for a branch without roster assignments"""
+    office_config = office_config or {}
+    start = office_config.get("officeStartTime") or DEFAULT_START
+    if isinstance(start, time):
+        start = start.strftime("%H:%M")
+    hours = office_config.get("workingHours", DEFAULT_WORKING_HOURS)
+    end = (datetime.combine(date.min, parse_hhmm(start)) + timedelta(hours=hours)).strftime("%H:%M")
+    return {
+        "_id": f"OFFICE:{branch}",
+        "name": f"{branch} office hours",
+        "start": start,
+        "end": end,
+        "timezone": office_config.get("timezone", "UTC"),
+        "graceMinutes": 0,
+        "workingHours": hours,
+        "weekdays": ALL_WEEKDAYS
+    }
+
+
+class Roster:
+    """Shifts and assignments in memory, with per-day windows memoized"""
+
+    def __init__(self, shifts, assignments, office_configs=None):
+        self.shifts = {s["_id"]: s for s in shifts}
+        for branch, config in (office_configs or {}).items():
+            shift = office_shift(branch, config)
+            self.shifts[shift["_id"]] = shift
+        self.shifts.setdefault(f"OFFICE:{DEFAULT_BRANCH}", office_shift(DEFAULT_BRANCH))
+
+        # owner -> parallel lists of (from ordinal, to ordinal, shift id), sorted by start
+        self.by_employee = {}
+        self.by_branch = {}
+        for a in assignments:
+            if a.get("shiftId") not in self.shifts:
+                continue
+            start = parse_day(a["effectiveFrom"]).toordinal() if a.get("effectiveFrom") else date.min.toordinal()
+            end = parse_day(a["effectiveTo"]).toordinal() if a.get("effectiveTo") else date.max.toordinal()
+            if a.get("employeeId"):
+                owner = self.by_employee.setdefault(a["employeeId"], [])
+            elif a.get("branch"):
+                owner = self.by_branch.setdefault(a["branch"], [])
+            else:
+                continue
+            owner.append((start, end, a["shiftId"]))
+        for table in (self.by_employee, self.by_branch):
+            for owner, spans in table.items():
+                spans.sort()
+                table[owner] = ([s for s, _, _ in spans], spans)
+
+        self._windows = {}
+        self._days = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pick(spans, ordinal):
+        """Latest assignment starting on or before the day that still covers it"""
+        starts, entries = spans
+        i = bisect_right(starts, ordinal)
+        while i > 0:
+            i -= 1
+            _, end, shift_id = entries[i]
+            if ordinal <= end:
+                return shift_id
+        return None
+
+    def shift_id(self, employee_id, day, branch=DEFAULT_BRANCH):
+        ordinal = parse_day(day).toordinal()
+        if employee_id in self.by_employee:
+            shift_id = self._pick(self.by_employee[employee_id], ordinal)
+            if shift_id:
+                return shift_id
+        if branch in self.by_branch:
+            shift_id = self._pick(self.by_branch[branch], ordinal)
+            if shift_id:
+                return shift_id
+        office = f"OFFICE:{branch}"
+        return office if office in self.shifts else f"OFFICE:{DEFAULT_BRANCH}"
+
+    def shift_window(self, shift_id, day):
+        """ShiftWindow for a shift on a local calendar day, or None on its days off"""
+        key = (shift_id, day)
+        window = self._windows.get(key, False)
+        if window is not False:
+            return window
+
+        shift = self.shifts[shift_id]
+        window = None
+        if day.weekday() in shift["weekdays"]:
+            tz = ZoneInfo(shift["timezone"])
+            start_local = datetime.combine(day, parse_hhmm(shift["start"]), tzinfo=tz)
+            end_local = datetime.combine(day, parse_hhmm(shift["end"]), tzinfo=tz)
+            if end_local <= start_local:
+                # Overnight shift ends the next morning
+                end_local = datetime.combine(day + timedelta(days=1), parse_hhmm(shift["end"]), tzinfo=tz)
+            start = start_local.astimezone(timezone.utc).replace(tzinfo=None)
+            end = end_local.astimezone(timezone.utc).replace(tzinfo=None)
+            window = ShiftWindow(shift_id, start, end,
+                                 start + timedelta(minutes=shift["graceMinutes"]), shift["workingHours"])
+        with self._lock:
+            self._windows[key] = window
+        return window
+
+    def window(self, employee_id, day, branch=DEFAULT_BRANCH):
+        """Expected shift for an employee on a local calendar day (None = day off)"""
+        day = parse_day(day)
+        return self.shift_window(self.shift_id(employee_id, day, branch), day)
+
+    def window_for_punch(self, employee_id, punch_in, branch=DEFAULT_BRANCH):
+        """
+        The shift a punch-in belongs to: the latest shift (starting the day
+        before, the day of, or the day after the punch) that the punch falls
+        within, give or take SHIFT_SLACK_HOURS. Handles time zones and
+        overnight shifts.
+        Returns: ShiftWindow or None if the employee isn't rostered around then
+        """
+        if not punch_in:
+            return None
+        day = punch_in.date()
+        slack = timedelta(hours=SHIFT_SLACK_HOURS)
+        match = None
+        for offset in (-1, 0, 1):
+            window = self.window(employee_id, day + timedelta(days=offset), branch)
+            if window and window.start - slack <= punch_in <= window.end + slack:
+                match = window
+        return match
+
+    def day_table(self, day):
+        """
+        Every explicitly rostered employee's window for a day, plus the
+        branch defaults under "*<branch>". Built once per day per snapshot.
+        """
+        day = parse_day(day)
+        table = self._days.get(day)
+        if table is None:
+            table = {
+                employee_id: self.window(employee_id, day)
+                for employee_id in self.by_employee
+            }
+            branches = {s[len("OFFICE:"):] for s in self.shifts if s.startswith("OFFICE:")} | set(self.by_branch)
+            for branch in branches:
+                table["*" + branch] = self.window(None, day, branch)
+            with self._lock:
+                self._days[day] = table
+        return table
+
+
+def load(database):
+    """Read shifts, assignments and office hours into a Roster"""
+    offices = {
+        c["branch_name"]: c
+        for c in database.office_config.find(
+            {}, {"branch_name": 1, "officeStartTime": 1, "workingHours": 1, "timezone": 1}
+        )
+        if c.get("branch_name")
+    }
+    return Roster(list(database.shifts.find()), list(database.roster_assignments.find()), offices)
+
+
+def current():
+    """The cached roster snapshot, reloaded after TTL_SECONDS"""
+    global _snapshot, _loaded_at
+    now = clock.monotonic()
+    with _lock:
+        if _snapshot is not None and now - _loaded_at < TTL_SECONDS:
+            return _snapshot
+    roster = load(db)
+    with _lock:
+        _snapshot, _loaded_at = roster, now
+    return roster
+
+
+def invalidate():
+    """Drop the snapshot so the next lookup reloads shifts and assignments"""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def shift_for(employee_id, punch_in, branch=DEFAULT_BRANCH):
+    return current().window_for_punch(employee_id, punch_in, branch)
+
+
+def window_doc(window):
+    if window is None:
+        return None
+    return {
+        "shiftId": window.shift_id,
+        "start": window.start,
+        "end": window.end,
+        "lateAfter": window.late_after,
+        "workingHours": window.working_hours
+    }
+
+
+def day_doc(roster, day):
+    """A day table as {windows: {shift id: window}, employees: {owner: shift id}}; days off are left out"""
+    windows, employees = {}, {}
+    for owner, window in roster.day_table(day).items():
+        if window is None:
+            continue
+        windows[window.shift_id] = window_doc(window)
+        employees[owner] = window.shift_id
+    return {"windows": windows, "employees": employees}
+
+
+def precompute(database, start, days):
+    """
+    Write day tables to `roster_days` (one document per day: shift windows
+    plus employee -> shift id). Returns: number of days written
+    """
+    from pymongo import ReplaceOne
+
+    roster = load(database)
+    ops = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        ops.append(ReplaceOne(
+            {"_id": day.isoformat()},
+            {"_id": day.isoformat(), **day_doc(roster, day), "builtAt": datetime.utcnow()},
+            upsert=True
+        ))
+    if ops:
+        database.roster_days.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def export(database, start, days):
+    """
+    Day tables as JSON-ready data for readers without Mongo access (payroll):
+    {"employees": [...rostered ids], "days": {"YYYY-MM-DD": day_doc}}, times as naive-UTC ISO strings.
+    Employees listed but absent from a day's table are off that day.
+    """
+    roster = load(database)
+    exported = {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        doc = day_doc(roster, day)
+        for window in doc["windows"].values():
+            for field in ("start", "end", "lateAfter"):
+                window[field] = window[field].isoformat()
+        exported[day.isoformat()] = doc
+    return {"employees": sorted(roster.by_employee), "days": exported}
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m services.roster_service --precompute [--start YYYY-MM-DD] [--days 31]
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shift roster tools")
+    parser.add_argument("--precompute", action="store_true", help="Write day tables to roster_days")
+    parser.add_argument("--export", type=str, help="Write day tables to this JSON file (for payroll --roster)")
+    parser.add_argument("--start", type=str, help="First day (default: today, UTC)")
+    parser.add_argument("--days", type=int, default=31, help="Number of days")
+    args = parser.parse_args()
+
+    start = parse_day(args.start) if args.start else datetime.utcnow().date()
+    if args.precompute:
+        count = precompute(db, start, args.days)
+        print(f"🗓️ Wrote {count} roster day tables from {start.isoformat()}")
+    elif args.export:
+        with open(args.export, "w") as f:
+            json.dump(export(db, start, args.days), f)
+        print(f"🗓️ Exported {args.days} roster day tables from {start.isoformat()} to {args.export}")
+    else:
+        table = load(db).day_table(start)
+        for owner, window in sorted(table.items()):
+            print(f"{owner}: {window_doc(window)}")
@@ -0,0 +1,58 @@
+"""
+WiFi anomaly detector.
+
+An access point doesn't move: if one BSSID is reported from coordinates far
+apart, either the BSSID is being spoofed or the location is. State is a small
+ring of recent sightings per BSSID, with an LRU cap on BSSIDs tracked.
+"""
+import threading
+from collections import deque
+
+import geo_utils
+from services.gps_service import BoundedLRU, seconds_between
+
+MAX_SPREAD_KM = 1.0
+SPREAD_WINDOW_SECONDS = 7 * 24 * 3600
+
+
+class BssidSpreadDetector:
+    """Flags a BSSID seen at locations further apart than one site can be"""
+
+    def __init__(self, max_spread_km=MAX_SPREAD_KM, window_seconds=SPREAD_WINDOW_SECONDS,
+                 max_bssids=50000, max_sightings=16):
+        self.max_spread_km = max_spread_km
+        self.window_seconds = window_seconds
+        self.max_sightings = max_sightings
+        self._bssids = BoundedLRU(max_bssids)
+        self._lock = threading.Lock()
+
+    def observe(self, employee_id, timestamp, lat, lon, bssid):
+        """
+        Record a sighting and compare it with recent sightings of the same BSSID.
+        Returns: anomaly dict or None
+        """
+        bssid = str(bssid).lower()
+        with self._lock:
+            sightings = self._bssids.get(bssid)
+            if sightings is None:
+                sightings = deque(maxlen=self.max_sightings)
+            recent = [s for s in sightings if seconds_between(s[0], timestamp) <= self.window_seconds]
+            sightings.append((timestamp, lat, lon, employee_id))
+            self._bssids.put(bssid, sightings)
+
+        if not recent:
+            return None
+        distances = [(geo_utils.haversine(s[1], s[2], lat, lon), s) for s in recent]
+        distance_km, farthest = max(distances, key=lambda d: d[0])
+        if distance_km <= self.max_spread_km:
+            return None
+        return {
+            "type": "BSSID_LOCATION_CONFLICT",
+            "employeeId": employee_id,
+            "bssid": bssid,
+            "distanceKm": round(distance_km, 2),
+            "conflictsWith": {"employeeId": farthest[3], "latitude": farthest[1], "longitude": farthest[2], "time": farthest[0]}
+        }
+
+    def size(self):
+        return len(self._bssids)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests run against the in-memory MongoDB and import modules the way app.py does (from backend/)
+os.environ.setdefault("DB_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
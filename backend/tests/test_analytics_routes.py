@@ -0,0 +1,22 @@
+import pytest
+
+from app import app
+
+
+@pytest.mark.parametrize("groups", [
+    {"Engineering": "EMP001"},
+    {"Engineering": 7},
+    {"Engineering": ["EMP001", {"id": "EMP002"}]}
+])
+def test_group_members_must_be_a_list_of_ids(groups):
+    response = app.test_client().post("/api/analytics/hours", json={"groups": groups})
+    assert response.status_code == 400
+    assert "Engineering" in response.get_json()["error"]
+
+
+def test_hours_by_group():
+    response = app.test_client().post("/api/analytics/hours", json={
+        "start": "2025-12-01", "end": "2025-12-31", "groups": {"Engineering": ["EMP001", "EMP002"]}
+    })
+    assert response.status_code == 200
+    assert response.get_json()["groups"]["Engineering"]["employees"] == 2
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from database.mongo import MemoryClient
+from services import archive_service
+
+
+def test_open_shifts_stay_hot():
+    db = MemoryClient().attendance
+    db.attendances.insert_many([
+        {"employeeId": "EMP001", "punchInTime": datetime(2025, 11, 3, 9), "punchOutTime": datetime(2025, 11, 3, 18)},
+        {"employeeId": "EMP001", "punchInTime": datetime(2025, 11, 30, 22)}
+    ])
+
+    assert archive_service.archive_closed_months(db, now=datetime(2025, 12, 1)) == {"2025-11": 1}
+    open_shift = db.attendances.find_one({"employeeId": "EMP001", "punchOutTime": {"$exists": False}})
+    assert open_shift["punchInTime"] == datetime(2025, 11, 30, 22)
+
+    # Closed later, it is archived by the next run
+    db.attendances.update_one({"_id": open_shift["_id"]}, {"$set": {"punchOutTime": datetime(2025, 12, 1, 6)}})
+    assert archive_service.archive_closed_months(db, now=datetime(2025, 12, 1)) == {"2025-11": 1}
+    assert db.attendances.count_documents({}) == 0
+    records = archive_service.load_records(db, "EMP001")
+    assert [r["punchInTime"].day for r in records] == [3, 30]
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+
+from app import app
+from db import attendance_collection, db
+from routes import attendance_routes
+
+
+class ClosedFirst:
+    """Attendance collection where a racing request closes the record between the read and the write"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def update_one(self, filter, update, **kwargs):
+        self._collection.update_one({"_id": filter["_id"]}, {"$set": {"punchOutTime": datetime(2025, 12, 1, 17)}})
+        return self._collection.update_one(filter, update, **kwargs)
+
+
+@pytest.fixture
+def client():
+    attendance_collection.delete_many({})
+    return app.test_client()
+
+
+def test_punch_out_that_loses_a_race_is_409(client, monkeypatch):
+    attendance_collection.insert_one({"employeeId": "EMP001", "punchInTime": datetime(2025, 12, 1, 9)})
+    shifts = []
+    monkeypatch.setattr(attendance_routes, "attendance_collection", ClosedFirst(attendance_collection))
+    monkeypatch.setattr(attendance_routes.hours_cube, "record_shift", lambda *args: shifts.append(args))
+
+    response = client.post("/api/attendance/punch-out", json={"employeeId": "EMP001"})
+    assert response.status_code == 409
+    assert response.get_json()["status"] == "ALREADY_PUNCHED_OUT"
+    assert shifts == []
+    assert attendance_collection.find_one({})["punchOutTime"] == datetime(2025, 12, 1, 17)
+
+
+def test_if_modified_since_alone_never_gets_304(client):
+    record = {"employeeId": "EMP001", "punchInTime": datetime(2025, 12, 1, 9)}
+    attendance_collection.insert_one(record)
+    attendance_routes.http_cache.bump_records(attendance_routes.db, [record])
+    first = client.get("/api/attendance/summary?employeeId=EMP001")
+    assert first.status_code == 200
+
+    # A second write in the same second as the stamp the client saw
+    attendance_routes.http_cache.bump_records(attendance_routes.db, [record])
+    stale = client.get("/api/attendance/summary?employeeId=EMP001",
+                       headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert stale.status_code == 200
+    assert stale.headers["ETag"] != first.headers["ETag"]
+
+    fresh = client.get("/api/attendance/summary?employeeId=EMP001", headers={"If-None-Match": stale.headers["ETag"]})
+    assert fresh.status_code == 304
+
+
+def test_sync_publishes_a_record_closed_in_the_same_batch_once(client, monkeypatch):
+    published = []
+    monkeypatch.setattr(attendance_routes, "get_office_config", lambda: {
+        "location": {"latitude": 12.9716, "longitude": 77.5946, "allowed_radius_meters": 200},
+        "wifi": {"allowed_bssids": ["aa:bb:cc:dd:ee:ff"]}
+    })
+    monkeypatch.setattr(attendance_routes.live_attendance, "publish_record", published.append)
+    event = {"employeeId": "EMP001", "location": {"latitude": 12.9716, "longitude": 77.5946},
+             "wifiBSSID": "AA:BB:CC:DD:EE:FF"}
+
+    response = client.post("/api/attendance/sync", json={"events": [
+        {**event, "clientEventId": "in-1", "type": "PUNCH_IN", "timestamp": "2025-12-01T09:00:00Z"},
+        {**event, "clientEventId": "out-1", "type": "PUNCH_OUT", "timestamp": "2025-12-01T18:00:00Z"}
+    ]})
+    assert response.status_code == 200
+    assert [r["status"] for r in response.get_json()["results"]] == ["PUNCHED_IN", "PUNCHED_OUT"]
+    assert len(published) == 1
+    assert published[0]["punchOutTime"] == datetime(2025, 12, 1, 18)
+
+
+def test_anomaly_without_attendance_id_lists_null(client):
+    db.attendance_anomalies.delete_many({})
+    db.attendance_anomalies.insert_many([
+        {"employeeId": "EMP001", "type": "SHARED_COORDINATES", "detectedAt": datetime(2025, 12, 1, 9)},
+        {"employeeId": "EMP002", "type": "SHARED_COORDINATES", "detectedAt": datetime(2025, 12, 1, 8),
+         "attendanceId": 42}
+    ])
+    anomalies = client.get("/api/attendance/anomalies").get_json()["anomalies"]
+    assert [a["attendanceId"] for a in anomalies] == [None, "42"]
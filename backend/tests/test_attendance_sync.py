@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from database.mongo import MemoryClient
+from services import attendance_sync
+
+OFFICE = {
+    "location": {"latitude": 12.9716, "longitude": 77.5946, "allowed_radius_meters": 200},
+    "wifi": {"allowed_bssids": ["aa:bb:cc:dd:ee:ff"]}
+}
+
+
+class RacingCollection:
+    """Attendance collection where an online punch-out closes every open record just before the sync writes"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def bulk_write(self, ops, ordered=True):
+        self._collection.update_many({"punchOutTime": {"$exists": False}},
+                                     {"$set": {"punchOutTime": datetime(2025, 12, 1, 17, 59)}})
+        return self._collection.bulk_write(ops, ordered=ordered)
+
+
+def punch_in_event(event_id, **overrides):
+    return {"clientEventId": event_id, "type": "PUNCH_IN", "employeeId": "EMP001",
+            "timestamp": "2025-12-01T09:00:00Z", "location": {"latitude": 12.9716, "longitude": 77.5946},
+            "wifiBSSID": "AA:BB:CC:DD:EE:FF", **overrides}
+
+
+def setup_function():
+    attendance_sync._indexes_ready = False
+
+
+def test_punch_out_closed_elsewhere_is_not_reported():
+    collection = MemoryClient().attendance.attendances
+    collection.insert_one({"employeeId": "EMP001", "punchInTime": datetime(2025, 12, 1, 9)})
+    closed = []
+
+    results, inserted, updated = attendance_sync.sync_events(
+        RacingCollection(collection),
+        [{"clientEventId": "out-1", "type": "PUNCH_OUT", "employeeId": "EMP001", "timestamp": "2025-12-01T18:00:00Z"}],
+        OFFICE, on_punch_out=closed.append
+    )
+
+    assert results[0]["status"] == "ALREADY_PUNCHED_OUT"
+    assert (inserted, updated, closed) == ([], 0, [])
+    assert collection.find_one({})["punchOutTime"] == datetime(2025, 12, 1, 17, 59)
+
+
+def test_punch_out_is_reported_once_written():
+    collection = MemoryClient().attendance.attendances
+    collection.insert_one({"employeeId": "EMP001", "punchInTime": datetime(2025, 12, 1, 9)})
+    closed = []
+
+    results, _, updated = attendance_sync.sync_events(
+        collection,
+        [{"clientEventId": "out-1", "type": "PUNCH_OUT", "employeeId": "EMP001", "timestamp": "2025-12-01T18:00:00Z"}],
+        OFFICE, on_punch_out=closed.append
+    )
+
+    assert results[0]["status"] == "PUNCHED_OUT"
+    assert updated == 1
+    assert [r["punchOutEventId"] for r in closed] == ["out-1"]
+
+
+def test_malformed_locations_are_invalid_events():
+    collection = MemoryClient().attendance.attendances
+    events = [
+        punch_in_event("bad-1", location="12.97,77.59"),
+        punch_in_event("bad-2", location={"latitude": "north", "longitude": 77.5946}),
+        punch_in_event("bad-3", location={"latitude": [12.97], "longitude": 77.5946}),
+        punch_in_event("bad-4", wifiBSSID=42),
+        punch_in_event("good", location={"latitude": "12.9716", "longitude": "77.5946"})
+    ]
+
+    results, inserted, _ = attendance_sync.sync_events(collection, events, OFFICE)
+
+    assert [r["status"] for r in results] == ["INVALID_EVENT"] * 4 + ["PUNCHED_IN"]
+    assert inserted[0]["location"] == {"latitude": 12.9716, "longitude": 77.5946}
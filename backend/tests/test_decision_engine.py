@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from services import decision_engine
+
+
+RECORD = {"punchInTime": datetime(2025, 12, 6, 11, 0), "punchOutTime": datetime(2025, 12, 6, 19, 30)}
+
+
+def test_day_off_is_never_late():
+    # Not rostered: the same answer /summary and /today give via is_late_for
+    derived = decision_engine.evaluate_record(RECORD, shift=None)
+    assert derived["isLate"] is decision_engine.is_late_for(RECORD["punchInTime"], None) is False
+    assert derived["status"] == "PRESENT"
+
+
+def test_office_hours_without_roster():
+    derived = decision_engine.evaluate_record(RECORD, office_config={"officeStartTime": "09:00"})
+    assert derived["isLate"] is True
+    assert derived["status"] == "LATE"
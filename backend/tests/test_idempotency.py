@@ -0,0 +1,45 @@
+from flask import Flask, jsonify
+
+from services import idempotency
+from services.idempotency import idempotent
+
+KEY = {"Idempotency-Key": "tap-1"}
+
+
+def make_client(statuses):
+    """App whose /punch answers with the next status in `statuses`; returns (client, calls)"""
+    app = Flask(__name__)
+    calls = []
+
+    @app.route("/punch", methods=["POST"])
+    @idempotent("test-punch")
+    def punch():
+        calls.append(1)
+        status = statuses[len(calls) - 1]
+        return jsonify({"status": status}), status
+
+    return app.test_client(), calls
+
+
+def test_rejected_punch_is_evaluated_again(monkeypatch):
+    monkeypatch.setattr(idempotency, "cache", idempotency.IdempotencyCache())
+    client, calls = make_client([403, 400, 200, 200])
+    body = {"employeeId": "EMP001"}
+
+    assert client.post("/punch", json=body, headers=KEY).status_code == 403
+    assert client.post("/punch", json=body, headers=KEY).status_code == 400
+    assert client.post("/punch", json=body, headers=KEY).status_code == 200
+    replay = client.post("/punch", json=body, headers=KEY)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert len(calls) == 3
+
+
+def test_conflict_is_replayed(monkeypatch):
+    monkeypatch.setattr(idempotency, "cache", idempotency.IdempotencyCache())
+    client, calls = make_client([409, 200])
+    body = {"employeeId": "EMP001"}
+
+    assert client.post("/punch", json=body, headers=KEY).status_code == 409
+    assert client.post("/punch", json=body, headers=KEY).status_code == 409
+    assert len(calls) == 1
@@ -0,0 +1,38 @@
+import threading
+
+from services.live_attendance import AttendanceBroker
+
+
+def publish_in_thread(broker, count):
+    """Publish `count` events off the main thread; returns the (joined or timed-out) thread"""
+    thread = threading.Thread(target=lambda: [broker.publish("punch", {"n": n}) for n in range(count)], daemon=True)
+    thread.start()
+    thread.join(timeout=2)
+    return thread
+
+
+def test_stalled_subscriber_does_not_block_publishers():
+    broker = AttendanceBroker(queue_size=2)
+    stalled = broker.subscribe()  # Never drained
+
+    assert not publish_in_thread(broker, 10).is_alive()
+    assert broker.stats() == {"subscribers": 0, "published": 10, "dropped": 1, "sequence": 10}
+
+    # The stalled client finds the end-of-stream marker once it catches up
+    drained = [stalled.get_nowait() for _ in range(stalled.qsize())]
+    assert drained[-1] is None
+
+
+def test_dropping_a_stalled_subscriber_keeps_the_others():
+    broker = AttendanceBroker(queue_size=2)
+    stalled = broker.subscribe()
+    reader = broker.subscribe()
+
+    for n in range(3):
+        broker.publish("punch", {"n": n})
+        assert reader.get_nowait()[0] == n + 1
+
+    assert broker.stats()["subscribers"] == 1
+    broker.unsubscribe(stalled)
+    broker.unsubscribe(reader)
+    assert broker.stats()["subscribers"] == 0
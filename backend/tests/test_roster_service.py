@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from database.mongo import MemoryClient
+from services import roster_service
+
+
+@pytest.mark.parametrize("data", [
+    {"shiftId": "A", "start": "09:00", "timezone": 5},
+    {"shiftId": "A", "start": "09:00", "timezone": "Mars/Olympus"},
+    {"shiftId": "A", "start": "09:00", "weekdays": 3},
+    {"shiftId": "A", "start": "09:00", "graceMinutes": [10]},
+    {"shiftId": "A", "start": 9}
+])
+def test_invalid_shift_is_a_value_error(data):
+    with pytest.raises(ValueError):
+        roster_service.validate_shift(data)
+
+
+def test_export_lists_rostered_days_only():
+    db = MemoryClient().attendance
+    db.shifts.insert_one(roster_service.validate_shift(
+        {"shiftId": "WEEKDAY", "start": "22:00", "end": "06:00", "timezone": "Asia/Kolkata", "weekdays": [0, 1, 2, 3, 4]}
+    ))
+    db.roster_assignments.insert_one({"employeeId": "EMP001", "shiftId": "WEEKDAY", "effectiveFrom": "2025-12-01"})
+
+    exported = roster_service.export(db, date(2025, 12, 5), 2)  # Friday, Saturday
+    assert exported["employees"] == ["EMP001"]
+    friday, saturday = exported["days"]["2025-12-05"], exported["days"]["2025-12-06"]
+    assert friday["employees"]["EMP001"] == "WEEKDAY"
+    assert friday["windows"]["WEEKDAY"]["start"] == "2025-12-05T16:30:00"
+    assert "EMP001" not in saturday["employees"]
+    assert saturday["employees"]["*Main Office"] == "OFFICE:Main Office"
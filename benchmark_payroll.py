@@ -0,0 +1,302 @@
+"""
+Payroll benchmark on an in-memory Firestore (no credentials, no network).
+
+Record model: computes a synthetic company's payroll two ways and reports
+time and retained memory per employee:
+
+    legacy   the per-employee code calculate_payroll ran before PayrollRecord,
+             kept verbatim in legacy_calculate_payroll: iterrows() Series rows,
+             salary headers matched per field, attendance totals read with
+             .loc, results built and kept as dicts
+    record   the current code: column-wise rows, headers resolved once,
+             attendance from the per-run lookup, results kept as PayrollRecord
+
+Both paths must produce identical figures; both then serialize to JSON.
+
+--end-to-end additionally times full process_payroll runs (fetch, compute,
+PDF rendering into a temp directory) and reports throughput and
+per-employee latency, first with every payslip rendered and then with all
+of them unchanged. --json prints the figures for CI.
+
+Usage:
+    python benchmark_payroll.py --employees 20000
+    python benchmark_payroll.py --employees 2000 --end-to-end --json
+"""
+import io
+import gc
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stderr
+
+from firestore_fake import FakeFirestore
+from payroll_system import PayrollAgent
+from payroll_policy_store import DEFAULT_VERSION
+from payroll_excel import resolve_column
+from payroll_record import json_default
+
+EXTRAS = {'pdf_filename': 'payslip.pdf', 'policy_version': DEFAULT_VERSION, 'status': 'success'}
+STATUSES = ['PRESENT'] * 16 + ['LATE'] * 2 + ['HALF_DAY', 'ABSENT']
+
+
+def seed_firestore(employees, year=2025, month=12, days=22, seed=7):
+    """FakeFirestore holding `employees` employees and `days` attendance records each"""
+    rng = random.Random(seed)
+    staff, attendance = {}, {}
+    for i in range(employees):
+        emp_id = f"EMP{i:06d}"
+        staff[emp_id] = {
+            'emp_id': emp_id,
+            'name': f"Employee {i}",
+            'designation': rng.choice(['Engineer', 'Analyst', 'Manager']),
+            'email': f"{emp_id.lower()}@company.com",
+            'salary': {
+                'basic': rng.randrange(15000, 90000, 500),
+                'hra': rng.randrange(5000, 30000, 500),
+                'other_allow': rng.randrange(0, 10000, 500)
+            }
+        }
+        for day in range(1, days + 1):
+            status = rng.choice(STATUSES)
+            attendance[f"{emp_id}_{day:02d}"] = {
+                'employeeId': emp_id,
+                'date': f"{year}-{month:02d}-{day:02d}",
+                'status': status,
+                'hoursWorked': 0.0 if status == 'ABSENT' else 4.0 if status == 'HALF_DAY' else 8.5
+            }
+    return FakeFirestore().load({'employees': staff, 'attendance': attendance})
+
+
+def new_agent(db, workdir):
+    return PayrollAgent(payslip_output_dir=os.path.join(workdir, 'payslips'),
+                        policy_cache=os.path.join(workdir, 'policy_cache.json'), db=db)
+
+
+def synthetic_agent(db, workdir, year=2025, month=12):
+    """A PayrollAgent with the month loaded from the fake and TDS computed"""
+    agent = new_agent(db, workdir)
+    with redirect_stderr(io.StringIO()):
+        agent.fetch_inputs(year, month)
+        agent.compute_tds()
+    return agent
+
+
+def legacy_calculate_payroll(agent, emp_row):
+    """PayrollAgent.calculate_payroll as it was before PayrollRecord (self -> agent)"""
+    def get_val(row, col_keywords, default=0):
+        col = resolve_column(row.index, col_keywords)
+        return row[col] if col is not None else default
+
+    def get(col_keywords, default=0):
+        return get_val(emp_row, col_keywords, default)
+
+    name = get(['name'])
+    emp_id = get(['code', 'emp_id', 'id'], 'Unknown')
+    designation = get(['designation', 'role'])
+    basic_da = float(get(['basic'], 0))
+    hra = float(get(['hra'], 0))
+    other_allow = float(get(['other_allow', 'allowance'], 0))
+
+    gross_salary = basic_da + hra + other_allow
+
+    days_in_month = agent.data.get('days_in_month', 30)
+    present_days = 0
+    late_days = 0
+    half_days = 0
+    total_hours_worked = 0
+
+    totals = agent.data.get('attendance_totals')
+    if totals is not None and emp_id in totals.index:
+        emp_totals = totals.loc[emp_id]
+        present_days = int(emp_totals['present_days'])
+        late_days = int(emp_totals['late_days'])
+        half_days = int(emp_totals['half_days'])
+        total_hours_worked = float(emp_totals['total_hours_worked'])
+
+    approved_paid_leaves = float(emp_row.get('approved_paid_leaves', 0) or 0)
+    remaining_leaves = float(emp_row.get('leave_balance', 0) or 0)
+
+    payable_days = min(present_days + late_days + (half_days * 0.5) + approved_paid_leaves, days_in_month)
+    lop_days = days_in_month - payable_days
+
+    if payable_days == 0 and gross_salary > 0:
+        payable_days = days_in_month
+        lop_days = 0
+
+    prorated_gross = (gross_salary / days_in_month) * payable_days
+
+    policies = agent.policies
+    pf = min(basic_da * policies['pf_rate'], policies['pf_cap'])
+    esi = prorated_gross * policies['esi_employee_rate'] if prorated_gross <= policies['esi_threshold'] else 0
+    pt = policies['pt_amount'] if prorated_gross > 15000 else 0
+    tds = float(emp_row.get('tds', 0) or 0)
+
+    total_deductions = pf + esi + pt + tds
+
+    encashment = 0
+    if policies['leave_encashment'] and remaining_leaves > 0:
+        encashment = ((basic_da + hra) / 30) * min(remaining_leaves, policies['encash_max_days'])
+
+    net_pay = prorated_gross - total_deductions + encashment
+
+    return {
+        'emp_id': str(emp_id),
+        'name': str(name),
+        'designation': str(designation),
+        'month': f"{agent.data['month']} {agent.data['year']}",
+        'present_days': round(present_days, 1),
+        'late_days': round(late_days, 1),
+        'half_days': round(half_days, 1),
+        'total_hours_worked': round(total_hours_worked, 2),
+        'approved_paid_leaves': round(approved_paid_leaves, 1),
+        'lop_days': round(lop_days, 1),
+        'payable_days': round(payable_days, 1),
+        'remaining_leaves': round(remaining_leaves, 1),
+        'basic_da': round(basic_da, 2),
+        'hra': round(hra, 2),
+        'other_allow': round(other_allow, 2),
+        'gross': round(prorated_gross, 2),
+        'pf': round(pf, 2),
+        'esi': round(esi, 2),
+        'pt': round(pt, 2),
+        'tds': round(tds, 2),
+        'total_deductions': round(total_deductions, 2),
+        'encashment': round(encashment, 2),
+        'net_pay': round(net_pay, 2)
+    }
+
+
+def legacy_results(agent):
+    results = []
+    for _, row in agent.data['salary'].iterrows():
+        payroll = legacy_calculate_payroll(agent, row)
+        payroll['pdf_path'] = f"payslips/{payroll['emp_id']}.pdf"
+        payroll.update(EXTRAS)
+        results.append(payroll)
+    return results
+
+
+def record_results(agent):
+    columns = agent.payroll_columns(agent.data['salary'].columns)
+    results = []
+    for row in agent.salary_rows():
+        payroll = agent.calculate_payroll(row, columns)
+        payroll.pdf_path = f"payslips/{payroll.emp_id}.pdf"
+        for field, value in EXTRAS.items():
+            setattr(payroll, field, value)
+        results.append(payroll)
+    return results
+
+
+def measure(build, agent):
+    """(results, compute seconds, retained bytes, serialize seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    results = build(agent)
+    compute = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    json.dumps({'results': results}, default=json_default)
+    serialize = time.perf_counter() - start
+    return results, compute, retained, serialize
+
+
+def timed(build, agent, repeat):
+    """Best-of-`repeat` compute time without tracemalloc overhead"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(agent)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else 0.0
+
+
+def end_to_end(db, workdir, n, year=2025, month=12):
+    """Timings of a full process_payroll run: (label, figures) for a cold and a warm run"""
+    agent = new_agent(db, workdir)
+    for label in ('rendered', 'unchanged'):
+        stamps = []
+        start = time.perf_counter()
+        with redirect_stderr(io.StringIO()):
+            result = agent.process_payroll(year, month, on_result=lambda r: stamps.append(time.perf_counter()))
+        seconds = time.perf_counter() - start
+        if not result['success'] or result['processed'] != n:
+            print(f"❌ Payroll run failed: {result.get('error') or result['errors'][:3]}", file=sys.stderr)
+            sys.exit(1)
+        latencies = [(b - a) * 1000 for a, b in zip(stamps, stamps[1:])]
+        yield label, {
+            'seconds': round(seconds, 3),
+            'employees_per_second': round(n / seconds, 1),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'payslips_rendered': agent.payslips_rendered
+        }
+        agent.payslips_rendered = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark payroll on an in-memory Firestore')
+    parser.add_argument('--employees', type=int, default=10000, help='Synthetic headcount')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (best is reported)')
+    parser.add_argument('--end-to-end', action='store_true', help='Also time full process_payroll runs with PDFs')
+    parser.add_argument('--json', action='store_true', help='Print the figures as JSON')
+    args = parser.parse_args()
+    n = args.employees
+
+    print(f"🏗️ Seeding an in-memory Firestore with {n} employees...", file=sys.stderr)
+    db = seed_firestore(n)
+    workdir = tempfile.mkdtemp(prefix='payroll_bench_')
+    agent = synthetic_agent(db, workdir)
+    report, results = {'employees': n}, {}
+
+    for label, build in [('legacy', legacy_results), ('record', record_results)]:
+        results[label], _, retained, serialize = measure(build, agent)
+        compute = timed(build, agent, args.repeat)
+        report[label] = {
+            'us_per_employee': round(compute / n * 1e6, 2),
+            'bytes_per_employee': round(retained / n),
+            'serialize_us_per_employee': round(serialize / n * 1e6, 2)
+        }
+        if not args.json:
+            print(f"⏱️ {label:<6}  {compute / n * 1e6:8.1f} µs/employee compute   "
+                  f"{retained / n:8.0f} B/employee retained   "
+                  f"{serialize / n * 1e6:6.1f} µs/employee serialize")
+
+    if [dict(r) for r in results['record']] != results['legacy']:
+        print("❌ Record path produced different payroll figures", file=sys.stderr)
+        sys.exit(1)
+    legacy, record = report['legacy'], report['record']
+    if not args.json:
+        print(f"✅ Identical results. Compute {legacy['us_per_employee'] / record['us_per_employee']:.1f}x faster, "
+              f"{1 - record['bytes_per_employee'] / legacy['bytes_per_employee']:.0%} less memory per employee")
+
+    if args.end_to_end:
+        for label, figures in end_to_end(db, workdir, n):
+            report[f"end_to_end_{label}"] = figures
+            if not args.json:
+                print(f"🚀 process_payroll ({label}): {figures['employees_per_second']} employees/s, "
+                      f"p50 {figures['p50_ms']} ms, p95 {figures['p95_ms']} ms, p99 {figures['p99_ms']} ms "
+                      f"per employee, {figures['payslips_rendered']} PDFs rendered")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Batched Firestore writes for seeding and migration scripts.
+
+Operations are grouped into WriteBatches (max 500 writes each) and committed
+from a thread pool, with a bounded number of batches in flight so arbitrarily
+large generators don't have to fit in memory.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def _commit(db, ops):
+    batch = db.batch()
+    for op in ops:
+        kind, ref = op[0], op[1]
+        if kind == 'set':
+            batch.set(ref, op[2])
+        elif kind == 'merge':
+            batch.set(ref, op[2], merge=True)
+        elif kind == 'update':
+            batch.update(ref, op[2])
+        elif kind == 'delete':
+            batch.delete(ref)
+        else:
+            raise ValueError(f"Unknown write operation: {kind}")
+    batch.commit()
+    return len(ops)
+
+
+def commit_batches(db, operations, batch_size=FIRESTORE_BATCH_LIMIT, workers=8, on_commit=None):
+    """
+    Apply write operations in parallel batches.
+    Args:
+        operations: iterable of ('set' | 'merge' | 'update', ref, data) or ('delete', ref)
+        batch_size: Writes per batch (Firestore allows at most 500)
+        workers: Batches committed concurrently
+        on_commit: Optional callback(ops) after each batch commits
+    Returns: number of operations committed
+    """
+    batch_size = min(batch_size, FIRESTORE_BATCH_LIMIT)
+    committed = 0
+    pending = {}
+
+    def drain(return_when):
+        nonlocal committed
+        done, _ = wait(list(pending), return_when=return_when)
+        for future in done:
+            ops = pending.pop(future)
+            committed += future.result()
+            if on_commit:
+                on_commit(ops)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunk = []
+        for op in operations:
+            chunk.append(op)
+            if len(chunk) >= batch_size:
+                pending[pool.submit(_commit, db, chunk)] = chunk
+                chunk = []
+                if len(pending) >= workers * 2:
+                    drain(FIRST_COMPLETED)
+        if chunk:
+            pending[pool.submit(_commit, db, chunk)] = chunk
+        while pending:
+            drain(FIRST_COMPLETED)
+
+    return committed
+
+
+def delete_query(db, query, batch_size=FIRESTORE_BATCH_LIMIT, workers=8):
+    """Delete every document matched by a query using batched deletes"""
+    return commit_batches(db, (('delete', doc.reference) for doc in query.stream()), batch_size, workers)
@@ -0,0 +1,523 @@
+"""
+In-memory Firestore for offline runs, tests and benchmarks.
+
+Covers the google-cloud-firestore client surface the payroll scripts use:
+
+    db.collection(name).where(field, op, value)...order_by().limit().stream() / .get()
+    collection.document(id).get() / set(data, merge=) / update() / create() / delete()
+    collection.add(data), db.batch() ... commit(), db.get_all(refs)
+
+with Firestore's semantics where they change results: documents stream in
+document-id order, filters and order_by skip documents missing the field,
+range filters only match values of the same type, `!=` / `not-in` exclude
+nulls, set(merge=True) deep-merges maps, set(merge=[paths]) writes only the
+listed dotted field paths, update() takes dotted field paths,
+and Increment / ArrayUnion / ArrayRemove / Maximum / Minimum /
+SERVER_TIMESTAMP / DELETE_FIELD are applied as on the server. Batches apply
+atomically and reject more than 500 writes. Data is copied in and out, and
+naive datetimes read back as UTC.
+
+    from firestore_fake import FakeFirestore
+    db = FakeFirestore()
+    db.load({'employees': {'EMP001': {'emp_id': 'EMP001', 'salary': {...}}}})
+    agent = PayrollAgent(db=db)
+"""
+import random
+import string
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from google.api_core.exceptions import AlreadyExists, InvalidArgument, NotFound
+from google.cloud.firestore_v1.transforms import (
+    ArrayRemove, ArrayUnion, DELETE_FIELD, Increment, Maximum, Minimum, SERVER_TIMESTAMP
+)
+
+BATCH_LIMIT = 500
+ID_ALPHABET = string.ascii_letters + string.digits
+
+WriteResult = namedtuple('WriteResult', ['update_time'])
+_MISSING = object()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _store(value):
+    """Copy a value the way Firestore round-trips it"""
+    if isinstance(value, dict):
+        return {k: _store(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_store(v) for v in value]
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _type_rank(value):
+    """Firestore's cross-type ordering; range filters only match within one rank"""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, DocumentReference):
+        return 6
+    if isinstance(value, list):
+        return 8
+    if isinstance(value, dict):
+        return 9
+    return 7
+
+
+def _lookup(data, field_path):
+    value = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _equal(a, b):
+    return _type_rank(a) == _type_rank(b) and a == b
+
+
+def _compare(op, value, target):
+    if _type_rank(value) != _type_rank(target):
+        return False
+    if isinstance(value, DocumentReference):
+        value, target = value.path, target.path
+    try:
+        if op == '<':
+            return value < target
+        if op == '<=':
+            return value <= target
+        if op == '>':
+            return value > target
+        return value >= target
+    except TypeError:
+        return False
+
+
+def _matches(data, field_path, op, target):
+    value = _lookup(data, field_path)
+    if value is _MISSING:
+        return False
+    if op == '==':
+        return _equal(value, target)
+    if op == '!=':
+        return value is not None and not _equal(value, target)
+    if op in ('<', '<=', '>', '>='):
+        return _compare(op, value, target)
+    if op == 'in':
+        return any(_equal(value, t) for t in target)
+    if op == 'not-in':
+        return value is not None and not any(_equal(value, t) for t in target)
+    if op == 'array_contains':
+        return isinstance(value, list) and any(_equal(v, target) for v in value)
+    if op == 'array_contains_any':
+        return isinstance(value, list) and any(_equal(v, t) for v in value for t in target)
+    raise ValueError(f"Operator string {op!r} is invalid")
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if isinstance(value, DocumentReference):
+        value = value.path
+    elif rank in (0, 7, 8, 9):
+        value = repr(value)
+    return rank, value
+
+
+def _put(target, key, value):
+    """Write one field, applying server-side transforms against its current value"""
+    current = target.get(key, _MISSING)
+    if value is DELETE_FIELD:
+        target.pop(key, None)
+    elif value is SERVER_TIMESTAMP:
+        target[key] = _now()
+    elif isinstance(value, Increment):
+        target[key] = current + value.value if isinstance(current, (int, float)) and not isinstance(current, bool) \
+            else value.value
+    elif isinstance(value, (Maximum, Minimum)):
+        if not isinstance(current, (int, float)) or isinstance(current, bool):
+            target[key] = value.value
+        else:
+            target[key] = max(current, value.value) if isinstance(value, Maximum) else min(current, value.value)
+    elif isinstance(value, ArrayUnion):
+        items = list(current) if isinstance(current, list) else []
+        items += [_store(v) for v in value.values if not any(_equal(v, i) for i in items)]
+        target[key] = items
+    elif isinstance(value, ArrayRemove):
+        items = current if isinstance(current, list) else []
+        target[key] = [i for i in items if not any(_equal(i, v) for v in value.values)]
+    elif isinstance(value, dict):
+        target[key] = _merge({}, value)
+    else:
+        target[key] = _store(value)
+
+
+def _put_path(target, field_path, value):
+    """Write one dotted field path, creating intermediate maps"""
+    parts = field_path.split('.')
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    _put(target, parts[-1], value)
+
+
+def _merge(target, updates):
+    """Deep-merge `updates` into `target` (set(..., merge=True) semantics)"""
+    for key, value in updates.items():
+        if isinstance(value, dict) and value:
+            child = target.get(key)
+            target[key] = _merge(dict(child) if isinstance(child, dict) else {}, value)
+        else:
+            _put(target, key, value)
+    return target
+
+
+class DocumentSnapshot:
+    """A document as read at one point in time"""
+
+    def __init__(self, reference, data, create_time=None, update_time=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = _now()
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return _copy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        value = _lookup(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(f"{field_path!r} is not contained in the data")
+        return _copy(value)
+
+
+class DocumentReference:
+    """Reference to one document path"""
+
+    def __init__(self, client, collection_path, document_id):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = document_id
+
+    @property
+    def path(self):
+        return f"{self._collection_path}/{self.id}"
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self._collection_path)
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other._client is self._client and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return f"DocumentReference({self.path!r})"
+
+    def collection(self, collection_id):
+        return CollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def get(self, field_paths=None):
+        return self._client._snapshot(self, field_paths)
+
+    def set(self, document_data, merge=False):
+        batch = self._client.batch()
+        batch.set(self, document_data, merge=merge)
+        return batch.commit()[0]
+
+    def create(self, document_data):
+        batch = self._client.batch()
+        batch.create(self, document_data)
+        return batch.commit()[0]
+
+    def update(self, field_updates):
+        batch = self._client.batch()
+        batch.update(self, field_updates)
+        return batch.commit()[0]
+
+    def delete(self):
+        batch = self._client.batch()
+        batch.delete(self)
+        return batch.commit()[0].update_time
+
+
+class Query:
+    """Immutable query: each where / order_by / limit returns a new one"""
+
+    ASCENDING = 'ASCENDING'
+    DESCENDING = 'DESCENDING'
+
+    def __init__(self, client, collection_path, filters=(), orders=(), limit=None, offset=0, fields=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._fields = fields
+
+    def _copy_with(self, **changes):
+        params = dict(filters=self._filters, orders=self._orders, limit=self._limit,
+                      offset=self._offset, fields=self._fields)
+        params.update(changes)
+        return Query(self._client, self._collection_path, **params)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in ('==', '!=', '<', '<=', '>', '>=', 'in', 'not-in', 'array_contains', 'array_contains_any'):
+            raise ValueError(f"Operator string {op_string!r} is invalid")
+        return self._copy_with(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy_with(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy_with(limit=count)
+
+    def offset(self, num_to_skip):
+        return self._copy_with(offset=num_to_skip)
+
+    def select(self, field_paths):
+        return self._copy_with(fields=list(field_paths))
+
+    def stream(self, transaction=None):
+        snapshots = self._client._query(self)
+        return iter(snapshots)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    """A collection; also the unfiltered query over it"""
+
+    def __init__(self, client, path):
+        super().__init__(client, path)
+
+    @property
+    def id(self):
+        return self._collection_path.rsplit('/', 1)[-1]
+
+    def document(self, document_id=None):
+        if document_id is None:
+            document_id = ''.join(random.choices(ID_ALPHABET, k=20))
+        return DocumentReference(self._client, self._collection_path, str(document_id))
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        return ref.create(document_data).update_time, ref
+
+    def list_documents(self, page_size=None):
+        with self._client._lock:
+            ids = list(self._client._collection(self._collection_path))
+        return [self.document(i) for i in sorted(ids)]
+
+
+class WriteBatch:
+    """Writes applied together on commit (all or nothing)"""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference, document_data, merge=False):
+        if merge not in (True, False):
+            merge = list(merge)
+            missing = [p for p in merge if _lookup(document_data, p) is _MISSING]
+            if missing:
+                raise ValueError(f"Field paths not in document data: {', '.join(missing)}")
+        self._writes.append(('set', reference, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference, document_data, False))
+
+    def update(self, reference, field_updates):
+        self._writes.append(('update', reference, field_updates, False))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference, None, False))
+
+    def commit(self):
+        if len(self._writes) > BATCH_LIMIT:
+            raise InvalidArgument(f"maximum {BATCH_LIMIT} writes allowed per request")
+        results = self._client._commit(self._writes)
+        self._writes = []
+        return results
+
+
+class FakeFirestore:
+    """Drop-in for firestore.client() holding every collection in memory"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.RLock()
+
+    # ---- client API ----
+    def collection(self, collection_path):
+        return CollectionReference(self, collection_path)
+
+    def collections(self):
+        with self._lock:
+            return [CollectionReference(self, p) for p in sorted(self._collections) if '/' not in p]
+
+    def document(self, document_path):
+        collection_path, document_id = document_path.rsplit('/', 1)
+        return DocumentReference(self, collection_path, document_id)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        for ref in references:
+            yield self._snapshot(ref, field_paths)
+
+    def close(self):
+        pass
+
+    # ---- seeding / inspection ----
+    def load(self, collections):
+        """Bulk-load {collection_path: {document_id: data}} without batch limits"""
+        now = _now()
+        with self._lock:
+            for path, documents in collections.items():
+                stored = self._collection(path)
+                for document_id, data in documents.items():
+                    stored[str(document_id)] = {'data': _merge({}, data), 'created': now, 'updated': now}
+        return self
+
+    def dump(self, collection_path):
+        """{document_id: data} for one collection"""
+        with self._lock:
+            return {i: _copy(d['data']) for i, d in sorted(self._collection(collection_path).items())}
+
+    # ---- internals ----
+    def _collection(self, path):
+        return self._collections.setdefault(path, {})
+
+    def _snapshot(self, ref, field_paths=None):
+        with self._lock:
+            doc = self._collection(ref._collection_path).get(ref.id)
+            if doc is None:
+                return DocumentSnapshot(ref, None)
+            data = doc['data']
+            if field_paths is not None:
+                data = _select(data, field_paths)
+            return DocumentSnapshot(ref, _copy(data), doc['created'], doc['updated'])
+
+    def _query(self, query):
+        with self._lock:
+            stored = self._collection(query._collection_path)
+            docs = [
+                (document_id, doc) for document_id, doc in sorted(stored.items())
+                if all(_matches(doc['data'], f, op, v) for f, op, v in query._filters)
+            ]
+            for field_path, direction in reversed(query._orders):
+                docs = [(i, d) for i, d in docs if _lookup(d['data'], field_path) is not _MISSING]
+                docs.sort(key=lambda item: _sort_key(_lookup(item[1]['data'], field_path)),
+                          reverse=direction == Query.DESCENDING)
+            docs = docs[query._offset:]
+            if query._limit is not None:
+                docs = docs[:query._limit]
+            return [
+                DocumentSnapshot(
+                    DocumentReference(self, query._collection_path, document_id),
+                    _copy(_select(doc['data'], query._fields) if query._fields is not None else doc['data']),
+                    doc['created'], doc['updated']
+                )
+                for document_id, doc in docs
+            ]
+
+    def _commit(self, writes):
+        now = _now()
+        with self._lock:
+            # Remember touched documents so a failing write rolls the batch back
+            touched = {}
+            try:
+                for kind, ref, data, merge in writes:
+                    stored = self._collection(ref._collection_path)
+                    touched.setdefault((ref._collection_path, ref.id), stored.get(ref.id))
+                    existing = stored.get(ref.id)
+                    if kind == 'delete':
+                        stored.pop(ref.id, None)
+                        continue
+                    if kind == 'create' and existing is not None:
+                        raise AlreadyExists(f"Document already exists: {ref.path}")
+                    if kind == 'update':
+                        if existing is None:
+                            raise NotFound(f"No document to update: {ref.path}")
+                        fields = _copy(existing['data'])
+                        for field_path, value in data.items():
+                            _put_path(fields, field_path, value)
+                    elif isinstance(merge, list):
+                        # Only the listed paths are written, each replaced whole
+                        fields = _copy(existing['data']) if existing else {}
+                        for field_path in merge:
+                            _put_path(fields, field_path, _lookup(data, field_path))
+                    elif merge and existing is not None:
+                        fields = _merge(_copy(existing['data']), data)
+                    else:
+                        fields = _merge({}, data)
+                    stored[ref.id] = {
+                        'data': fields,
+                        'created': existing['created'] if existing else now,
+                        'updated': now
+                    }
+            except Exception:
+                for (path, document_id), previous in touched.items():
+                    if previous is None:
+                        self._collection(path).pop(document_id, None)
+                    else:
+                        self._collection(path)[document_id] = previous
+                raise
+        return [WriteResult(now) for _ in writes]
+
+
+def _select(data, field_paths):
+    selected = {}
+    for field_path in field_paths:
+        value = _lookup(data, field_path)
+        if value is not _MISSING:
+            target = selected
+            parts = field_path.split('.')
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return selected
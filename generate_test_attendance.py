@@ -1,27 +1,34 @@
 """
 Generate test attendance data for all scenarios (PRESENT, LATE, HALF_DAY, ABSENT)
 This creates realistic test data for presentation/demo purposes
+
+Run without arguments for today's demo scenarios. For load tests, scale it up:
+
+    python generate_test_attendance.py --employees 5000 --days 90 --branches 4 --workers 16
+
+Employees beyond the fixed scenarios are synthetic and draw a random scenario
+(with jittered times) each day. Records are written with batched commits in parallel.
 """
 
+import os
+import sys
+import argparse
 import firebase_admin
 from firebase_admin import credentials, firestore
 from datetime import datetime, timedelta
 import random
 
-# Initialize Firebase
-cred = credentials.Certificate('serviceAccountKey.json')
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from services.decision_engine import classify_day
+from firestore_bulk import commit_batches, delete_query, FIRESTORE_BATCH_LIMIT
 
-db = firestore.client()
+OFFICE_LAT = 12.9716
+OFFICE_LON = 77.5946
+# Branches are spread ~5km apart along the latitude
+BRANCH_SPACING_DEG = 0.045
+# Per-record output is printed only for small runs
+VERBOSE_LIMIT = 50
 
-# Get today's date
-today = datetime.now()
-today_str = today.strftime('%Y-%m-%d')
-
-print(f"🎯 Generating test attendance data for {today_str}...")
-
-# Test scenarios with different employees
 test_scenarios = [
     {
         'employeeId': 'EMP001',
@@ -146,96 +153,106 @@ test_scenarios = [
     }
 ]
 
-def create_timestamp(time_str):
-    """Convert time string '09:00' to ISO timestamp for today"""
+FIRST_NAMES = ['James', 'Priya', 'Wei', 'Fatima', 'Carlos', 'Anna', 'Rahul', 'Yuki', 'Omar', 'Grace']
+LAST_NAMES = ['Kumar', 'Chen', 'Okafor', 'Silva', 'Novak', 'Rao', 'Kim', 'Haddad', 'Brown', 'Iyer']
+DEPARTMENTS = sorted({e['department'] for e in test_scenarios})
+
+STATUS_EMOJI = {
+    'PRESENT': '✅',
+    'LATE': '🟠',
+    'HALF_DAY': '🔵',
+    'ABSENT': '🔴'
+}
+
+
+def build_employees(count, rng):
+    """The fixed demo scenarios first, then synthetic employees (scenario=None: drawn per day)"""
+    employees = [dict(e) for e in test_scenarios[:count]]
+    for i in range(len(employees), count):
+        employees.append({
+            'employeeId': f"EMP{i + 1:03d}",
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'department': rng.choice(DEPARTMENTS),
+            'scenario': None
+        })
+    return employees
+
+
+def shift_time(time_str, minutes):
+    hour, minute = map(int, time_str.split(':'))
+    total = min(max(hour * 60 + minute + minutes, 0), 23 * 60 + 59)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def scenario_for_day(employee, rng):
+    """Fixed employees replay their scenario; synthetic ones draw one with jitter"""
+    if employee['scenario']:
+        return employee
+    template = rng.choice(test_scenarios)
+    day = {**employee, **{k: template[k] for k in ('scenario', 'punchIn', 'punchOut', 'wifi', 'geo', 'hours')}}
+    if day['punchIn']:
+        start_jitter = rng.randint(-15, 15)
+        end_jitter = rng.randint(-15, 15)
+        day['punchIn'] = shift_time(day['punchIn'], start_jitter)
+        day['punchOut'] = shift_time(day['punchOut'], end_jitter)
+        day['hours'] = round(max(template['hours'] + (end_jitter - start_jitter) / 60, 0), 2)
+    return day
+
+
+def create_timestamp(day, time_str):
+    """Convert time string '09:00' to ISO timestamp on the given day"""
     if not time_str:
         return None
     hour, minute = map(int, time_str.split(':'))
-    dt = today.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    dt = day.replace(hour=hour, minute=minute, second=0, microsecond=0)
     return dt.isoformat()
 
 def determine_status(scenario_data):
-    """Determine status based on scenario"""
-    scenario = scenario_data['scenario']
-    wifi = scenario_data['wifi']
-    geo = scenario_data['geo']
-    hours = scenario_data['hours']
+    """Determine status based on scenario (rules live in the backend decision engine)"""
     punch_in = scenario_data['punchIn']
-    
-    # If no punch-in, it's absent
-    if not punch_in:
-        return 'ABSENT'
-    
-    # If validation failed (WiFi OR Geo), always ABSENT
-    if not wifi or not geo:
-        return 'ABSENT'
-    
-    # Based on hours and timing
-    if hours < 4:  # Less than 50% of 8 hours
-        return 'ABSENT'
-    elif 3.5 <= hours <= 4.5:  # Around 4 hours
-        return 'HALF_DAY'
-    elif hours >= 8:
-        # Check if late (after 09:00)
-        if punch_in and punch_in > '09:00':
-            return 'LATE'
-        else:
-            return 'PRESENT'
-    else:
-        return 'HALF_DAY'
+    return classify_day(
+        scenario_data['hours'],
+        late=bool(punch_in) and punch_in > '09:00',
+        wifi_valid=scenario_data['wifi'],
+        geo_valid=scenario_data['geo'],
+        punched_in=bool(punch_in)
+    )
 
-def calculate_distance(is_valid):
+def calculate_distance(is_valid, rng=random):
     """Generate realistic distance based on validation"""
     if is_valid:
-        return random.randint(10, 80)  # Within radius
+        return rng.randint(10, 80)  # Within radius
     else:
-        return random.randint(5000, 15000)  # Outside radius
-
-# Clear existing today's attendance
-print("🗑️  Clearing existing records...")
-existing = db.collection('attendance').where('date', '==', today_str).stream()
-for doc in existing:
-    doc.reference.delete()
-print("✅ Cleared old records")
-
-# Generate test data
-print("\n📝 Creating test scenarios...")
-for employee in test_scenarios:
-    if not employee['punchIn']:
-        # Employee didn't punch in at all - skip creating record
-        print(f"⏭️  {employee['name']} - No attendance (marked absent)")
-        continue
-    
-    status = determine_status(employee)
-    punch_in_time = create_timestamp(employee['punchIn'])
-    punch_out_time = create_timestamp(employee['punchOut']) if employee['punchOut'] else None
-    
-    is_late = employee['punchIn'] > '09:00' if employee['punchIn'] else False
-    distance = calculate_distance(employee['geo'])
-    
-    # Determine validation message
+        return rng.randint(5000, 15000)  # Outside radius
+
+def validation_message(employee, distance, is_late):
     if not employee['wifi'] and not employee['geo']:
-        message = f"Invalid WiFi and Location ({distance}m away)"
+        return f"Invalid WiFi and Location ({distance}m away)"
     elif not employee['wifi']:
-        message = "Invalid WiFi - Punch-in denied"
+        return "Invalid WiFi - Punch-in denied"
     elif not employee['geo']:
-        message = f"Outside office radius ({distance}m away)"
+        return f"Outside office radius ({distance}m away)"
     elif is_late:
-        message = f"Punch-in successful - Late arrival ({distance}m from office)"
+        return f"Punch-in successful - Late arrival ({distance}m from office)"
     else:
-        message = f"Punch-in successful - On time ({distance}m from office)"
-    
-    # Create attendance record
-    attendance_data = {
-        'date': today_str,
+        return f"Punch-in successful - On time ({distance}m from office)"
+
+def build_record(employee, day, status, rng, branch=None):
+    """Attendance document for one employee-day"""
+    is_late = employee['punchIn'] > '09:00' if employee['punchIn'] else False
+    distance = calculate_distance(employee['geo'], rng)
+    office_lat = OFFICE_LAT + (branch or 0) * BRANCH_SPACING_DEG
+
+    record = {
+        'date': day.strftime('%Y-%m-%d'),
         'employeeId': employee['employeeId'],
         'employeeName': employee['name'],
         'department': employee['department'],
-        'punchInTime': punch_in_time,
-        'punchOutTime': punch_out_time,
+        'punchInTime': create_timestamp(day, employee['punchIn']),
+        'punchOutTime': create_timestamp(day, employee['punchOut']) if employee['punchOut'] else None,
         'location': {
-            'latitude': 12.9716 if employee['geo'] else 13.5,
-            'longitude': 77.5946 if employee['geo'] else 80.2,
+            'latitude': office_lat if employee['geo'] else 13.5,
+            'longitude': OFFICE_LON if employee['geo'] else 80.2,
         },
         'wifiBSSID': '02:00:00:00:00:00' if employee['wifi'] else 'aa:bb:cc:dd:ee:ff',
         'status': status,
@@ -245,39 +262,125 @@ for employee in test_scenarios:
             'wifi': employee['wifi'],
             'geo': employee['geo'],
             'distance_meters': distance,
-            'message': message
+            'message': validation_message(employee, distance, is_late)
         }
     }
-    
-    # Add to Firestore
-    db.collection('attendance').add(attendance_data)
-    
-    # Print status
-    status_emoji = {
-        'PRESENT': '✅',
-        'LATE': '🟠',
-        'HALF_DAY': '🔵',
-        'ABSENT': '🔴'
-    }
-    print(f"{status_emoji.get(status, '❓')} {employee['name']:20} - {status:10} ({employee['hours']}h) - WiFi:{employee['wifi']} Geo:{employee['geo']}")
-
-print("\n" + "="*60)
-print("🎉 Test data generated successfully!")
-print("="*60)
-
-# Print summary
-total = len([e for e in test_scenarios if e['punchIn']])
-present_count = len([e for e in test_scenarios if determine_status(e) in ['PRESENT', 'LATE']])
-absent_count = len([e for e in test_scenarios if determine_status(e) == 'ABSENT'])
-half_day_count = len([e for e in test_scenarios if determine_status(e) == 'HALF_DAY'])
-late_count = len([e for e in test_scenarios if determine_status(e) == 'LATE'])
-
-print(f"\n📊 Summary:")
-print(f"   Total Records: {total}")
-print(f"   ✅ Present: {present_count - late_count}")
-print(f"   🟠 Late: {late_count}")
-print(f"   🔵 Half Day: {half_day_count}")
-print(f"   🔴 Absent: {absent_count}")
-print(f"   📈 Attendance Rate: {(present_count / total * 100):.0f}%")
-print(f"\n🌐 Open HR Portal: http://localhost:8080/attendance")
-print("📱 Refresh to see the data!")
+    if branch is not None:
+        record['branch'] = f"Branch {branch + 1}"
+    return record
+
+
+def generate(db, employees, days, branches=1, seed=None, batch_size=FIRESTORE_BATCH_LIMIT, workers=8):
+    """
+    Replace attendance for the date range with generated records.
+    Args:
+        employees: Output of build_employees
+        days: List of datetimes to generate
+        branches: Employees are spread round-robin over this many branches
+    Returns: (statuses per employee-day including no-punch days, records written)
+    """
+    rng = random.Random(seed)
+    collection = db.collection('attendance')
+    verbose = len(employees) * len(days) <= VERBOSE_LIMIT
+    statuses = []
+
+    # Clear existing records for the range
+    print("🗑️  Clearing existing records...")
+    first, last = days[0].strftime('%Y-%m-%d'), days[-1].strftime('%Y-%m-%d')
+    if first == last:
+        query = collection.where('date', '==', first)
+    else:
+        query = collection.where('date', '>=', first).where('date', '<=', last)
+    deleted = delete_query(db, query, batch_size, workers)
+    print(f"✅ Cleared {deleted} old records")
+
+    def operations():
+        for day in days:
+            for index, base in enumerate(employees):
+                employee = scenario_for_day(base, rng)
+                status = determine_status(employee)
+                statuses.append(status)
+                if not employee['punchIn']:
+                    # Employee didn't punch in at all - skip creating record
+                    if verbose:
+                        print(f"⏭️  {employee['name']} - No attendance (marked absent)")
+                    continue
+
+                branch = index % branches if branches > 1 else None
+                yield 'set', collection.document(), build_record(employee, day, status, rng, branch)
+                if verbose:
+                    print(f"{STATUS_EMOJI.get(status, '❓')} {employee['name']:20} - {status:10} ({employee['hours']}h) - WiFi:{employee['wifi']} Geo:{employee['geo']}")
+
+    written = 0
+
+    def progress(ops):
+        nonlocal written
+        written += len(ops)
+        if not verbose:
+            print(f"   ... {written} records written")
+
+    print("\n📝 Creating test scenarios...")
+    commit_batches(db, operations(), batch_size, workers, on_commit=progress)
+    return statuses, written
+
+
+def print_summary(statuses, total):
+    present_count = len([s for s in statuses if s in ['PRESENT', 'LATE']])
+    absent_count = statuses.count('ABSENT')
+    half_day_count = statuses.count('HALF_DAY')
+    late_count = statuses.count('LATE')
+
+    print(f"\n📊 Summary:")
+    print(f"   Total Records: {total}")
+    print(f"   ✅ Present: {present_count - late_count}")
+    print(f"   🟠 Late: {late_count}")
+    print(f"   🔵 Half Day: {half_day_count}")
+    print(f"   🔴 Absent: {absent_count}")
+    print(f"   📈 Attendance Rate: {(present_count / total * 100 if total else 0):.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate test attendance data')
+    parser.add_argument('--employees', type=int, default=len(test_scenarios),
+                        help=f'Employees to generate (first {len(test_scenarios)} are the fixed demo scenarios)')
+    parser.add_argument('--days', type=int, default=1, help='Days of attendance ending on --end-date')
+    parser.add_argument('--end-date', type=str, help='Last day YYYY-MM-DD (default: today)')
+    parser.add_argument('--branches', type=int, default=1, help='Spread employees across this many branches')
+    parser.add_argument('--skip-weekends', action='store_true', help='Do not generate Saturdays/Sundays')
+    parser.add_argument('--batch-size', type=int, default=FIRESTORE_BATCH_LIMIT, help='Writes per batch (max 500)')
+    parser.add_argument('--workers', type=int, default=8, help='Batches committed in parallel')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible data')
+    args = parser.parse_args()
+
+    # Initialize Firebase
+    cred = credentials.Certificate('serviceAccountKey.json')
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(cred)
+
+    db = firestore.client()
+
+    end = datetime.strptime(args.end_date, '%Y-%m-%d') if args.end_date else datetime.now()
+    days = [end - timedelta(days=offset) for offset in range(args.days - 1, -1, -1)]
+    if args.skip_weekends:
+        days = [d for d in days if d.weekday() < 5]
+    if not days:
+        print("❌ No days to generate", file=sys.stderr)
+        sys.exit(1)
+
+    label = days[0].strftime('%Y-%m-%d') if len(days) == 1 else f"{days[0]:%Y-%m-%d} to {days[-1]:%Y-%m-%d}"
+    print(f"🎯 Generating test attendance data for {label}...")
+
+    employees = build_employees(args.employees, random.Random(args.seed))
+    statuses, written = generate(db, employees, days, args.branches, args.seed, args.batch_size, args.workers)
+
+    print("\n" + "="*60)
+    print("🎉 Test data generated successfully!")
+    print("="*60)
+
+    print_summary(statuses, written)
+    print(f"\n🌐 Open HR Portal: http://localhost:8080/attendance")
+    print("📱 Refresh to see the data!")
+
+
+if __name__ == '__main__':
+    main()
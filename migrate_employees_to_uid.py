@@ -1,46 +1,222 @@
+"""
+Re-key employee documents from employee codes (EMP001) to Firebase Auth UIDs.
+
+Users are resolved with batched `auth.get_users` lookups (100 emails per call),
+and each chunk's new documents and old-document deletes are committed in one
+WriteBatch. Chunks run on a small thread pool. Migrated doc IDs are appended
+to a checkpoint file so an interrupted run picks up where it stopped.
+
+    python migrate_employees_to_uid.py --dry-run            # print the plan only
+    python migrate_employees_to_uid.py --workers 8
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
 
-cred = credentials.Certificate("serviceAccountKey.json")
-firebase_admin.initialize_app(cred)
+ADMIN_EMAIL = "hr@company.com"
+# auth.get_users accepts at most 100 identifiers per call
+LOOKUP_LIMIT = 100
+DEFAULT_CHECKPOINT = "migrate_employees_checkpoint.jsonl"
 
-db = firestore.client()
 
-ADMIN_EMAIL = "hr@company.com"
+def is_migrated(doc_id):
+    """UID docs are long; employee-code docs are short"""
+    return len(doc_id) > 10
 
-employees_ref = db.collection("employees")
-old_docs = employees_ref.stream()
 
-for doc in old_docs:
-    data = doc.to_dict()
+def load_checkpoint(path):
+    """Old doc IDs already migrated by a previous run"""
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {json.loads(line)['old'] for line in f if line.strip().endswith('}')}
 
-    # Skip already-migrated UID docs
-    if len(doc.id) > 10:
-        continue
 
-    email = data.get("email")
-    if not email:
-        print(f"❌ Skipping {doc.id} (no email)")
-        continue
+def plan_migration(docs, done=frozenset()):
+    """
+    Split employee docs into work and skips.
+    Returns: (pending [(doc_id, data)], skipped {reason: [doc_id]})
+    """
+    pending, skipped = [], {'migrated': [], 'checkpointed': [], 'no_email': [], 'duplicate_email': []}
+    by_email = {}
+    for doc in docs:
+        if is_migrated(doc.id):
+            skipped['migrated'].append(doc.id)
+            continue
+        if doc.id in done:
+            skipped['checkpointed'].append(doc.id)
+            continue
+        data = doc.to_dict()
+        email = (data.get("email") or '').strip().lower()
+        if not email:
+            skipped['no_email'].append(doc.id)
+            continue
+        by_email.setdefault(email, []).append((doc.id, data))
 
-    try:
-        user = auth.get_user_by_email(email)
-        uid = user.uid
+    for email, entries in by_email.items():
+        # Two employee docs for one login would overwrite each other
+        if len(entries) > 1:
+            skipped['duplicate_email'].extend(doc_id for doc_id, _ in entries)
+        else:
+            pending.append(entries[0])
+    return pending, skipped
+
+
+def resolve_uids(emails):
+    """Map lower-cased email -> UID for up to 100 emails in one Auth call"""
+    result = auth.get_users([auth.EmailIdentifier(e) for e in emails])
+    return {user.email.lower(): user.uid for user in result.users if user.email}
+
+
+def migrated_doc(doc_id, data, admin_email=ADMIN_EMAIL):
+    new_data = data.copy()
+    new_data["empCode"] = data.get("empCode", doc_id)
+    new_data["role"] = "ADMIN" if data["email"].strip().lower() == admin_email.lower() else "EMPLOYEE"
+    return new_data
+
+
+class MigrationCheckpoint:
+    """Append-only record of migrated docs, safe to share between worker threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def record(self, pairs):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            for old, uid in pairs:
+                self._file.write(json.dumps({'old': old, 'uid': uid}) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
 
-        role = "ADMIN" if email == ADMIN_EMAIL else "EMPLOYEE"
+    def close(self):
+        if self._file:
+            self._file.close()
 
-        new_data = data.copy()
-        new_data["empCode"] = data.get("empCode", doc.id)
-        new_data["role"] = role
 
-        employees_ref.document(uid).set(new_data)
+def migrate_chunk(db, chunk, checkpoint=None, dry_run=False, admin_email=ADMIN_EMAIL):
+    """
+    Resolve and migrate up to 100 employees.
+    Returns: (migrated [(old_id, uid)], not_found [old_id])
+    """
+    uids = resolve_uids([data["email"].strip().lower() for _, data in chunk])
+    employees_ref = db.collection("employees")
+    migrated, not_found = [], []
+
+    batch = db.batch()
+    for doc_id, data in chunk:
+        uid = uids.get(data["email"].strip().lower())
+        if not uid:
+            not_found.append(doc_id)
+            continue
+        batch.set(employees_ref.document(uid), migrated_doc(doc_id, data, admin_email))
+        batch.delete(employees_ref.document(doc_id))
+        migrated.append((doc_id, uid))
+
+    if migrated and not dry_run:
+        batch.commit()
+        if checkpoint:
+            checkpoint.record(migrated)
+    return migrated, not_found
+
+
+def run_migration(db, pending, workers=4, chunk_size=LOOKUP_LIMIT, checkpoint=None, dry_run=False, admin_email=ADMIN_EMAIL):
+    """
+    Migrate pending employees chunk by chunk with bounded concurrency.
+    Returns: dict with migrated pairs, not_found and failed doc IDs
+    """
+    chunk_size = min(chunk_size, LOOKUP_LIMIT)
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    report = {'migrated': [], 'not_found': [], 'failed': []}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(migrate_chunk, db, chunk, checkpoint, dry_run, admin_email): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                migrated, not_found = future.result()
+            except Exception as e:
+                # Nothing from a failed chunk was committed; a re-run retries it
+                print(f"❌ Chunk starting {chunk[0][0]} failed: {e}", file=sys.stderr)
+                report['failed'].extend(doc_id for doc_id, _ in chunk)
+                continue
+            report['migrated'].extend(migrated)
+            report['not_found'].extend(not_found)
+            if not dry_run:
+                print(f"✅ Migrated {len(migrated)} employees ({len(report['migrated'])}/{len(pending)})")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate employee docs to Firebase Auth UIDs')
+    parser.add_argument('--dry-run', action='store_true', help='Resolve UIDs and print the plan without writing')
+    parser.add_argument('--workers', type=int, default=4, help='Chunks processed concurrently')
+    parser.add_argument('--chunk-size', type=int, default=LOOKUP_LIMIT, help='Employees per Auth lookup and batch (max 100)')
+    parser.add_argument('--checkpoint', type=str, default=DEFAULT_CHECKPOINT, help='Progress file for resuming')
+    parser.add_argument('--plan-file', type=str, help='Write the dry-run plan as JSON')
+    parser.add_argument('--admin-email', type=str, default=ADMIN_EMAIL, help='Email that gets the ADMIN role')
+    args = parser.parse_args()
+
+    cred = credentials.Certificate("serviceAccountKey.json")
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(cred)
+
+    db = firestore.client()
+
+    done = load_checkpoint(args.checkpoint)
+    pending, skipped = plan_migration(db.collection("employees").stream(), done)
+    print(f"📋 {len(pending)} employees to migrate "
+          f"({len(skipped['migrated'])} already on UIDs, {len(skipped['checkpointed'])} in checkpoint)")
+    for doc_id in skipped['no_email']:
+        print(f"❌ Skipping {doc_id} (no email)")
+    for doc_id in skipped['duplicate_email']:
+        print(f"❌ Skipping {doc_id} (email shared with another employee)")
+
+    checkpoint = None if args.dry_run else MigrationCheckpoint(args.checkpoint)
+    try:
+        report = run_migration(db, pending, args.workers, args.chunk_size, checkpoint, args.dry_run, args.admin_email)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    for doc_id in report['not_found']:
+        print(f"❌ No Auth user for {doc_id}")
 
-        print(f"✅ Migrated {email} → {uid}")
+    if args.dry_run:
+        plan = {
+            'migrate': [{'old': old, 'uid': uid} for old, uid in report['migrated']],
+            'not_found': report['not_found'],
+            'failed': report['failed'],
+            'skipped': skipped
+        }
+        if args.plan_file:
+            with open(args.plan_file, 'w') as f:
+                json.dump(plan, f, indent=2)
+            print(f"📝 Plan written to {args.plan_file}")
+        else:
+            for item in plan['migrate']:
+                print(f"   {item['old']} → {item['uid']}")
+        print(f"\n🔎 Dry run: {len(report['migrated'])} would migrate, "
+              f"{len(report['not_found'])} without Auth users, {len(report['failed'])} lookups failed")
+        return
 
-        employees_ref.document(doc.id).delete()
-        print(f"🗑️ Deleted old doc {doc.id}")
+    print(f"\n🎉 Employee migration completed: {len(report['migrated'])} migrated, "
+          f"{len(report['not_found'])} without Auth users, {len(report['failed'])} failed")
+    if report['failed']:
+        sys.exit(1)
 
-    except Exception as e:
-        print(f"❌ Failed for {email}: {e}")
 
-print("\n🎉 Employee migration completed")
+if __name__ == '__main__':
+    main()
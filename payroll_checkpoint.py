@@ -0,0 +1,74 @@
+"""
+Checkpoint journal for payroll runs.
+
+Each (year, month[, shard]) run appends one JSON line per completed employee
+(the payroll record including its PDF path). A crashed run restarted with
+--resume reloads the journal and only processes the employees still missing.
+"""
+import os
+import json
+
+
+class PayrollCheckpoint:
+    """Append-only journal of completed employees for one payroll run"""
+
+    def __init__(self, directory, year, month, label=None, sync_every=100):
+        self.directory = directory
+        suffix = f"_{label}" if label else ''
+        self.path = os.path.join(directory, f"payroll_{year}_{int(month):02d}{suffix}.jsonl")
+        self.sync_every = sync_every
+        self._file = None
+        self._pending = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        """
+        Read completed employees from the journal.
+        Returns: dict of emp_id -> payroll record. A torn last line from a
+        crash mid-write is ignored.
+        """
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                completed[str(record['emp_id'])] = record
+        return completed
+
+    def resumable(self):
+        """Completed employees whose payslip PDF is still on disk"""
+        return {
+            emp_id: record for emp_id, record in self.load().items()
+            if record.get('pdf_path') and os.path.exists(record['pdf_path'])
+        }
+
+    def start(self, resume=False):
+        """Open the journal; a fresh (non-resume) run truncates it"""
+        self._file = open(self.path, 'a' if resume else 'w')
+        if resume and self._file.tell() > 0:
+            # Terminate a torn last line so the next record starts cleanly
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._file.write('\n')
+
+    def record(self, payroll):
+        """Append one completed employee; flushed so a crash keeps it"""
+        self._file.write(json.dumps(dict(payroll)) + '\n')
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.sync_every:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def close(self):
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -0,0 +1,146 @@
+"""
+Streaming import of HR Excel uploads (see create_test_data.py for the layout).
+
+Workbooks are read with openpyxl in read-only mode, one row at a time. Headers
+are resolved to payroll fields once per sheet, using the same fuzzy keyword
+matching as PayrollAgent.calculate_payroll (first header containing any
+keyword wins). Values are collected into typed column arrays and become the
+payroll frame directly, so large uploads never hold a cell-object grid in memory.
+"""
+from array import array
+
+import pandas as pd
+
+# (field, header keywords, kind). The order matches calculate_payroll's lookups.
+SALARY_FIELDS = [
+    ('emp_id', ['code', 'emp_id', 'id'], 'id'),
+    ('name', ['name'], 'text'),
+    ('designation', ['designation', 'role'], 'text'),
+    ('basic', ['basic'], 'number'),
+    ('hra', ['hra'], 'number'),
+    ('other_allow', ['other_allow', 'allowance'], 'number'),
+    ('email', ['email'], 'text'),
+    ('tds_override', ['tds'], 'number')
+]
+ATTENDANCE_FIELDS = [
+    ('emp_id', ['code', 'emp_id', 'id'], 'id'),
+    ('present_days', ['present'], 'number'),
+    ('approved_paid_leaves', ['paid leave', 'paid_leave'], 'number'),
+    ('leave_balance', ['balance'], 'number')
+]
+SALARY_SHEET_KEYWORDS = ['salary']
+ATTENDANCE_SHEET_KEYWORDS = ['attendance']
+
+
+def resolve_column(columns, keywords):
+    """First column whose name contains any keyword (case-insensitive), else None"""
+    for col in columns:
+        if any(k.lower() in str(col).lower() for k in keywords):
+            return col
+    return None
+
+
+def _number(value):
+    if value is None or value == '':
+        return float('nan')
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
+
+
+def read_sheet(worksheet, fields):
+    """
+    Stream a worksheet into a DataFrame with one column per resolved field.
+    Rows without an employee ID are skipped. Fields whose header is missing
+    are left out of the frame.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    headers = next(rows, None) or ()
+    header_names = [h for h in headers if h is not None]
+
+    positions = {}
+    for field, keywords, kind in fields:
+        col = resolve_column(header_names, keywords)
+        if col is not None:
+            positions[field] = (headers.index(col), kind)
+    if 'emp_id' not in positions:
+        raise ValueError(f"Sheet '{worksheet.title}' has no employee ID column")
+
+    columns = {
+        field: array('d') if kind == 'number' else []
+        for field, (_, kind) in positions.items()
+    }
+    id_index = positions['emp_id'][0]
+    for row in rows:
+        if id_index >= len(row) or row[id_index] in (None, ''):
+            continue
+        for field, (index, kind) in positions.items():
+            value = row[index] if index < len(row) else None
+            if kind == 'number':
+                columns[field].append(_number(value))
+            elif kind == 'id':
+                columns[field].append(str(value).strip().upper())
+            else:
+                columns[field].append('' if value is None else str(value))
+
+    return pd.DataFrame({
+        field: pd.Series(values, dtype='float64' if positions[field][1] == 'number' else 'object')
+        for field, values in columns.items()
+    })
+
+
+def _find_sheet(workbook, keywords):
+    name = resolve_column(workbook.sheetnames, keywords)
+    return workbook[name] if name else None
+
+
+def load_workbook_frames(path):
+    """
+    Read an HR upload.
+    Returns: (salary frame, attendance frame or None)
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        salary_sheet = _find_sheet(workbook, SALARY_SHEET_KEYWORDS) or workbook.worksheets[0]
+        attendance_sheet = _find_sheet(workbook, ATTENDANCE_SHEET_KEYWORDS)
+        salary = read_sheet(salary_sheet, SALARY_FIELDS)
+        attendance = read_sheet(attendance_sheet, ATTENDANCE_FIELDS) if attendance_sheet is not None else None
+    finally:
+        workbook.close()
+    return salary, attendance
+
+
+def build_payroll_inputs(path):
+    """
+    Salary frame (with leave columns and optional TDS override) and attendance
+    totals in the shapes fetch_data_from_firebase produces.
+    Returns: (salary, attendance_totals)
+    """
+    salary, attendance = load_workbook_frames(path)
+    salary = salary.drop_duplicates('emp_id', keep='last')
+    for field in ('basic', 'hra', 'other_allow'):
+        if field in salary:
+            salary[field] = salary[field].fillna(0)
+
+    if attendance is None or attendance.empty:
+        attendance = pd.DataFrame(columns=['emp_id'])
+    attendance = attendance.drop_duplicates('emp_id', keep='last')
+
+    leave = attendance.reindex(columns=['emp_id', 'approved_paid_leaves', 'leave_balance'])
+    salary = salary.merge(leave, on='emp_id', how='left')
+    salary[['approved_paid_leaves', 'leave_balance']] = salary[['approved_paid_leaves', 'leave_balance']].fillna(0).astype(float)
+    # Encashments from an upload haven't been posted to the leave ledger yet
+    salary['encashed_leaves'] = 0.0
+
+    totals = pd.DataFrame({
+        'present_days': attendance.get('present_days', pd.Series(dtype=float)).fillna(0).to_numpy(),
+        'late_days': 0.0,
+        'half_days': 0.0,
+        'total_hours_worked': 0.0
+    }, index=pd.Index(attendance['emp_id'], name='employeeId'))
+    return salary, totals
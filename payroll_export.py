@@ -0,0 +1,91 @@
+"""
+Compact payroll result exports.
+
+- NDJSON: one line per employee, written as soon as that employee finishes,
+  followed by a single summary line. Consumers can read incrementally.
+- Parquet / Arrow IPC: columnar files for analytics over payroll history.
+  Requires `pyarrow` (pip install pyarrow).
+"""
+import os
+import sys
+import json
+
+SUMMARY_KEYS = ['success', 'error', 'month', 'year', 'policy_version', 'total_employees', 'processed', 'failed', 'shard', 'bundle_path', 'email', 'errors']
+
+
+def summarize(result):
+    """The result without the per-employee `results` list"""
+    return {k: result[k] for k in SUMMARY_KEYS if k in result}
+
+
+class NdjsonResultWriter:
+    """Streams payroll records as newline-delimited JSON"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._stream = open(path, 'w') if path else sys.stdout
+
+    def write_result(self, payroll):
+        self._stream.write(json.dumps({'type': 'result', **payroll}, separators=(',', ':')) + '\n')
+        self._stream.flush()
+
+    def write_summary(self, result):
+        self._stream.write(json.dumps({'type': 'summary', **summarize(result)}, separators=(',', ':')) + '\n')
+        self._stream.flush()
+
+    def close(self):
+        if self.path:
+            self._stream.close()
+
+
+def read_ndjson(path):
+    """Yield (kind, record) pairs from an NDJSON results file"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record.pop('type', 'result'), record
+
+
+def _arrow_table(results, year, month):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Columnar output needs pyarrow: pip install pyarrow")
+
+    table = pa.Table.from_pylist([dict(r) for r in results])
+    # Amounts are ints or floats depending on the month; pin them to float64
+    # so files from different runs share one schema
+    schema = pa.schema([
+        pa.field(f.name, pa.float64()) if pa.types.is_integer(f.type) else f
+        for f in table.schema
+    ])
+    table = table.cast(schema)
+    # Period columns so history files can be concatenated and filtered
+    table = table.append_column('period_year', pa.array([int(year)] * len(results), pa.int16()))
+    table = table.append_column('period_month', pa.array([int(month)] * len(results), pa.int8()))
+    return table
+
+
+def write_parquet(results, path, year, month):
+    """Write payroll records to a zstd-compressed Parquet file"""
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    pq.write_table(_arrow_table(results, year, month), path, compression='zstd')
+    return path
+
+
+def write_arrow(results, path, year, month):
+    """Write payroll records to an Arrow IPC (Feather v2) file"""
+    import pyarrow.feather as feather
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    feather.write_feather(_arrow_table(results, year, month), path, compression='zstd')
+    return path
+
+
+def default_results_path(output_format, year, month, label=None):
+    suffix = f"_{label}" if label else ''
+    ext = 'parquet' if output_format == 'parquet' else 'arrow'
+    return os.path.join('payroll_results', f"payroll_{year}_{int(month):02d}{suffix}.{ext}")
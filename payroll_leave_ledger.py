@@ -0,0 +1,180 @@
+"""
+Leave balance ledger.
+
+Every leave movement (accrual, approved paid leave, encashment, adjustment)
+is appended to `leave_ledger`, and the same batch bumps materialized totals on
+the employee's `leave_balances/<emp_id>` document with atomic increments:
+
+    {emp_id, accrued, approved, encashed, balance,
+     months: {"2025-12": {"approved": 2, "encashed": 0}}, updatedAt}
+
+Payroll never replays the ledger: it reads all balances for a month in one
+bulk read and joins them into the payroll frame. The balance reported for a
+month is rolled back from the current one with the per-month totals (later
+months and the month's own encashment are undone), so re-running a month
+after it was finalized sees the same balance as the first run.
+"""
+import sys
+from datetime import datetime
+
+import pandas as pd
+from firebase_admin import firestore
+
+ENTRY_TYPES = {
+    # type -> (total field, sign applied to balance)
+    'ACCRUAL': ('accrued', 1),
+    'APPROVAL': ('approved', -1),
+    'ENCASHMENT': ('encashed', -1),
+    'ADJUSTMENT': ('adjusted', 1)
+}
+BALANCE_COLUMNS = ['leave_balance', 'approved_paid_leaves', 'encashed_leaves']
+# Per-month total field -> sign it applied to balance
+MONTH_SIGNS = {field: sign for field, sign in ENTRY_TYPES.values()}
+# Firestore allows 500 writes per batch; each entry costs two
+ENTRIES_PER_BATCH = 250
+
+
+class LeaveLedger:
+    """Append-only leave movements with materialized per-employee balances"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def post(self, entries):
+        """
+        Append leave entries and update balances in batched writes.
+        Args:
+            entries: iterable of dicts {emp_id, type, days, period, reference?}
+        Returns: number of entries posted
+        """
+        entries = list(entries)
+        ledger_ref = self.db.collection('leave_ledger')
+        balances_ref = self.db.collection('leave_balances')
+        now = datetime.now().isoformat()
+
+        for start in range(0, len(entries), ENTRIES_PER_BATCH):
+            batch = self.db.batch()
+            for entry in entries[start:start + ENTRIES_PER_BATCH]:
+                entry_type = entry['type'].upper()
+                if entry_type not in ENTRY_TYPES:
+                    raise ValueError(f"Unknown leave entry type: {entry['type']}")
+                field, sign = ENTRY_TYPES[entry_type]
+                emp_id = str(entry['emp_id']).upper()
+                days = float(entry['days'])
+
+                batch.set(ledger_ref.document(), {
+                    'emp_id': emp_id,
+                    'type': entry_type,
+                    'days': days,
+                    'period': entry['period'],
+                    'reference': entry.get('reference'),
+                    'createdAt': now
+                })
+                batch.set(balances_ref.document(emp_id), {
+                    'emp_id': emp_id,
+                    field: firestore.Increment(days),
+                    'balance': firestore.Increment(sign * days),
+                    'months': {entry['period']: {field: firestore.Increment(days)}},
+                    'updatedAt': now
+                }, merge=True)
+            batch.commit()
+
+        return len(entries)
+
+    def record_accrual(self, emp_id, days, period, reference=None):
+        return self.post([{'emp_id': emp_id, 'type': 'ACCRUAL', 'days': days, 'period': period, 'reference': reference}])
+
+    def record_approval(self, emp_id, days, period, reference=None):
+        return self.post([{'emp_id': emp_id, 'type': 'APPROVAL', 'days': days, 'period': period, 'reference': reference}])
+
+    def record_encashment(self, emp_id, days, period, reference=None):
+        return self.post([{'emp_id': emp_id, 'type': 'ENCASHMENT', 'days': days, 'period': period, 'reference': reference}])
+
+    def fetch_balances(self, period, emp_ids=None):
+        """
+        All balances needed for a payroll month in one bulk read.
+        Args:
+            period: "YYYY-MM" whose balance and approved/encashed days are reported
+            emp_ids: Limit to these employees (uses a single get_all); default streams all balances
+        Returns: DataFrame with emp_id, leave_balance, approved_paid_leaves, encashed_leaves.
+            leave_balance is the balance payroll saw for `period`: after its accruals
+            and approvals, before its encashment and any later month's movements.
+        """
+        if emp_ids is not None:
+            refs = [self.db.collection('leave_balances').document(str(e).upper()) for e in emp_ids]
+            docs = [d for d in self.db.get_all(refs) if d.exists] if refs else []
+        else:
+            docs = self.db.collection('leave_balances').stream()
+
+        rows = []
+        for doc in docs:
+            d = doc.to_dict()
+            months = d.get('months') or {}
+            month = months.get(period, {})
+            rows.append({
+                'emp_id': d.get('emp_id') or doc.id,
+                'leave_balance': period_balance(d.get('balance', 0), months, period),
+                'approved_paid_leaves': month.get('approved', 0),
+                'encashed_leaves': month.get('encashed', 0)
+            })
+        return pd.DataFrame(rows, columns=['emp_id'] + BALANCE_COLUMNS)
+
+
+def period_balance(balance, months, period):
+    """
+    Roll a current balance back to what it was when `period` was paid.
+    Args:
+        balance: Current materialized balance
+        months: Per-month totals {"YYYY-MM": {field: days}}
+        period: "YYYY-MM" being paid
+    """
+    for month, totals in months.items():
+        if month > period:
+            balance -= sum(MONTH_SIGNS.get(field, 0) * days for field, days in totals.items())
+    return balance + (months.get(period) or {}).get('encashed', 0)
+
+
+def join_balances(salary, balances):
+    """Left-join leave balances onto the salary frame; employees without a ledger get zeros"""
+    if salary.empty:
+        return salary
+    salary = salary.drop(columns=[c for c in BALANCE_COLUMNS if c in salary.columns])
+    # Ledger IDs are stored upper-case; match the salary sheet's IDs regardless of case
+    balances = balances.rename(columns={'emp_id': '_ledger_id'})
+    balances['_ledger_id'] = balances['_ledger_id'].astype(str).str.upper()
+    frame = salary.assign(_ledger_id=salary['emp_id'].astype(str).str.upper())
+    frame = frame.merge(balances, on='_ledger_id', how='left').drop(columns='_ledger_id')
+    frame[BALANCE_COLUMNS] = frame[BALANCE_COLUMNS].fillna(0).astype(float)
+    return frame
+
+
+if __name__ == '__main__':
+    import argparse
+    import firebase_admin
+    from firebase_admin import credentials
+
+    parser = argparse.ArgumentParser(description='Leave ledger maintenance')
+    parser.add_argument('action', choices=['accrue', 'approve', 'encash', 'adjust'])
+    parser.add_argument('--days', type=float, required=True, help='Days to post')
+    parser.add_argument('--period', type=str, default=datetime.now().strftime('%Y-%m'), help='Period YYYY-MM')
+    parser.add_argument('--employee', type=str, nargs='*', help='Employee IDs (accrue defaults to all employees)')
+    parser.add_argument('--reference', type=str, help='Leave application / run reference')
+    args = parser.parse_args()
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate('serviceAccountKey.json'))
+    db = firestore.client()
+
+    emp_ids = args.employee
+    if not emp_ids:
+        if args.action != 'accrue':
+            print("❌ --employee is required", file=sys.stderr)
+            sys.exit(1)
+        emp_ids = [d.to_dict().get('emp_id') or d.id for d in db.collection('employees').stream()]
+
+    entry_type = {'accrue': 'ACCRUAL', 'approve': 'APPROVAL', 'encash': 'ENCASHMENT', 'adjust': 'ADJUSTMENT'}[args.action]
+    posted = LeaveLedger(db).post(
+        {'emp_id': e, 'type': entry_type, 'days': args.days, 'period': args.period, 'reference': args.reference}
+        for e in emp_ids
+    )
+    print(f"✅ Posted {posted} {entry_type} entries for {args.period}")
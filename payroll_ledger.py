@@ -0,0 +1,199 @@
+"""
+Append-only payroll history.
+
+Every successful payroll record is appended to a local SQLite ledger keyed by
+(emp_id, period, policy_version). Past months can then be inspected and
+compared without re-running payroll against source data that has since changed.
+"""
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Numeric payroll components tracked per record
+COMPONENTS = [
+    'present_days', 'late_days', 'half_days', 'total_hours_worked',
+    'approved_paid_leaves', 'lop_days', 'payable_days', 'remaining_leaves',
+    'basic_da', 'hra', 'other_allow', 'gross', 'pf', 'esi', 'pt', 'tds',
+    'total_deductions', 'encashment', 'net_pay'
+]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS payroll_ledger (
+    entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id TEXT NOT NULL,
+    period TEXT NOT NULL,
+    policy_version TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    record_hash TEXT NOT NULL,
+    name TEXT,
+    {', '.join(f'{c} REAL' for c in COMPONENTS)},
+    record_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_key ON payroll_ledger (emp_id, period, policy_version);
+CREATE INDEX IF NOT EXISTS idx_ledger_period ON payroll_ledger (period);
+CREATE TRIGGER IF NOT EXISTS ledger_no_update BEFORE UPDATE ON payroll_ledger
+BEGIN SELECT RAISE(ABORT, 'payroll_ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS ledger_no_delete BEFORE DELETE ON payroll_ledger
+BEGIN SELECT RAISE(ABORT, 'payroll_ledger is append-only'); END;
+"""
+
+
+def policy_fingerprint(policies):
+    """Short stable hash of a policy dict, used when no explicit version exists"""
+    blob = json.dumps(policies, sort_keys=True, default=str)
+    return 'sha1:' + hashlib.sha1(blob.encode('utf-8')).hexdigest()[:12]
+
+
+def period_key(year, month):
+    return f"{int(year)}-{int(month):02d}"
+
+
+class PayrollLedger:
+    """SQLite-backed, append-only payroll history"""
+
+    def __init__(self, path='payroll_ledger.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def append_run(self, results, period, policy_version, run_id=None):
+        """
+        Append payroll records for a period.
+        Records identical to the latest entry for the same key are skipped, so
+        re-running an unchanged month doesn't grow the ledger.
+        Returns: number of rows appended
+        """
+        run_id = run_id or datetime.now().strftime('%Y%m%dT%H%M%S')
+        recorded_at = datetime.now().isoformat()
+
+        latest = dict(self.conn.execute(
+            """
+            SELECT emp_id, record_hash FROM payroll_ledger
+            WHERE entry_id IN (
+                SELECT MAX(entry_id) FROM payroll_ledger
+                WHERE period = ? AND policy_version = ?
+                GROUP BY emp_id
+            )
+            """,
+            (period, policy_version)
+        ).fetchall())
+
+        rows = []
+        for record in results:
+            components = [float(record.get(c) or 0) for c in COMPONENTS]
+            record_hash = hashlib.sha1(json.dumps(components).encode('utf-8')).hexdigest()
+            emp_id = str(record['emp_id'])
+            if latest.get(emp_id) == record_hash:
+                continue
+            rows.append((
+                emp_id, period, policy_version, run_id, recorded_at, record_hash,
+                record.get('name'), *components, json.dumps(dict(record), default=str)
+            ))
+
+        columns = ['emp_id', 'period', 'policy_version', 'run_id', 'recorded_at',
+                   'record_hash', 'name', *COMPONENTS, 'record_json']
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO payroll_ledger ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows
+            )
+        return len(rows)
+
+    def load_period(self, period, policy_version=None):
+        """
+        Latest ledger entry per employee for a period as a DataFrame.
+        Args:
+            period: "YYYY-MM"
+            policy_version: Restrict to one policy version (default: latest entry of any version)
+        """
+        where = "period = ?"
+        params = [period]
+        if policy_version:
+            where += " AND policy_version = ?"
+            params.append(policy_version)
+
+        return pd.read_sql_query(
+            f"""
+            SELECT emp_id, name, period, policy_version, run_id, recorded_at, {', '.join(COMPONENTS)}
+            FROM payroll_ledger
+            WHERE entry_id IN (
+                SELECT MAX(entry_id) FROM payroll_ledger WHERE {where} GROUP BY emp_id
+            )
+            ORDER BY emp_id
+            """,
+            self.conn,
+            params=params
+        )
+
+    def periods(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT period FROM payroll_ledger ORDER BY period"
+        )]
+
+    def diff_periods(self, period_a, period_b, tolerance=0.005, components=None):
+        """
+        Compare two periods component by component.
+
+        Both periods are aligned on emp_id and differenced as one matrix, so
+        the cost is a couple of array operations regardless of headcount.
+        Returns: DataFrame with one row per employee whose pay changed, the
+        list of changed components and <component>_from / _to / delta_ columns.
+        """
+        components = components or COMPONENTS
+        a = self.load_period(period_a).set_index('emp_id')
+        b = self.load_period(period_b).set_index('emp_id')
+        emp_ids = a.index.union(b.index)
+        a = a.reindex(emp_ids)
+        b = b.reindex(emp_ids)
+
+        a_values = a[components].to_numpy(dtype=float)
+        b_values = b[components].to_numpy(dtype=float)
+        delta = np.nan_to_num(b_values) - np.nan_to_num(a_values)
+        changed = np.abs(delta) > tolerance
+
+        only_a = a['period'].notna().to_numpy() & b['period'].isna().to_numpy()
+        only_b = b['period'].notna().to_numpy() & a['period'].isna().to_numpy()
+        status = np.where(only_a, 'removed', np.where(only_b, 'added', 'changed'))
+        keep = changed.any(axis=1) | only_a | only_b
+
+        names = np.array(components)
+        diff = pd.DataFrame({
+            'emp_id': emp_ids,
+            'name': b['name'].fillna(a['name']).to_numpy(),
+            'status': status,
+            'changed_components': [list(names[row]) for row in changed]
+        })
+        for i, component in enumerate(components):
+            diff[f'{component}_from'] = a_values[:, i]
+            diff[f'{component}_to'] = b_values[:, i]
+            diff[f'delta_{component}'] = delta[:, i]
+
+        return diff[keep].reset_index(drop=True)
+
+
+def diff_records(diff):
+    """Turn a diff frame into JSON-friendly dicts listing only changed components"""
+    records = []
+    for row in diff.to_dict('records'):
+        changes = {}
+        for component in row['changed_components']:
+            changes[component] = {
+                'from': None if pd.isna(row[f'{component}_from']) else row[f'{component}_from'],
+                'to': None if pd.isna(row[f'{component}_to']) else row[f'{component}_to'],
+                'delta': round(row[f'delta_{component}'], 2)
+            }
+        records.append({
+            'emp_id': row['emp_id'],
+            'name': row['name'],
+            'status': row['status'],
+            'changes': changes
+        })
+    return records
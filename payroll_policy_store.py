@@ -0,0 +1,154 @@
+"""
+Versioned payroll policy store.
+
+Policies live in the `payroll_policy_versions` collection as immutable
+documents ({version, effectiveFrom, createdAt, pfRate, ...}). Versions are
+cached in a local JSON file:
+
+- A month whose policy window is closed (a later version is already known)
+  resolves entirely from the cache, no Firestore round-trip.
+- The open window is revalidated at most every `ttl_seconds`, by asking only
+  for versions created after the newest one cached.
+- Setups without versions fall back to the legacy `payroll_policies/current_policy`
+  document, versioned by its update time.
+
+Every resolution returns an explicit version id so payroll results can be
+stamped with the policy they were computed under.
+"""
+import os
+import sys
+import json
+import time
+import calendar
+
+DEFAULT_POLICIES = {
+    'pf_rate': 0.12,
+    'pf_cap': 1800,
+    'esi_employee_rate': 0.0075,
+    'esi_threshold': 21000,
+    'pt_amount': 200,
+    'leave_encashment': False,
+    'encash_max_days': 10
+}
+
+# Firestore (camelCase) field -> policy key
+FIELD_MAP = {
+    'pfRate': 'pf_rate',
+    'pfCap': 'pf_cap',
+    'esiEmployeeRate': 'esi_employee_rate',
+    'esiThreshold': 'esi_threshold',
+    'ptAmount': 'pt_amount',
+    'leaveEncashment': 'leave_encashment',
+    'encashMaxDays': 'encash_max_days'
+}
+
+DEFAULT_VERSION = 'defaults'
+
+
+def policies_from_document(data):
+    """Map a Firestore policy document onto policy keys, defaulting missing fields"""
+    policies = dict(DEFAULT_POLICIES)
+    for field, key in FIELD_MAP.items():
+        if data.get(field) is not None:
+            policies[key] = data[field]
+    return policies
+
+
+def period_end(year, month):
+    return f"{int(year)}-{int(month):02d}-{calendar.monthrange(int(year), int(month))[1]:02d}"
+
+
+class PolicyStore:
+    """Resolves the payroll policy in effect for a month, with a local cache"""
+
+    def __init__(self, db, cache_path='.payroll_policy_cache.json', ttl_seconds=300, strict=False):
+        self.db = db
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.strict = strict
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'versions': [], 'validated_at': 0, 'legacy': None}
+
+    def _save_cache(self):
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.cache, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def _select(self, as_of):
+        """
+        Pick the cached version in effect on `as_of` (YYYY-MM-DD).
+        Returns: (version or None, window_closed)
+        """
+        versions = sorted(self.cache['versions'], key=lambda v: (v['effective_from'], v['created_at']))
+        current = None
+        for v in versions:
+            if v['effective_from'] <= as_of:
+                current = v
+            else:
+                return current, current is not None
+        return current, False
+
+    def _refresh(self):
+        """Pull versions created since the newest cached one (and the legacy doc if needed)"""
+        newest = max((v['created_at'] for v in self.cache['versions']), default=None)
+        query = self.db.collection('payroll_policy_versions')
+        if newest:
+            query = query.where('createdAt', '>', newest)
+
+        for doc in query.stream():
+            data = doc.to_dict()
+            self.cache['versions'].append({
+                'version': str(data.get('version') or doc.id),
+                'effective_from': data.get('effectiveFrom', '0000-00-00'),
+                'created_at': data.get('createdAt', ''),
+                'policies': policies_from_document(data)
+            })
+
+        if not self.cache['versions']:
+            # Legacy single-document setup
+            doc = self.db.collection('payroll_policies').document('current_policy').get()
+            if doc.exists:
+                stamp = doc.update_time.isoformat() if getattr(doc, 'update_time', None) else 'unknown'
+                self.cache['legacy'] = {
+                    'version': f"current_policy@{stamp}",
+                    'policies': policies_from_document(doc.to_dict())
+                }
+
+        self.cache['validated_at'] = time.time()
+        self._save_cache()
+
+    def policy_for(self, year, month):
+        """
+        Policy in effect at the end of the given month.
+        Returns: (version_id, policies dict)
+        """
+        as_of = period_end(year, month)
+        version, closed = self._select(as_of)
+        if closed:
+            return version['version'], dict(version['policies'])
+
+        if time.time() - self.cache.get('validated_at', 0) > self.ttl_seconds:
+            try:
+                self._refresh()
+            except Exception as e:
+                if self.strict:
+                    raise
+                print(f"⚠️  Could not validate policy cache, using cached/default policies. Error: {e}", file=sys.stderr)
+
+        version, _ = self._select(as_of)
+        if version:
+            return version['version'], dict(version['policies'])
+        if self.cache.get('legacy'):
+            legacy = self.cache['legacy']
+            return legacy['version'], dict(legacy['policies'])
+        if self.strict:
+            raise LookupError(f"No payroll policy in effect for {as_of}")
+        return DEFAULT_VERSION, dict(DEFAULT_POLICIES)
+
@@ -0,0 +1,126 @@
+"""
+Typed payroll record.
+
+One employee's payslip figures as a slotted object: no per-instance __dict__,
+so a month of records costs a fixed handful of pointers per employee instead
+of a 27-key dict. PayrollAgent.calculate_payroll builds these, the payslip
+renderer reads them, and they become plain dicts only when serialized
+(to_dict / json_default).
+
+Records also answer record['net_pay'] and record.get('pdf_path') like the
+dicts they replace, so ledger, export, TDS and mailer code reads them as-is.
+Python 3.8 compatible (no dataclass slots).
+"""
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+Number = Union[int, float]
+
+
+class PayrollRecord:
+    """One employee's computed payroll for a month"""
+
+    # Computed by calculate_payroll, in output order
+    FIELDS: Tuple[str, ...] = (
+        'emp_id', 'name', 'designation', 'month',
+        'present_days', 'late_days', 'half_days', 'total_hours_worked',
+        'approved_paid_leaves', 'lop_days', 'payable_days', 'remaining_leaves',
+        'basic_da', 'hra', 'other_allow', 'gross',
+        'pf', 'esi', 'pt', 'tds', 'total_deductions', 'encashment', 'net_pay'
+    )
+    # Filled in after the payslip is rendered; omitted from to_dict while unset
+    EXTRAS: Tuple[str, ...] = ('pdf_path', 'pdf_filename', 'policy_version', 'status')
+
+    __slots__ = FIELDS + EXTRAS
+
+    emp_id: str
+    name: str
+    designation: str
+    month: str
+    present_days: Number
+    late_days: Number
+    half_days: Number
+    total_hours_worked: Number
+    approved_paid_leaves: Number
+    lop_days: Number
+    payable_days: Number
+    remaining_leaves: Number
+    basic_da: Number
+    hra: Number
+    other_allow: Number
+    gross: Number
+    pf: Number
+    esi: Number
+    pt: Number
+    tds: Number
+    total_deductions: Number
+    encashment: Number
+    net_pay: Number
+    pdf_path: Optional[str]
+    pdf_filename: Optional[str]
+    policy_version: Optional[str]
+    status: Optional[str]
+
+    def __init__(self, **values: Any) -> None:
+        for field in self.FIELDS:
+            try:
+                setattr(self, field, values.pop(field))
+            except KeyError:
+                raise TypeError(f"PayrollRecord missing field: {field}")
+        for field in self.EXTRAS:
+            setattr(self, field, values.pop(field, None))
+        if values:
+            raise TypeError(f"PayrollRecord got unknown fields: {', '.join(sorted(values))}")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PayrollRecord':
+        """Rebuild a record from to_dict() output (e.g. a checkpoint line); unknown keys are ignored"""
+        return cls(**{k: data[k] for k in cls.__slots__ if k in data})
+
+    def keys(self) -> Iterator[str]:
+        yield from self.FIELDS
+        for field in self.EXTRAS:
+            if getattr(self, field) is not None:
+                yield field
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        for field in self.EXTRAS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    # Mapping-style access, so code written against the old dicts keeps working
+    def __getitem__(self, field: str) -> Any:
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        if field not in self.__slots__:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field: object) -> bool:
+        return field in self.FIELDS or (field in self.EXTRAS and getattr(self, field) is not None)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PayrollRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PayrollRecord(emp_id={self.emp_id!r}, net_pay={self.net_pay!r})"
+
+
+def json_default(obj: Any) -> Any:
+    """json.dumps(..., default=json_default) for results containing records"""
+    if isinstance(obj, PayrollRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
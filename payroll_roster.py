@@ -0,0 +1,130 @@
+"""
+Shift-aware attendance for payroll.
+
+Firestore `attendance` is written by the Node punch routes, which judge
+lateness against a fixed office start time. The Flask roster subsystem knows
+each employee's shift; its day tables are exported as JSON:
+
+    cd backend && python -m services.roster_service --export roster.json --start 2025-11-30 --days 33
+
+and RosterDays reclassifies the month's closed records against them with the
+backend's own rules (decision_engine), so payroll counts the same PRESENT /
+LATE / HALF_DAY / ABSENT days as /today and /summary. Records on days the
+export doesn't cover keep their stored status.
+"""
+import os
+import sys
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from services.decision_engine import classify_day, is_late_for, DEFAULT_WORKING_HOURS
+
+DEFAULT_BRANCH = 'Main Office'
+# Same matching slack as roster_service.SHIFT_SLACK_HOURS
+SHIFT_SLACK_HOURS = 6
+
+# Mirrors roster_service.ShiftWindow; all datetimes naive UTC
+ShiftWindow = namedtuple('ShiftWindow', 'shift_id start end late_after working_hours')
+
+
+def to_utc(value):
+    """Naive UTC datetime from an ISO string (Node's toISOString) or a Firestore timestamp"""
+    if not isinstance(value, (str, datetime)) or not value or value != value:  # None, NaN, NaT, ''
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value if isinstance(value, datetime) else None
+
+
+class RosterDays:
+    """Exported roster day tables: employee -> shift window lookups"""
+
+    def __init__(self, data):
+        self.employees = set(data.get('employees', []))
+        self.days = {}
+        for day, table in data.get('days', {}).items():
+            windows = {
+                shift_id: ShiftWindow(shift_id, to_utc(w['start']), to_utc(w['end']),
+                                      to_utc(w['lateAfter']), w['workingHours'])
+                for shift_id, w in table.get('windows', {}).items()
+            }
+            self.days[day] = {owner: windows[shift_id] for owner, shift_id in table.get('employees', {}).items()}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def covers(self, day):
+        return day.isoformat() in self.days
+
+    def window(self, employee_id, day):
+        """Expected shift on a day (None = day off or not covered)"""
+        table = self.days.get(day.isoformat())
+        if table is None:
+            return None
+        owner = employee_id if employee_id in self.employees else '*' + DEFAULT_BRANCH
+        return table.get(owner)
+
+    def window_for_punch(self, employee_id, punch_in):
+        """The latest shift around the punch that it falls within, as roster_service.Roster does"""
+        slack = timedelta(hours=SHIFT_SLACK_HOURS)
+        match = None
+        for offset in (-1, 0, 1):
+            window = self.window(employee_id, punch_in.date() + timedelta(days=offset))
+            if window and window.start - slack <= punch_in <= window.end + slack:
+                match = window
+        return match
+
+    def classify(self, employee_id, punch_in, hours, validation=None):
+        """Status for a closed record, or None if the export doesn't cover its day"""
+        if not self.covers(punch_in.date()):
+            return None
+        validation = validation if isinstance(validation, dict) else {}
+        shift = self.window_for_punch(employee_id, punch_in)
+        # Not rostered around the punch (a day off): never late, default hours
+        return classify_day(
+            hours,
+            late=is_late_for(punch_in, shift),
+            wifi_valid=validation.get('wifi', True) is not False,
+            geo_valid=validation.get('geo', True) is not False,
+            working_hours=shift.working_hours if shift else DEFAULT_WORKING_HOURS
+        )
+
+    def reclassify(self, attendance):
+        """
+        Attendance frame with `status` recomputed for closed records on covered days.
+        Returns: (frame, number of records whose status changed)
+        """
+        if attendance.empty or 'punchInTime' not in attendance or 'punchOutTime' not in attendance:
+            return attendance, 0
+
+        def column(name, default=None):
+            return attendance[name].tolist() if name in attendance else [default] * len(attendance)
+
+        statuses = column('status')
+        changed = 0
+        for i, (employee_id, punch_in, punch_out, hours, validation) in enumerate(zip(
+                column('employeeId'), column('punchInTime'), column('punchOutTime'),
+                column('hoursWorked'), column('validation'))):
+            punch_in, punch_out = to_utc(punch_in), to_utc(punch_out)
+            if not punch_in or not punch_out:
+                continue
+            try:
+                hours = float(hours)
+            except (TypeError, ValueError):
+                hours = float('nan')
+            if hours != hours:  # Missing or unreadable: derive from the punches
+                hours = round(max((punch_out - punch_in).total_seconds(), 0) / 3600, 2)
+            status = self.classify(employee_id, punch_in, hours, validation)
+            if status and status != statuses[i]:
+                statuses[i] = status
+                changed += 1
+
+        if not changed:
+            return attendance, 0
+        return attendance.assign(status=statuses), changed
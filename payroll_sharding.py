@@ -0,0 +1,162 @@
+"""
+Sharded payroll runs.
+
+Splits a month-end run into independent workers, each owning a slice of the
+company (stable hash of emp_id mod N, or an inclusive emp_id range). Every
+worker writes its own result file; `merge_shard_results` folds them back into
+the single structure `payroll_system.py --json` prints for the Node backend.
+"""
+import os
+import sys
+import json
+import zlib
+import subprocess
+
+from payroll_record import json_default
+
+
+class ShardSpec:
+    """Which slice of the employee set a payroll worker owns"""
+
+    def __init__(self, index=None, count=None, id_start=None, id_end=None):
+        self.index = index
+        self.count = count
+        self.id_start = id_start.upper() if id_start else None
+        self.id_end = id_end.upper() if id_end else None
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parse a CLI shard spec.
+        Formats:
+            "2/8" or "hash:2/8"          -> shard 2 of 8 by emp_id hash (0-based)
+            "range:EMP001-EMP500"        -> emp_id between the bounds (inclusive)
+        """
+        spec = spec.strip()
+        if spec.startswith('range:'):
+            bounds = spec[len('range:'):]
+            if '-' not in bounds:
+                raise ValueError(f"Invalid range shard '{spec}'. Use range:START-END")
+            start, end = bounds.split('-', 1)
+            if not start or not end or start.upper() > end.upper():
+                raise ValueError(f"Invalid range shard '{spec}'")
+            return cls(id_start=start, id_end=end)
+
+        if spec.startswith('hash:'):
+            spec = spec[len('hash:'):]
+        try:
+            index, count = map(int, spec.split('/'))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{spec}'. Use K/N or range:START-END")
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Shard index must be in [0, {count})")
+        return cls(index=index, count=count)
+
+    @property
+    def is_range(self):
+        return self.id_start is not None
+
+    @property
+    def label(self):
+        if self.is_range:
+            return f"range_{self.id_start}_{self.id_end}"
+        return f"shard_{self.index}_of_{self.count}"
+
+    def owns(self, emp_id):
+        """True if this shard is responsible for the employee"""
+        emp_id = str(emp_id).upper()
+        if self.is_range:
+            return self.id_start <= emp_id <= self.id_end
+        # crc32 is stable across processes/machines, unlike hash()
+        return zlib.crc32(emp_id.encode('utf-8')) % self.count == self.index
+
+    def filter_frame(self, df, column='emp_id'):
+        """Keep only rows of `df` owned by this shard"""
+        if df.empty or column not in df.columns:
+            return df
+        mask = df[column].astype(str).map(self.owns)
+        return df[mask].reset_index(drop=True)
+
+    def to_dict(self):
+        if self.is_range:
+            return {'mode': 'range', 'start': self.id_start, 'end': self.id_end}
+        return {'mode': 'hash', 'index': self.index, 'count': self.count}
+
+
+def shard_result_path(output_dir, year, month, shard):
+    """Per-shard result file, e.g. payroll_shards/payroll_2025_12_shard_0_of_4.json"""
+    return os.path.join(output_dir, f"payroll_{year}_{int(month):02d}_{shard.label}.json")
+
+
+def write_shard_result(result, path):
+    """Atomically write a shard result so a half-written file is never merged"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(result, f, default=json_default)
+    os.replace(tmp_path, path)
+    return path
+
+
+def merge_shard_results(shard_results):
+    """
+    Combine per-shard process_payroll results into one result.
+    Output matches the unsharded structure consumed by the Node backend.
+    """
+    merged = {
+        'success': True,
+        'month': None,
+        'year': None,
+        'total_employees': 0,
+        'processed': 0,
+        'failed': 0,
+        'results': [],
+        'errors': []
+    }
+    shard_errors = []
+
+    for result in shard_results:
+        if not result.get('success'):
+            shard_errors.append(result.get('error', 'Unknown shard failure'))
+            merged['errors'].extend(result.get('errors', []))
+            continue
+
+        merged['month'] = merged['month'] or result.get('month')
+        merged['year'] = merged['year'] or result.get('year')
+        merged['policy_version'] = merged.get('policy_version') or result.get('policy_version')
+        merged['total_employees'] += result.get('total_employees', 0)
+        merged['processed'] += result.get('processed', 0)
+        merged['failed'] += result.get('failed', 0)
+        merged['results'].extend(result.get('results', []))
+        merged['errors'].extend(result.get('errors', []))
+
+    if shard_errors:
+        merged['success'] = False
+        merged['error'] = '; '.join(shard_errors)
+
+    merged['results'].sort(key=lambda r: str(r.get('emp_id')))
+    return merged
+
+
+def merge_shard_files(paths):
+    """Load shard result files and merge them"""
+    shard_results = []
+    for path in paths:
+        with open(path) as f:
+            shard_results.append(json.load(f))
+    return merge_shard_results(shard_results)
+
+
+def run_local_shards(count, worker_args, script=None):
+    """
+    Run `count` hash shards as parallel subprocesses on this machine and wait.
+    Each worker writes its own shard file; returns the list of exit codes.
+    Args:
+        script: Worker entry point (default: payroll_system.py next to this module)
+    """
+    script = script or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payroll_system.py')
+    workers = []
+    for index in range(count):
+        cmd = [sys.executable, script, '--shard', f"{index}/{count}"] + list(worker_args)
+        workers.append(subprocess.Popen(cmd, stdout=subprocess.DEVNULL))
+    return [w.wait() for w in workers]
@@ -0,0 +1,143 @@
+"""
+Policy what-if simulator.
+
+Evaluates a grid of payroll policy variants against one month's payroll frame
+as (variants x employees) array math. No PDFs are rendered and nothing is
+written, so questions like "PF cap 2100?" or "ESI threshold 25000?" take
+seconds even for large headcounts.
+
+The formulas mirror PayrollAgent.calculate_payroll.
+"""
+import itertools
+
+import numpy as np
+
+POLICY_KEYS = [
+    'pf_rate', 'pf_cap', 'esi_employee_rate', 'esi_threshold',
+    'pt_amount', 'leave_encashment', 'encash_max_days'
+]
+PT_GROSS_THRESHOLD = 15000
+TOTAL_KEYS = ['gross', 'pf', 'esi', 'pt', 'tds', 'total_deductions', 'encashment', 'net_pay']
+
+
+def expand_grid(grid):
+    """
+    Turn {"pf_cap": [1800, 2100], "esi_threshold": [21000, 25000]} into the
+    list of all override combinations. Scalars are treated as one-value lists.
+    """
+    unknown = set(grid) - set(POLICY_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown policy keys: {', '.join(sorted(unknown))}")
+
+    keys = list(grid)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def _column(frame, name, default=0.0):
+    if name in frame:
+        return frame[name].fillna(default).to_numpy(dtype=float)
+    return np.full(len(frame), default, dtype=float)
+
+
+def payroll_components(frame, policies, days_in_month):
+    """
+    Core payroll math for many policies at once.
+
+    Args:
+        frame: One row per employee (PayrollAgent.build_payroll_frame)
+        policies: List of V complete policy dicts
+        days_in_month: Days in the month
+    Returns: dict of component name -> (V, E) array
+    """
+    def param(key):
+        # Shape (V, 1) so it broadcasts against (E,) employee arrays
+        return np.array([float(p[key]) for p in policies])[:, None]
+
+    basic = _column(frame, 'basic')
+    hra = _column(frame, 'hra')
+    gross_salary = basic + hra + _column(frame, 'other_allow')
+
+    payable = np.minimum(
+        _column(frame, 'present_days') + _column(frame, 'late_days')
+        + 0.5 * _column(frame, 'half_days') + _column(frame, 'approved_paid_leaves'),
+        days_in_month
+    )
+    # Same testing fallback as calculate_payroll: no attendance -> full month
+    payable = np.where((payable == 0) & (gross_salary > 0), days_in_month, payable)
+    prorated = gross_salary / days_in_month * payable
+
+    pf = np.minimum(basic * param('pf_rate'), param('pf_cap'))
+    esi = np.where(prorated <= param('esi_threshold'), prorated * param('esi_employee_rate'), 0.0)
+    pt = np.where(prorated > PT_GROSS_THRESHOLD, param('pt_amount'), 0.0)
+    tds = np.broadcast_to(_column(frame, 'tds'), pf.shape)
+    total_deductions = pf + esi + pt + tds
+
+    remaining_leaves = _column(frame, 'leave_balance')
+    encashable = np.minimum(remaining_leaves, param('encash_max_days'))
+    encashment = np.where(
+        (param('leave_encashment') > 0) & (remaining_leaves > 0),
+        (basic + hra) / 30 * encashable,
+        0.0
+    )
+
+    return {
+        'gross': np.broadcast_to(prorated, pf.shape),
+        'pf': pf, 'esi': esi, 'pt': pt, 'tds': tds,
+        'total_deductions': total_deductions,
+        'encashment': encashment,
+        'net_pay': prorated - total_deductions + encashment
+    }
+
+
+def simulate_policies(frame, base_policies, variants, days_in_month, top_n=10):
+    """
+    Evaluate policy variants against a payroll frame.
+    TDS is taken from the frame (computed under the current policy).
+
+    Args:
+        frame: One row per employee (PayrollAgent.build_payroll_frame) with
+               emp_id, name, basic, hra, other_allow and attendance totals
+        base_policies: Policies in force; the baseline every variant is compared to
+        variants: List of policy override dicts (see expand_grid)
+        days_in_month: Days in the simulated month
+        top_n: Most affected employees to report per variant
+    Returns:
+        dict with baseline totals, per-variant totals/deltas/top impacts, and
+        `net_pay_delta`, a (variants x employees) numpy array for further analysis
+    """
+    policies = [dict(base_policies)] + [{**base_policies, **v} for v in variants]
+    components = payroll_components(frame, policies, days_in_month)
+    net_pay = components['net_pay']
+    totals = {k: v.sum(axis=1) for k, v in components.items()}
+    net_pay_delta = net_pay[1:] - net_pay[0]
+
+    emp_ids = frame['emp_id'].astype(str).to_numpy() if 'emp_id' in frame else np.arange(len(frame)).astype(str)
+    names = frame['name'].astype(str).to_numpy() if 'name' in frame else emp_ids
+
+    def rounded(values):
+        return {k: round(float(v), 2) for k, v in values.items()}
+
+    baseline = rounded({k: totals[k][0] for k in TOTAL_KEYS})
+    report = []
+    for i, overrides in enumerate(variants):
+        v = i + 1
+        deltas = net_pay_delta[i]
+        top = np.argsort(-np.abs(deltas))[:top_n]
+        report.append({
+            'policy': overrides,
+            'totals': rounded({k: totals[k][v] for k in TOTAL_KEYS}),
+            'delta_vs_baseline': rounded({k: totals[k][v] - totals[k][0] for k in TOTAL_KEYS}),
+            'employees_affected': int(np.count_nonzero(np.abs(deltas) > 0.005)),
+            'top_impacts': [
+                {'emp_id': emp_ids[j], 'name': names[j], 'net_pay_delta': round(float(deltas[j]), 2)}
+                for j in top if abs(deltas[j]) > 0.005
+            ]
+        })
+
+    return {
+        'employees': len(frame),
+        'baseline': {'policy': {k: base_policies.get(k) for k in POLICY_KEYS}, 'totals': baseline},
+        'variants': report,
+        'net_pay_delta': net_pay_delta
+    }
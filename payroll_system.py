@@ -8,6 +8,33 @@ from firebase_admin import credentials, firestore
 from fpdf import FPDF
 from datetime import datetime
 import calendar
+from concurrent.futures import ThreadPoolExecutor
+from payroll_sharding import ShardSpec, shard_result_path, write_shard_result, merge_shard_files, run_local_shards
+from payroll_checkpoint import PayrollCheckpoint
+from payroll_export import NdjsonResultWriter, write_parquet, write_arrow, default_results_path, summarize
+from payroll_ledger import PayrollLedger, policy_fingerprint, period_key, diff_records
+from payroll_simulator import expand_grid, simulate_policies, payroll_components
+from payroll_policy_store import PolicyStore, DEFAULT_POLICIES, DEFAULT_VERSION
+from payroll_leave_ledger import LeaveLedger, join_balances
+from payroll_tds import TdsEngine, YTD_COLUMNS
+from payroll_excel import resolve_column, build_payroll_inputs
+from payslip_store import PayslipStore
+from payslip_mailer import PayslipMailer, SendLog
+from payroll_record import PayrollRecord, json_default
+from payroll_roster import RosterDays
+
+ATTENDANCE_TOTALS = ['present_days', 'late_days', 'half_days', 'total_hours_worked']
+# Salary inputs calculate_payroll reads: (field, header keywords, default)
+SALARY_INPUTS = [
+    ('name', ['name'], 0),
+    ('emp_id', ['code', 'emp_id', 'id'], 'Unknown'),
+    ('designation', ['designation', 'role'], 0),
+    ('basic', ['basic'], 0),
+    ('hra', ['hra'], 0),
+    ('other_allow', ['other_allow', 'allowance'], 0)
+]
+SALARY_DEFAULTS = {field: default for field, _, default in SALARY_INPUTS}
+
 
 class PayrollAgent:
     """
@@ -15,75 +42,56 @@ class PayrollAgent:
     Enhanced with CLI support and JSON output
     """
 
-    def __init__(self, payslip_output_dir='payslips'):
+    def __init__(self, payslip_output_dir='payslips', policy_cache='.payroll_policy_cache.json',
+                 strict_policies=False, fetch_workers=8, split_attendance=True, db=None, roster=None):
         self.payslip_dir = payslip_output_dir
+        # RosterDays: reclassify Firestore attendance against rostered shifts
+        self.roster = roster
+        self.fetch_workers = fetch_workers
+        self.split_attendance = split_attendance
         self.data = {}
-        self.policies = {
-            'pf_rate': 0.12,
-            'pf_cap': 1800,
-            'esi_employee_rate': 0.0075,
-            'esi_threshold': 21000,
-            'pt_amount': 200,
-            'leave_encashment': False,
-            'encash_max_days': 10
-        }
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policy_version = DEFAULT_VERSION
         
-        # Initialize Firebase
-        if not firebase_admin._apps:
-            cred = credentials.Certificate('serviceAccountKey.json')
-            firebase_admin.initialize_app(cred)
+        # Initialize Firebase, unless a client was injected (e.g. firestore_fake.FakeFirestore)
+        if db is None:
+            if not firebase_admin._apps:
+                cred = credentials.Certificate('serviceAccountKey.json')
+                firebase_admin.initialize_app(cred)
+            db = firestore.client()
         
-        self.db = firestore.client()
+        self.db = db
+        self.policy_store = PolicyStore(self.db, policy_cache, strict=strict_policies)
+        self.leave_ledger = LeaveLedger(self.db)
+        self.tds_engine = TdsEngine(self.db)
         os.makedirs(self.payslip_dir, exist_ok=True)
+        self.payslip_store = PayslipStore(self.payslip_dir)
+        self.payslips_rendered = 0
 
-    def fetch_policies_from_firebase(self):
-        """Fetch payroll policies from Firestore"""
-        try:
-            policy_ref = self.db.collection('payroll_policies').document('current_policy')
-            policy_doc = policy_ref.get()
-            if policy_doc.exists:
-                policy_data = policy_doc.to_dict()
-                self.policies.update({
-                    'pf_rate': policy_data.get('pfRate', 0.12),
-                    'pf_cap': policy_data.get('pfCap', 1800),
-                    'esi_employee_rate': policy_data.get('esiEmployeeRate', 0.0075),
-                    'esi_threshold': policy_data.get('esiThreshold', 21000),
-                    'pt_amount': policy_data.get('ptAmount', 200),
-                    'leave_encashment': policy_data.get('leaveEncashment', False),
-                    'encash_max_days': policy_data.get('encashMaxDays', 10)
-                })
-                print(f"✅ Loaded policies from Firebase: {self.policies}", file=sys.stderr)
-        except Exception as e:
-            print(f"⚠️  Using default policies. Error: {e}", file=sys.stderr)
-
-    def fetch_data_from_firebase(self, year=None, month=None, employee_id=None):
+    def fetch_policies_from_firebase(self, year=None, month=None):
         """
-        Fetch Employee and Attendance data from Firestore
-        Args:
-            year: Year to process (default: current year)
-            month: Month to process (1-12, default: current month)
-            employee_id: Specific employee ID (optional, for single payslip)
+        Resolve the payroll policy in effect for the month (default: current month)
+        Closed historical windows come from the local cache without a Firestore read.
         """
-        print(f"📊 Fetching data from Firestore...", file=sys.stderr)
-        
-        # Default to current month if not specified
         now = datetime.now()
-        year = year or now.year
-        month = month or now.month
-        
-        # 1. Fetch Employees
+        self.policy_version, self.policies = self.policy_store.policy_for(year or now.year, month or now.month)
+        print(f"✅ Using policy version {self.policy_version}: {self.policies}", file=sys.stderr)
+
+    def fetch_employees(self, employee_id=None, shard=None):
+        """Salary frame for the run: one employee, a range shard, or everyone"""
         employees_ref = self.db.collection('employees')
         if employee_id:
             # Fetch specific employee
             query = employees_ref.where('emp_id', '==', employee_id.upper())
+        elif shard and shard.is_range:
+            # Range shards can be pushed down to Firestore
+            query = employees_ref.where('emp_id', '>=', shard.id_start).where('emp_id', '<=', shard.id_end)
         else:
             # Fetch all employees (don't filter by status since it may not exist)
             query = employees_ref
         
-        docs = query.stream()
-        
         emp_list = []
-        for doc in docs:
+        for doc in query.stream():
             d = doc.to_dict()
             salary = d.get('salary', {})
             flat_emp = {
@@ -97,48 +105,241 @@ class PayrollAgent:
             }
             emp_list.append(flat_emp)
             
-        self.data['salary'] = pd.DataFrame(emp_list)
-        
-        # 2. Fetch Attendance for specified month
-        days_in_month = calendar.monthrange(year, month)[1]
-        start_date = datetime(year, month, 1).strftime('%Y-%m-%d')
-        end_date = datetime(year, month, days_in_month).strftime('%Y-%m-%d')
-        
+        salary = pd.DataFrame(emp_list)
+        if shard:
+            salary = shard.filter_frame(salary)
+        return salary
+
+    def fetch_attendance_range(self, start_date, end_date):
+        """Attendance records with start_date <= date <= end_date (YYYY-MM-DD)"""
         attendance_ref = self.db.collection('attendance') \
             .where('date', '>=', start_date) \
             .where('date', '<=', end_date)
+        return [doc.to_dict() for doc in attendance_ref.stream()]
+
+    def attendance_ranges(self, year, month):
+        """The month as one date range, or as weekly ranges when split_attendance is on"""
+        days_in_month = calendar.monthrange(year, month)[1]
+        step = 7 if self.split_attendance else days_in_month
+        return [
+            (datetime(year, month, first).strftime('%Y-%m-%d'),
+             datetime(year, month, min(first + step - 1, days_in_month)).strftime('%Y-%m-%d'))
+            for first in range(1, days_in_month + 1, step)
+        ]
+
+    def fetch_data_from_firebase(self, year=None, month=None, employee_id=None, shard=None):
+        """
+        Fetch Employee and Attendance data from Firestore
+        Employees, (weekly) attendance ranges, leave balances and TDS year-to-date
+        are read concurrently, so the fetch takes about as long as the slowest query.
+        Args:
+            year: Year to process (default: current year)
+            month: Month to process (1-12, default: current month)
+            employee_id: Specific employee ID (optional, for single payslip)
+            shard: ShardSpec limiting the run to a slice of employees (optional)
+        """
+        print(f"📊 Fetching data from Firestore...", file=sys.stderr)
         
-        att_docs = attendance_ref.stream()
+        # Default to current month if not specified
+        now = datetime.now()
+        year = year or now.year
+        month = month or now.month
+        period = f"{year}-{month:02d}"
+        # Single employees and shards read balances for their own IDs, so those
+        # reads wait for the employee list; full runs read everything at once
+        subset_reads = bool(employee_id or shard)
         
-        att_list = []
-        for doc in att_docs:
-            d = doc.to_dict()
-            att_list.append(d)
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as pool:
+            employees = pool.submit(self.fetch_employees, employee_id, shard)
+            attendance_parts = [
+                pool.submit(self.fetch_attendance_range, start, end)
+                for start, end in self.attendance_ranges(year, month)
+            ]
+            if not subset_reads:
+                balances = pool.submit(self.leave_ledger.fetch_balances, period)
+                tds_ytd = pool.submit(self.tds_engine.fetch_ytd, year, month)
+
+            self.data['salary'] = employees.result()
+            if subset_reads and not self.data['salary'].empty:
+                subset = self.data['salary']['emp_id'].tolist()
+                balances = pool.submit(self.leave_ledger.fetch_balances, period, subset)
+                tds_ytd = pool.submit(self.tds_engine.fetch_ytd, year, month, subset)
+
+            # Leave balances: one bulk read, joined into the salary frame
+            if not self.data['salary'].empty:
+                self.data['salary'] = join_balances(self.data['salary'], balances.result())
+                self.data['tds_ytd'] = tds_ytd.result()
+
+            att_list = [record for part in attendance_parts for record in part.result()]
             
         self.data['attendance'] = pd.DataFrame(att_list)
+        if shard and not self.data['attendance'].empty and not self.data['salary'].empty:
+            owned = self.data['attendance']['employeeId'].isin(self.data['salary']['emp_id'])
+            self.data['attendance'] = self.data['attendance'][owned]
+        if self.roster is not None:
+            self.data['attendance'], changed = self.roster.reclassify(self.data['attendance'])
+            print(f"🗓️ Reclassified {changed} attendance records against rostered shifts", file=sys.stderr)
+        self.data['attendance_totals'] = self.aggregate_attendance()
+        self.index_attendance()
         self.data['month'] = calendar.month_name[month]
+        self.data['month_number'] = month
         self.data['year'] = year
-        self.data['days_in_month'] = days_in_month
+        self.data['days_in_month'] = calendar.monthrange(year, month)[1]
         
-        print(f"✅ Loaded {len(emp_list)} employees and {len(att_list)} attendance records for {calendar.month_name[month]} {year}", file=sys.stderr)
-
-    def calculate_payroll(self, emp_row):
-        """Calculate payroll for a single employee"""
-        def get_val(row, col_keywords, default=0):
-            for col in row.index:
-                if any(k.lower() in str(col).lower() for k in col_keywords):
-                    return row[col]
-            return default
-
-        def get(col_keywords, default=0):
-            return get_val(emp_row, col_keywords, default)
-
-        name = get(['name'])
-        emp_id = get(['code', 'emp_id', 'id'], 'Unknown')
-        designation = get(['designation', 'role'])
-        basic_da = float(get(['basic'], 0))
-        hra = float(get(['hra'], 0))
-        other_allow = float(get(['other_allow', 'allowance'], 0))
+        print(f"✅ Loaded {len(self.data['salary'])} employees and {len(self.data['attendance'])} attendance records for {calendar.month_name[month]} {year}", file=sys.stderr)
+
+    def fetch_inputs(self, year=None, month=None, employee_id=None, shard=None, excel_path=None):
+        """Resolve policies while employee/attendance data loads"""
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            policies = pool.submit(self.fetch_policies_from_firebase, year, month)
+            if excel_path:
+                self.load_excel(excel_path, year, month, employee_id, shard)
+            else:
+                self.fetch_data_from_firebase(year, month, employee_id, shard)
+            policies.result()
+
+    def load_excel(self, path, year=None, month=None, employee_id=None, shard=None):
+        """
+        Load an HR Excel upload ('Salary Data' + 'Attendance' sheets) instead of
+        Firestore employees/attendance. The workbook is streamed, so large
+        uploads don't need to fit in memory as cell objects.
+        """
+        print(f"📊 Loading {path}...", file=sys.stderr)
+
+        now = datetime.now()
+        year = year or now.year
+        month = month or now.month
+
+        salary, totals = build_payroll_inputs(path)
+        if employee_id:
+            salary = salary[salary['emp_id'] == employee_id.upper()]
+        if shard:
+            salary = shard.filter_frame(salary)
+        salary = salary.reset_index(drop=True)
+
+        self.data['salary'] = salary
+        self.data['tds_ytd'] = self.tds_engine.fetch_ytd(year, month, salary['emp_id'].tolist()) \
+            if not salary.empty else pd.DataFrame(columns=['emp_id'] + YTD_COLUMNS)
+        self.data['attendance'] = pd.DataFrame()
+        self.data['attendance_totals'] = totals[totals.index.isin(salary['emp_id'])]
+        self.index_attendance()
+        self.data['month'] = calendar.month_name[month]
+        self.data['month_number'] = month
+        self.data['year'] = year
+        self.data['days_in_month'] = calendar.monthrange(year, month)[1]
+
+        print(f"✅ Loaded {len(salary)} employees from {os.path.basename(path)} for {calendar.month_name[month]} {year}", file=sys.stderr)
+
+    def aggregate_attendance(self):
+        """
+        Per-employee attendance totals for the loaded month, in one groupby
+        Returns: DataFrame indexed by employeeId with present_days, late_days,
+                 half_days and total_hours_worked
+        """
+        att = self.data.get('attendance')
+        if att is None or att.empty:
+            return pd.DataFrame(columns=ATTENDANCE_TOTALS, dtype=float)
+
+        status = att['status'] if 'status' in att else pd.Series('', index=att.index)
+        hours = att['hoursWorked'] if 'hoursWorked' in att else pd.Series(0.0, index=att.index)
+        return pd.DataFrame({
+            'employeeId': att['employeeId'],
+            'present_days': (status == 'PRESENT').astype(int),
+            'late_days': (status == 'LATE').astype(int),
+            'half_days': (status == 'HALF_DAY').astype(int),
+            'total_hours_worked': pd.to_numeric(hours, errors='coerce').fillna(0)
+        }).groupby('employeeId').sum()
+
+    def build_payroll_frame(self):
+        """Salary data joined with attendance totals, one row per employee"""
+        frame = self.data['salary'].merge(
+            self.data['attendance_totals'], left_on='emp_id', right_index=True, how='left'
+        )
+        frame[ATTENDANCE_TOTALS] = frame[ATTENDANCE_TOTALS].fillna(0)
+        return frame
+
+    def compute_tds(self):
+        """Vectorized monthly TDS for every employee, stored as the `tds` salary column"""
+        if self.data['salary'].empty:
+            return
+        frame = self.build_payroll_frame()
+        frame['tds'] = 0.0
+        components = payroll_components(frame, [self.policies], self.data['days_in_month'])
+        monthly_taxable = components['gross'][0] + components['encashment'][0]
+        self.data['salary']['tds'] = self.tds_engine.compute(
+            frame, monthly_taxable, self.data['tds_ytd'], self.data['month_number']
+        )
+        if 'tds_override' in self.data['salary']:
+            # TDS supplied in an Excel upload wins over the projection
+            override = self.data['salary']['tds_override']
+            self.data['salary']['tds'] = override.where(override.notna(), self.data['salary']['tds'])
+
+    def finalize_month(self, results):
+        """
+        Close the processed month: fold results into the TDS year-to-date cache
+        and post leave encashments to the leave ledger (once per month).
+        """
+        year, month = self.data['year'], self.data['month_number']
+        period = f"{year}-{month:02d}"
+        updated = self.tds_engine.finalize(results, year, month)
+
+        already_encashed = set()
+        if 'encashed_leaves' in self.data['salary']:
+            salary = self.data['salary']
+            already_encashed = set(salary.loc[salary['encashed_leaves'] > 0, 'emp_id'].astype(str))
+        encashments = [
+            {
+                'emp_id': r['emp_id'],
+                'type': 'ENCASHMENT',
+                'days': min(r['remaining_leaves'], self.policies['encash_max_days']),
+                'period': period,
+                'reference': f"payroll_{period}"
+            }
+            for r in results if r.get('encashment', 0) > 0 and str(r['emp_id']) not in already_encashed
+        ]
+        posted = self.leave_ledger.post(encashments)
+        print(f"🔒 Finalized {period}: {updated} TDS records, {posted} leave encashments", file=sys.stderr)
+
+    def payroll_columns(self, columns):
+        """Resolve the salary input columns once: {field: column name or None}"""
+        return {field: resolve_column(columns, keywords) for field, keywords, _ in SALARY_INPUTS}
+
+    def index_attendance(self):
+        """Index the month's totals as {employeeId: (present, late, half, hours)}, once per run"""
+        totals = self.data['attendance_totals']
+        lookup = {}
+        if not totals.empty:
+            lookup = dict(zip(totals.index, zip(*(totals[c].to_numpy() for c in ATTENDANCE_TOTALS))))
+        self.data['attendance_lookup'] = lookup
+
+    def salary_rows(self):
+        """Salary rows as lightweight dicts, read column-wise (no per-row Series)"""
+        salary = self.data['salary']
+        names = list(salary.columns)
+        for values in zip(*(salary[c].to_numpy() for c in names)):
+            yield dict(zip(names, values))
+
+    def calculate_payroll(self, emp_row, columns=None):
+        """
+        Calculate payroll for a single employee
+        Args:
+            emp_row: Salary row (dict or pandas Series)
+            columns: payroll_columns() result, to skip per-row header matching
+        Returns: PayrollRecord
+        """
+        if columns is None:
+            columns = self.payroll_columns(emp_row.index if hasattr(emp_row, 'index') else list(emp_row))
+
+        def get(field):
+            col = columns.get(field)
+            return emp_row[col] if col is not None else SALARY_DEFAULTS[field]
+
+        name = get('name')
+        emp_id = get('emp_id')
+        designation = get('designation')
+        basic_da = float(get('basic'))
+        hra = float(get('hra'))
+        other_allow = float(get('other_allow'))
         
         gross_salary = basic_da + hra + other_allow
         
@@ -149,19 +350,20 @@ class PayrollAgent:
         half_days = 0
         total_hours_worked = 0
         
-        if not self.data['attendance'].empty:
-            emp_att = self.data['attendance'][self.data['attendance']['employeeId'] == emp_id]
-            
-            # Count by status
-            present_days = len(emp_att[emp_att['status'] == 'PRESENT'])
-            late_days = len(emp_att[emp_att['status'] == 'LATE'])
-            half_days = len(emp_att[emp_att['status'] == 'HALF_DAY'])
-            
-            # Calculate total hours worked
-            total_hours_worked = emp_att['hoursWorked'].fillna(0).sum()
+        emp_totals = self.data.get('attendance_lookup', {}).get(emp_id)
+        if emp_totals is not None:
+            # Counts by status, pre-aggregated once per run
+            present_days = int(emp_totals[0])
+            late_days = int(emp_totals[1])
+            half_days = int(emp_totals[2])
+            total_hours_worked = float(emp_totals[3])
         
-        # Calculate payable days: PRESENT + LATE + (HALF_DAY * 0.5)
-        payable_days = present_days + late_days + (half_days * 0.5)
+        # Leave balances joined from the leave ledger
+        approved_paid_leaves = float(emp_row.get('approved_paid_leaves', 0) or 0)
+        remaining_leaves = float(emp_row.get('leave_balance', 0) or 0)
+        
+        # Calculate payable days: PRESENT + LATE + (HALF_DAY * 0.5) + approved paid leave
+        payable_days = min(present_days + late_days + (half_days * 0.5) + approved_paid_leaves, days_in_month)
         lop_days = days_in_month - payable_days
 
         # Prorate salary based on payable days
@@ -176,49 +378,59 @@ class PayrollAgent:
         pf = min(basic_da * self.policies['pf_rate'], self.policies['pf_cap'])
         esi = prorated_gross * self.policies['esi_employee_rate'] if prorated_gross <= self.policies['esi_threshold'] else 0
         pt = self.policies['pt_amount'] if prorated_gross > 15000 else 0
-        tds = 0  # Placeholder for TDS calculation
+        tds = float(emp_row.get('tds', 0) or 0)  # Annualized projection, see compute_tds
         
         total_deductions = pf + esi + pt + tds
 
         # Leave encashment
         encashment = 0
-        remaining_leaves = 10  # TODO: Fetch from leaves collection
         if self.policies['leave_encashment'] and remaining_leaves > 0:
             encashment = ((basic_da + hra) / 30) * min(remaining_leaves, self.policies['encash_max_days'])
 
         net_pay = prorated_gross - total_deductions + encashment
 
-        return {
-            'emp_id': str(emp_id),
-            'name': str(name),
-            'designation': str(designation),
-            'month': f"{self.data['month']} {self.data['year']}",
-            'present_days': round(present_days, 1),
-            'late_days': round(late_days, 1),
-            'half_days': round(half_days, 1),
-            'total_hours_worked': round(total_hours_worked, 2),
-            'approved_paid_leaves': 0,
-            'lop_days': round(lop_days, 1),
-            'payable_days': round(payable_days, 1),
-            'remaining_leaves': round(remaining_leaves, 1),
-            'basic_da': round(basic_da, 2),
-            'hra': round(hra, 2),
-            'other_allow': round(other_allow, 2),
-            'gross': round(prorated_gross, 2),
-            'pf': round(pf, 2),
-            'esi': round(esi, 2),
-            'pt': round(pt, 2),
-            'tds': round(tds, 2),
-            'total_deductions': round(total_deductions, 2),
-            'encashment': round(encashment, 2),
-            'net_pay': round(net_pay, 2)
-        }
+        return PayrollRecord(
+            emp_id=str(emp_id),
+            name=str(name),
+            designation=str(designation),
+            month=f"{self.data['month']} {self.data['year']}",
+            present_days=round(present_days, 1),
+            late_days=round(late_days, 1),
+            half_days=round(half_days, 1),
+            total_hours_worked=round(total_hours_worked, 2),
+            approved_paid_leaves=round(approved_paid_leaves, 1),
+            lop_days=round(lop_days, 1),
+            payable_days=round(payable_days, 1),
+            remaining_leaves=round(remaining_leaves, 1),
+            basic_da=round(basic_da, 2),
+            hra=round(hra, 2),
+            other_allow=round(other_allow, 2),
+            gross=round(prorated_gross, 2),
+            pf=round(pf, 2),
+            esi=round(esi, 2),
+            pt=round(pt, 2),
+            tds=round(tds, 2),
+            total_deductions=round(total_deductions, 2),
+            encashment=round(encashment, 2),
+            net_pay=round(net_pay, 2)
+        )
 
     def generate_payslip_pdf(self, data):
-        """Generate PDF payslip"""
-        filename = f"payslip_{data['emp_id']}_{data['month'].replace(' ', '_')}.pdf"
-        path = os.path.join(self.payslip_dir, filename)
-        
+        """
+        Generate PDF payslip through the content-addressed store; unchanged
+        payslips from an earlier run are reused without rendering.
+        """
+        filename = f"payslip_{data.emp_id}_{data.month.replace(' ', '_')}.pdf"
+        period = f"{self.data['year']}-{self.data['month_number']:02d}"
+        path, rendered = self.payslip_store.put(
+            data.emp_id, period, filename, data.to_dict(),
+            lambda target: self.render_payslip_pdf(data, target)
+        )
+        self.payslips_rendered += rendered
+        return path
+
+    def render_payslip_pdf(self, data, path):
+        """Render a PayrollRecord's payslip layout to `path`"""
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font('Arial', 'B', 16)
@@ -227,32 +439,32 @@ class PayrollAgent:
         
         pdf.set_font('Arial', '', 11)
         info = [
-            f"Name: {data['name']}",
-            f"Employee ID: {data['emp_id']}",
-            f"Designation: {data['designation']}",
-            f"Month: {data['month']}",
+            f"Name: {data.name}",
+            f"Employee ID: {data.emp_id}",
+            f"Designation: {data.designation}",
+            f"Month: {data.month}",
             "",
             "ATTENDANCE SUMMARY",
-            f"Present Days: {data['present_days']} | Late Days: {data['late_days']} | Half Days: {data['half_days']}",
-            f"Total Hours Worked: {data['total_hours_worked']} hrs",
-            f"Loss of Pay Days: {data['lop_days']}",
-            f"Payable Days: {data['payable_days']} / 30",
+            f"Present Days: {data.present_days} | Late Days: {data.late_days} | Half Days: {data.half_days}",
+            f"Total Hours Worked: {data.total_hours_worked} hrs",
+            f"Loss of Pay Days: {data.lop_days}",
+            f"Payable Days: {data.payable_days} / 30",
             "",
             "EARNINGS",
-            f"Basic + DA: Rs. {data['basic_da']:,.2f}",
-            f"HRA: Rs. {data['hra']:,.2f}",
-            f"Other Allowances: Rs. {data['other_allow']:,.2f}",
-            f"Gross Salary (Prorated): Rs. {data['gross']:,.2f}",
-            f"Leave Encashment: Rs. {data['encashment']:,.2f}" if data['encashment'] > 0 else "",
+            f"Basic + DA: Rs. {data.basic_da:,.2f}",
+            f"HRA: Rs. {data.hra:,.2f}",
+            f"Other Allowances: Rs. {data.other_allow:,.2f}",
+            f"Gross Salary (Prorated): Rs. {data.gross:,.2f}",
+            f"Leave Encashment: Rs. {data.encashment:,.2f}" if data.encashment > 0 else "",
             "",
             "DEDUCTIONS",
-            f"PF: Rs. {data['pf']:,.2f}",
-            f"ESI: Rs. {data['esi']:,.2f}",
-            f"Professional Tax: Rs. {data['pt']:,.2f}",
-            f"TDS: Rs. {data['tds']:,.2f}",
-            f"Total Deductions: Rs. {data['total_deductions']:,.2f}",
+            f"PF: Rs. {data.pf:,.2f}",
+            f"ESI: Rs. {data.esi:,.2f}",
+            f"Professional Tax: Rs. {data.pt:,.2f}",
+            f"TDS: Rs. {data.tds:,.2f}",
+            f"Total Deductions: Rs. {data.total_deductions:,.2f}",
             "",
-            f"NET PAY: Rs. {data['net_pay']:,.2f}"
+            f"NET PAY: Rs. {data.net_pay:,.2f}"
         ]
         
         for line in info:
@@ -262,9 +474,37 @@ class PayrollAgent:
         pdf.output(path)
         return path
 
-    def process_payroll(self, year=None, month=None, employee_id=None):
+    def simulate(self, grid, year=None, month=None, shard=None, excel_path=None):
+        """
+        What-if analysis: evaluate a grid of policy variants for a month
+        without rendering PDFs or writing anything.
+        Args:
+            grid: {"pf_cap": [1800, 2100], ...} - every combination is evaluated
+        """
+        self.fetch_inputs(year, month, shard=shard, excel_path=excel_path)
+        self.compute_tds()
+        report = simulate_policies(
+            self.build_payroll_frame(),
+            self.policies,
+            expand_grid(grid),
+            self.data['days_in_month']
+        )
+        report.pop('net_pay_delta')
+        report['baseline']['policy_version'] = self.policy_version
+        report['month'] = self.data['month']
+        report['year'] = self.data['year']
+        return report
+
+    def process_payroll(self, year=None, month=None, employee_id=None, shard=None,
+                        checkpoint=None, resume=False, on_result=None, excel_path=None):
         """
         Process payroll and return results as JSON
+        Args:
+            shard: ShardSpec to process only part of the company (optional)
+            checkpoint: PayrollCheckpoint journaling completed employees (optional)
+            resume: Skip employees already completed in the checkpoint journal
+            on_result: Callback invoked with each payroll record as it completes (optional)
+            excel_path: Read employees and attendance from an HR upload instead of Firestore
         Returns: List of payroll records
         """
         results = []
@@ -272,28 +512,50 @@ class PayrollAgent:
         
         try:
             # Fetch policies and data
-            self.fetch_policies_from_firebase()
-            self.fetch_data_from_firebase(year, month, employee_id)
+            self.fetch_inputs(year, month, employee_id, shard, excel_path)
             
-            if self.data['salary'].empty:
+            if self.data['salary'].empty and shard is None:
                 return {
                     'success': False,
                     'error': 'No employee data found',
                     'results': [],
                     'errors': []
                 }
+
+            self.compute_tds()
+            
+            completed = {}
+            if checkpoint:
+                completed = checkpoint.resumable() if resume else {}
+                completed = {emp: PayrollRecord.from_dict(done) for emp, done in completed.items()}
+                checkpoint.start(resume)
+                if completed:
+                    print(f"⏩ Resuming: {len(completed)} employees already completed", file=sys.stderr)
             
             # Process each employee
-            for _, row in self.data['salary'].iterrows():
+            columns = self.payroll_columns(self.data['salary'].columns)
+            for row in self.salary_rows():
+                done = completed.get(str(row.get('emp_id')))
+                if done:
+                    results.append(done)
+                    if on_result:
+                        on_result(done)
+                    continue
+
                 try:
-                    payroll = self.calculate_payroll(row)
+                    payroll = self.calculate_payroll(row, columns)
                     pdf_path = self.generate_payslip_pdf(payroll)
                     
-                    payroll['pdf_path'] = pdf_path
-                    payroll['pdf_filename'] = os.path.basename(pdf_path)
-                    payroll['status'] = 'success'
+                    payroll.pdf_path = pdf_path
+                    payroll.pdf_filename = os.path.basename(pdf_path)
+                    payroll.policy_version = self.policy_version
+                    payroll.status = 'success'
                     
                     results.append(payroll)
+                    if checkpoint:
+                        checkpoint.record(payroll)
+                    if on_result:
+                        on_result(payroll)
                     print(f"✅ Generated payslip for {row['name']}", file=sys.stderr)
                     
                 except Exception as e:
@@ -305,16 +567,22 @@ class PayrollAgent:
                     errors.append(error)
                     print(f"❌ Error processing {row.get('name')}: {e}", file=sys.stderr)
             
-            return {
+            print(f"🗂️ Rendered {self.payslips_rendered} payslips, "
+                  f"{len(results) - self.payslips_rendered} unchanged or resumed", file=sys.stderr)
+            result = {
                 'success': True,
                 'month': self.data['month'],
                 'year': self.data['year'],
+                'policy_version': self.policy_version,
                 'total_employees': len(self.data['salary']),
                 'processed': len(results),
                 'failed': len(errors),
                 'results': results,
                 'errors': errors
             }
+            if shard:
+                result['shard'] = shard.to_dict()
+            return result
             
         except Exception as e:
             return {
@@ -324,28 +592,42 @@ class PayrollAgent:
                 'errors': []
             }
 
+        finally:
+            if checkpoint:
+                checkpoint.close()
 
-def main():
-    """CLI entry point"""
-    parser = argparse.ArgumentParser(description='Payroll Processing System')
-    parser.add_argument('--month', type=int, help='Month (1-12)')
-    parser.add_argument('--year', type=int, help='Year (e.g., 2026)')
-    parser.add_argument('--employee', type=str, help='Specific employee ID')
-    parser.add_argument('--output', type=str, default='payslips', help='Output directory for PDFs')
-    parser.add_argument('--json', action='store_true', help='Output results as JSON')
-    
-    args = parser.parse_args()
-    
-    agent = PayrollAgent(payslip_output_dir=args.output)
-    result = agent.process_payroll(
-        year=args.year,
-        month=args.month,
-        employee_id=args.employee
-    )
-    
-    if args.json:
+
+    def email_payslips(self, results, workers=4, rate=5, send_log='payslip_send_log.db'):
+        """
+        Email payslips from a completed run, skipping ones already delivered.
+        Addresses come from the employee records; SMTP settings from SMTP_* env vars.
+        Returns: dispatch summary (sent, skipped, no_email, failed, errors)
+        """
+        period = f"{self.data['year']}-{self.data['month_number']:02d}"
+        salary = self.data['salary']
+        emails = {}
+        if 'email' in salary:
+            emails = {str(e): a for e, a in zip(salary['emp_id'], salary['email']) if isinstance(a, str) and a}
+        hashes = {
+            str(r['emp_id']): (self.payslip_store.lookup(r['emp_id'], period) or {}).get('hash', '')
+            for r in results
+        }
+        mailer = PayslipMailer(workers=workers, rate=rate, send_log=SendLog(send_log))
+        try:
+            summary = mailer.dispatch(results, emails, period, hashes)
+        finally:
+            mailer.close()
+        print(f"📧 Emailed {summary['sent']} payslips ({summary['skipped']} already sent, "
+              f"{summary['no_email']} without email, {summary['failed']} failed) in {summary['seconds']}s",
+              file=sys.stderr)
+        return summary
+
+
+def print_result(result, as_json):
+    """Print a payroll result for Node (JSON) or for humans"""
+    if as_json:
         # Output JSON for Node.js consumption
-        print(json.dumps(result, indent=2))
+        print(json.dumps(result, indent=2, default=json_default))
     else:
         # Human-readable output
         if result['success']:
@@ -359,5 +641,173 @@ def main():
             sys.exit(1)
 
 
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description='Payroll Processing System')
+    parser.add_argument('--month', type=int, help='Month (1-12)')
+    parser.add_argument('--year', type=int, help='Year (e.g., 2026)')
+    parser.add_argument('--employee', type=str, help='Specific employee ID')
+    parser.add_argument('--output', type=str, default='payslips', help='Output directory for PDFs')
+    parser.add_argument('--json', action='store_true', help='Output results as JSON')
+    parser.add_argument('--shard', type=str, help='Process one shard: K/N (emp_id hash) or range:START-END')
+    parser.add_argument('--shard-dir', type=str, default='payroll_shards', help='Directory for per-shard result files')
+    parser.add_argument('--local-shards', type=int, help='Run N hash shards as parallel local workers, then merge')
+    parser.add_argument('--merge', nargs='+', metavar='FILE', help='Merge per-shard result files and exit')
+    parser.add_argument('--checkpoint-dir', type=str, default='payroll_checkpoints', help='Directory for run checkpoint journals')
+    parser.add_argument('--resume', action='store_true', help='Continue a crashed run from its last checkpoint')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'parquet', 'arrow'], help='Machine-readable output format')
+    parser.add_argument('--results-file', type=str, help='Results destination for ndjson (default stdout), parquet or arrow')
+    parser.add_argument('--ledger', type=str, default='payroll_ledger.db', help='SQLite payroll history ledger')
+    parser.add_argument('--no-ledger', action='store_true', help='Do not record this run in the ledger')
+    parser.add_argument('--diff', nargs=2, metavar=('FROM', 'TO'), help='Compare two ledger periods (YYYY-MM) and exit')
+    parser.add_argument('--finalize', action='store_true', help='Close the month: update TDS year-to-date and post leave encashments')
+    parser.add_argument('--policy-cache', type=str, default='.payroll_policy_cache.json', help='Local payroll policy cache file')
+    parser.add_argument('--strict-policies', action='store_true', help='Fail instead of falling back to cached/default policies')
+    parser.add_argument('--bundle', action='store_true', help='Zip the month\'s payslips into payslips/bundles/ after the run')
+    parser.add_argument('--email', action='store_true', help='Email payslips after the run (SMTP_HOST/SMTP_PORT/SMTP_USER/SMTP_PASSWORD/SMTP_FROM)')
+    parser.add_argument('--email-workers', type=int, default=4, help='Concurrent SMTP connections')
+    parser.add_argument('--email-rate', type=float, default=5, help='Maximum emails per second')
+    parser.add_argument('--send-log', type=str, default='payslip_send_log.db', help='SQLite log of delivered payslips')
+    parser.add_argument('--fetch-workers', type=int, default=8, help='Concurrent Firestore reads while loading the month')
+    parser.add_argument('--no-split-attendance', action='store_true', help='Read the month of attendance in one query instead of weekly ranges')
+    parser.add_argument('--excel', type=str, metavar='XLSX', help='Read employees and attendance from an HR Excel upload')
+    parser.add_argument('--roster', type=str, metavar='JSON',
+                        help='Roster day tables (backend: python -m services.roster_service --export); classifies attendance by shift')
+    parser.add_argument('--simulate', type=str, metavar='GRID_JSON',
+                        help='What-if policy grid, e.g. \'{"pf_cap": [1800, 2100]}\'; no PDFs are generated')
+    
+    args = parser.parse_args()
+
+    if args.diff:
+        ledger = PayrollLedger(args.ledger)
+        diff = ledger.diff_periods(*args.diff)
+        print(json.dumps({'from': args.diff[0], 'to': args.diff[1], 'changed': diff_records(diff)}, indent=2, default=str))
+        ledger.close()
+        return
+
+    if args.merge:
+        print_result(merge_shard_files(args.merge), args.json)
+        return
+
+    now = datetime.now()
+    year = args.year or now.year
+    month = args.month or now.month
+
+    output_format = args.format or ('json' if args.json else None)
+    writer = NdjsonResultWriter(args.results_file) if output_format == 'ndjson' else None
+    label, agent = None, None
+
+    if args.local_shards:
+        # Workers share this run's inputs and policy settings; the parent merges,
+        # records the ledger once and writes the requested output
+        worker_args = ['--year', str(year), '--month', str(month),
+                       '--output', args.output, '--shard-dir', args.shard_dir,
+                       '--checkpoint-dir', args.checkpoint_dir, '--policy-cache', args.policy_cache,
+                       '--fetch-workers', str(args.fetch_workers), '--no-ledger']
+        if args.resume:
+            worker_args.append('--resume')
+        if args.finalize:
+            worker_args.append('--finalize')
+        if args.strict_policies:
+            worker_args.append('--strict-policies')
+        if args.no_split_attendance:
+            worker_args.append('--no-split-attendance')
+        if args.excel:
+            worker_args += ['--excel', os.path.abspath(args.excel)]
+        if args.roster:
+            worker_args += ['--roster', os.path.abspath(args.roster)]
+        if args.email:
+            # Each shard emails its own employees; the send log is shared
+            worker_args += ['--email', '--email-workers', str(args.email_workers),
+                            '--email-rate', str(args.email_rate / args.local_shards), '--send-log', args.send_log]
+        specs = [ShardSpec(i, args.local_shards) for i in range(args.local_shards)]
+        paths = [shard_result_path(args.shard_dir, year, month, spec) for spec in specs]
+        # A file left from an earlier run of this period must not pass for this run's output
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        exit_codes = run_local_shards(args.local_shards, worker_args, os.path.abspath(__file__))
+        print(f"🧩 Shard workers finished with exit codes {exit_codes}", file=sys.stderr)
+        failed_shards = [
+            f"{spec.label} ({'exit code ' + str(code) if code else 'no result file'})"
+            for spec, code, path in zip(specs, exit_codes, paths) if code or not os.path.exists(path)
+        ]
+        result = merge_shard_files([p for p in paths if os.path.exists(p)])
+        if failed_shards:
+            # Those shards' employees are missing from the merge: the run is incomplete
+            result['success'] = False
+            result['error'] = '; '.join(filter(None, [f"Shard workers failed: {', '.join(failed_shards)}",
+                                                      result.get('error')]))
+        if args.bundle and result['success']:
+            result['bundle_path'] = PayslipStore(args.output).bundle(period_key(year, month))
+        if writer and result['success']:
+            for payroll in result['results']:
+                writer.write_result(payroll)
+    else:
+        shard = ShardSpec.parse(args.shard) if args.shard else None
+        roster = RosterDays.load(args.roster) if args.roster else None
+
+        if args.simulate:
+            agent = PayrollAgent(payslip_output_dir=args.output, policy_cache=args.policy_cache,
+                                 strict_policies=args.strict_policies, fetch_workers=args.fetch_workers,
+                                 split_attendance=not args.no_split_attendance, roster=roster)
+            print(json.dumps(agent.simulate(json.loads(args.simulate), year, month, shard, args.excel), indent=2))
+            return
+
+        label = '_'.join(filter(None, [args.employee and args.employee.upper(), shard and shard.label])) or None
+        checkpoint = PayrollCheckpoint(args.checkpoint_dir, year, month, label)
+
+        agent = PayrollAgent(payslip_output_dir=args.output, policy_cache=args.policy_cache,
+                             strict_policies=args.strict_policies, fetch_workers=args.fetch_workers,
+                             split_attendance=not args.no_split_attendance, roster=roster)
+        result = agent.process_payroll(
+            year=year,
+            month=month,
+            employee_id=args.employee,
+            shard=shard,
+            checkpoint=checkpoint,
+            resume=args.resume,
+            on_result=writer.write_result if writer else None,
+            excel_path=args.excel
+        )
+
+        if args.finalize and result['success']:
+            agent.finalize_month(result['results'])
+
+        if args.bundle and result['success']:
+            result['bundle_path'] = agent.payslip_store.bundle(period_key(year, month))
+            print(f"📦 Bundled payslips into {result['bundle_path']}", file=sys.stderr)
+
+        if args.email and result['success']:
+            result['email'] = agent.email_payslips(result['results'], args.email_workers, args.email_rate, args.send_log)
+
+        if shard:
+            path = write_shard_result(result, shard_result_path(args.shard_dir, year, month, shard))
+            print(f"🧩 Wrote {shard.label} results to {path}", file=sys.stderr)
+
+    if result['success'] and not args.no_ledger:
+        ledger = PayrollLedger(args.ledger)
+        policy_version = result.get('policy_version') or policy_fingerprint(agent.policies if agent else DEFAULT_POLICIES)
+        appended = ledger.append_run(result['results'], period_key(year, month), policy_version)
+        ledger.close()
+        print(f"📒 Recorded {appended} ledger entries in {args.ledger}", file=sys.stderr)
+
+    if writer:
+        # Records were already streamed; finish with the summary line
+        writer.write_summary(result)
+        writer.close()
+    elif output_format in ('parquet', 'arrow') and result['success']:
+        path = args.results_file or default_results_path(output_format, year, month, label)
+        write_columnar = write_parquet if output_format == 'parquet' else write_arrow
+        summary = summarize(result)
+        summary['results_path'] = write_columnar(result['results'], path, year, month)
+        print(json.dumps(summary))
+    else:
+        print_result(result, output_format == 'json')
+
+    if args.local_shards and not result['success']:
+        sys.exit(1)
+
+
 if __name__ == '__main__':
     main()
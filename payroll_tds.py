@@ -0,0 +1,184 @@
+"""
+Annualized TDS (income tax withholding) engine.
+
+Year-to-date figures are cached per employee and fiscal year in `tds_ytd`:
+
+    tds_ytd/<emp_id>_FY2025 = {emp_id, fiscal_year, taxable_ytd, tds_ytd,
+                               months: {"2025-12": {"taxable": .., "tds": ..}}}
+
+The cache is updated when a month is finalized (--finalize), so computing the
+current month never re-reads earlier payroll. Year-to-date for a month is the
+sum of the finalized months before it, so re-running an earlier month after
+later ones were finalized gives the same figures. Monthly TDS is:
+
+    projected = taxable_ytd + this_month_taxable * (months_remaining + months_missing)
+                - standard_deduction
+    monthly   = max(0, (annual_tax(projected) - tds_ytd) / months_remaining)
+
+where months_missing counts earlier fiscal-year months with nothing finalized
+(no history yet), which are assumed to have paid this month's taxable income.
+
+evaluated as array math across the whole company. Defaults follow the new
+tax regime (FY 2025-26 slabs, section 87A rebate with marginal relief, 4% cess).
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TDS_CONFIG = {
+    'standard_deduction': 75000,
+    # (upper bound of slab, rate); the last slab is open-ended
+    'slabs': [
+        (400000, 0.0),
+        (800000, 0.05),
+        (1200000, 0.10),
+        (1600000, 0.15),
+        (2000000, 0.20),
+        (2400000, 0.25),
+        (float('inf'), 0.30)
+    ],
+    'rebate_limit': 1200000,
+    'cess_rate': 0.04
+}
+YTD_COLUMNS = ['taxable_ytd', 'tds_ytd', 'months_ytd']
+
+
+def fiscal_year(year, month):
+    """Indian fiscal year label (April-March), e.g. Jan 2026 -> FY2025"""
+    return f"FY{year if month >= 4 else year - 1}"
+
+
+def months_remaining(month):
+    """Payroll months left in the fiscal year, including this one"""
+    return 16 - month if month >= 4 else 4 - month
+
+
+def months_elapsed(month):
+    """Fiscal-year months before this one"""
+    return 12 - months_remaining(month)
+
+
+def annual_tax(taxable, config=None):
+    """Vectorized annual tax (including cess) for an array of taxable incomes"""
+    config = config or DEFAULT_TDS_CONFIG
+    taxable = np.maximum(np.asarray(taxable, dtype=float), 0)
+    uppers = np.array([upper for upper, _ in config['slabs']])
+    rates = np.array([rate for _, rate in config['slabs']])
+    lowers = np.concatenate([[0.0], uppers[:-1]])
+
+    # Income falling inside each slab, (E, K) @ (K,)
+    in_slab = np.clip(taxable[:, None] - lowers, 0, uppers - lowers)
+    tax = in_slab @ rates
+
+    # Rebate: no tax up to the limit; just above it, tax can't exceed the excess income
+    limit = config['rebate_limit']
+    tax = np.where(taxable <= limit, 0.0, np.minimum(tax, taxable - limit))
+    return tax * (1 + config['cess_rate'])
+
+
+def compute_monthly_tds(monthly_taxable, taxable_ytd, tds_ytd, month, config=None, months_ytd=None):
+    """
+    Current-month TDS for every employee at once.
+    Args:
+        monthly_taxable: This month's taxable income per employee
+        taxable_ytd / tds_ytd: Finalized fiscal-year totals for the months before this one
+        month: Calendar month being processed (1-12)
+        months_ytd: Finalized months behind those totals; earlier months without
+                    history are projected at this month's income (default: full history)
+    """
+    config = config or DEFAULT_TDS_CONFIG
+    remaining = months_remaining(month)
+    monthly_taxable = np.asarray(monthly_taxable, dtype=float)
+    missing = 0 if months_ytd is None else np.maximum(months_elapsed(month) - np.asarray(months_ytd, dtype=float), 0)
+    projected = np.asarray(taxable_ytd, dtype=float) + monthly_taxable * (remaining + missing) \
+        - config['standard_deduction']
+    due = annual_tax(projected, config) - np.asarray(tds_ytd, dtype=float)
+    return np.maximum(due, 0) / remaining
+
+
+class TdsEngine:
+    """Maintains cached year-to-date aggregates and computes monthly TDS"""
+
+    def __init__(self, db, config=None):
+        self.db = db
+        self.config = config or DEFAULT_TDS_CONFIG
+
+    def _ytd_docs(self, fy, emp_ids=None):
+        if emp_ids is not None:
+            refs = [self.db.collection('tds_ytd').document(f"{str(e).upper()}_{fy}") for e in emp_ids]
+            return [d.to_dict() for d in self.db.get_all(refs) if d.exists] if refs else []
+        return [d.to_dict() for d in self.db.collection('tds_ytd').where('fiscal_year', '==', fy).stream()]
+
+    def fetch_ytd(self, year, month, emp_ids=None):
+        """
+        Fiscal-year-to-date totals for all employees in one read: the finalized
+        months strictly before this one (so re-runs of any month, in any order,
+        see the same history).
+        Returns: DataFrame with emp_id, taxable_ytd, tds_ytd, months_ytd
+        """
+        period = f"{year}-{month:02d}"
+        rows = []
+        for d in self._ytd_docs(fiscal_year(year, month), emp_ids):
+            earlier = [m for key, m in (d.get('months') or {}).items() if key < period]
+            rows.append({
+                'emp_id': d['emp_id'],
+                'taxable_ytd': sum(m.get('taxable', 0) for m in earlier),
+                'tds_ytd': sum(m.get('tds', 0) for m in earlier),
+                'months_ytd': len(earlier)
+            })
+        return pd.DataFrame(rows, columns=['emp_id'] + YTD_COLUMNS)
+
+    def compute(self, frame, monthly_taxable, ytd, month):
+        """
+        Monthly TDS aligned with `frame` rows.
+        Args:
+            frame: Payroll frame with emp_id
+            monthly_taxable: Array of this month's taxable income, same order as frame
+            ytd: Output of fetch_ytd
+        """
+        # YTD documents are keyed by upper-cased IDs; salary sheets may not be
+        keys = pd.DataFrame({'emp_id': frame['emp_id'].astype(str).str.upper().to_numpy()})
+        ytd = ytd.assign(emp_id=ytd['emp_id'].astype(str).str.upper())
+        aligned = keys.merge(ytd, on='emp_id', how='left')[YTD_COLUMNS].fillna(0)
+        return compute_monthly_tds(
+            monthly_taxable,
+            aligned['taxable_ytd'].to_numpy(),
+            aligned['tds_ytd'].to_numpy(),
+            month,
+            self.config,
+            aligned['months_ytd'].to_numpy()
+        )
+
+    def finalize(self, results, year, month, batch_size=400):
+        """
+        Fold a finished month into the YTD cache. Re-finalizing a month replaces
+        its earlier contribution rather than adding to it.
+        Returns: number of employees updated
+        """
+        fy = fiscal_year(year, month)
+        period = f"{year}-{month:02d}"
+        previous = {d['emp_id']: d.get('months') or {} for d in self._ytd_docs(fy, [r['emp_id'] for r in results])}
+        now = datetime.now().isoformat()
+
+        for start in range(0, len(results), batch_size):
+            batch = self.db.batch()
+            for record in results[start:start + batch_size]:
+                emp_id = str(record['emp_id']).upper()
+                taxable = float(record['gross']) + float(record.get('encashment', 0))
+                tds = float(record.get('tds', 0))
+                ref = self.db.collection('tds_ytd').document(f"{emp_id}_{fy}")
+
+                # Totals are rebuilt from every other finalized month, so re-runs are idempotent
+                others = [m for key, m in previous.get(emp_id, {}).items() if key != period]
+                batch.set(ref, {
+                    'emp_id': emp_id,
+                    'fiscal_year': fy,
+                    'taxable_ytd': sum(m.get('taxable', 0) for m in others) + taxable,
+                    'tds_ytd': sum(m.get('tds', 0) for m in others) + tds,
+                    'months': {period: {'taxable': taxable, 'tds': tds}},
+                    'updatedAt': now
+                }, merge=True)
+            batch.commit()
+
+        return len(results)
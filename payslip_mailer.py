@@ -0,0 +1,396 @@
+"""
+Payslip email dispatch.
+
+Sends each employee their payslip PDF after a payroll run:
+- a small pool of reused SMTP connections shared by a few worker threads
+- a token-bucket rate limit (providers throttle bursts)
+- retries with exponential backoff for transient failures only (dropped or
+  refused connections, timeouts, 4xx replies); broken connections are replaced
+- a SQLite send log keyed by (period, emp_id, payslip hash), so re-runs skip
+  payslips already delivered and only re-send ones whose content changed
+
+SMTP settings come from the environment: SMTP_HOST, SMTP_PORT, SMTP_USER,
+SMTP_PASSWORD, SMTP_FROM, SMTP_SSL=1 (implicit TLS) / SMTP_STARTTLS=0.
+
+A local stand-in server and a throughput benchmark are built in:
+
+    python payslip_mailer.py sink --port 1025
+    python payslip_mailer.py bench --messages 500 --workers 8 --rate 200
+"""
+import os
+import sys
+import time
+import queue
+import sqlite3
+import smtplib
+import threading
+import socketserver
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.message import EmailMessage
+
+
+def is_retryable(error):
+    """
+    True for failures another attempt can fix: a dropped or refused connection,
+    a timeout, or a 4xx (temporary) reply. Auth failures and 5xx refusals are final.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # Socket-level errors (refused, reset, unreachable, timed out); other SMTP errors are final
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SendError(Exception):
+    """A message that could not be delivered, with the number of attempts made"""
+
+    def __init__(self, error, attempts):
+        super().__init__(str(error))
+        self.error = error
+        self.attempts = attempts
+
+
+def smtp_settings_from_env():
+    port = int(os.environ.get('SMTP_PORT', 587))
+    return {
+        'host': os.environ.get('SMTP_HOST', 'localhost'),
+        'port': port,
+        'user': os.environ.get('SMTP_USER'),
+        'password': os.environ.get('SMTP_PASSWORD'),
+        'sender': os.environ.get('SMTP_FROM', 'payroll@company.com'),
+        'ssl': os.environ.get('SMTP_SSL', '1' if port == 465 else '0') == '1',
+        'starttls': os.environ.get('SMTP_STARTTLS', '1' if port == 587 else '0') == '1'
+    }
+
+
+class SmtpPool:
+    """Up to `size` open SMTP connections, reused across messages"""
+
+    def __init__(self, settings, size=4, timeout=30):
+        self.settings = settings
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _connect(self):
+        s = self.settings
+        cls = smtplib.SMTP_SSL if s.get('ssl') else smtplib.SMTP
+        conn = cls(s['host'], s['port'], timeout=self.timeout)
+        if s.get('starttls') and not s.get('ssl'):
+            conn.starttls()
+        if s.get('user'):
+            conn.login(s['user'], s['password'])
+        self.opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it's discarded instead of returned if the send fails"""
+        self._slots.acquire()
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            yield conn
+            self._idle.put(conn)
+            conn = None
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except Exception:
+                conn.close()
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursts up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SendLog:
+    """Persistent record of delivered payslips"""
+
+    def __init__(self, path='payslip_send_log.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sends (
+                period TEXT NOT NULL,
+                emp_id TEXT NOT NULL,
+                payslip_hash TEXT NOT NULL,
+                email TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (period, emp_id, payslip_hash)
+            )
+        ''')
+        self.conn.commit()
+
+    def sent(self, period):
+        """{(emp_id, payslip_hash)} already delivered for a period"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT emp_id, payslip_hash FROM sends WHERE period = ? AND status = 'SENT'", (period,)
+            ).fetchall()
+        return set(rows)
+
+    def record(self, period, emp_id, payslip_hash, email, status, attempts, error=None):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sends VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (period, emp_id, payslip_hash, email, status, attempts, error, datetime.now().isoformat())
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def build_message(sender, recipient, payroll, pdf_path):
+    msg = EmailMessage()
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = f"Payslip for {payroll['month']}"
+    msg.set_content(
+        f"Dear {payroll['name']},\n\n"
+        f"Please find attached your payslip for {payroll['month']}.\n"
+        f"Net pay: Rs. {payroll['net_pay']:,.2f}\n\n"
+        "Regards,\nHR Team"
+    )
+    with open(pdf_path, 'rb') as f:
+        msg.add_attachment(f.read(), maintype='application', subtype='pdf',
+                           filename=os.path.basename(pdf_path))
+    return msg
+
+
+class PayslipMailer:
+    """Sends payslips concurrently through a shared SMTP pool"""
+
+    def __init__(self, settings=None, workers=4, rate=5, retries=3, backoff=1.0, send_log=None):
+        self.settings = settings or smtp_settings_from_env()
+        self.workers = workers
+        self.pool = SmtpPool(self.settings, size=workers)
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.send_log = send_log or SendLog()
+
+    def _send(self, msg):
+        """
+        Send one message, retrying transient failures with backoff.
+        Returns: attempts made
+        Raises: SendError once the failure is final or retries run out
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self.bucket.acquire()
+            try:
+                with self.pool.connection() as conn:
+                    conn.send_message(msg)
+                return attempt
+            except Exception as e:
+                if attempt > self.retries or not is_retryable(e):
+                    raise SendError(e, attempt)
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def dispatch(self, results, emails, period, hashes=None):
+        """
+        Email every successful payslip that hasn't been delivered yet.
+        Args:
+            results: Payroll records (with pdf_path)
+            emails: {emp_id: address}
+            period: "YYYY-MM"
+            hashes: {emp_id: payslip content hash}; a changed payslip is sent again
+        Returns: dict with sent, skipped, no_email and failed counts plus errors
+        """
+        hashes = hashes or {}
+        delivered = self.send_log.sent(period)
+        summary = {'sent': 0, 'skipped': 0, 'no_email': 0, 'failed': 0, 'errors': []}
+        lock = threading.Lock()
+
+        def send_one(payroll):
+            emp_id = str(payroll['emp_id'])
+            payslip_hash = hashes.get(emp_id, '')
+            address = emails.get(emp_id)
+            outcome, error, attempts = 'sent', None, 0
+            if (emp_id, payslip_hash) in delivered:
+                outcome = 'skipped'
+            elif not address:
+                outcome = 'no_email'
+            else:
+                try:
+                    attempts = self._send(build_message(self.settings['sender'], address, payroll, payroll['pdf_path']))
+                    self.send_log.record(period, emp_id, payslip_hash, address, 'SENT', attempts)
+                except Exception as e:
+                    outcome, error = 'failed', str(e)
+                    attempts = e.attempts if isinstance(e, SendError) else 0
+                    self.send_log.record(period, emp_id, payslip_hash, address, 'FAILED', attempts, error)
+            with lock:
+                summary[outcome] += 1
+                if error:
+                    summary['errors'].append({'emp_id': emp_id, 'error': error})
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(send_one, [r for r in results if r.get('pdf_path')]))
+        summary['seconds'] = round(time.monotonic() - started, 2)
+        summary['connections'] = self.pool.opened
+        return summary
+
+    def close(self):
+        self.pool.close()
+        self.send_log.close()
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept and count messages"""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.reply('220 payslip-sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO') or command.startswith('HELO'):
+                self.reply('250 payslip-sink')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                for data in iter(self.rfile.readline, b''):
+                    if data in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(data)
+                self.server.count(size)
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.reply('250 OK')
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in that accepts everything and counts messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=1025):
+        super().__init__((host, port), _SinkHandler)
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def count(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def _benchmark(args):
+    """Send synthetic payslips through the pool to a local sink and report throughput"""
+    import tempfile
+
+    sink = SmtpSink(port=args.port).start()
+    workdir = tempfile.mkdtemp(prefix='payslip_bench_')
+    pdf_path = os.path.join(workdir, 'payslip.pdf')
+    with open(pdf_path, 'wb') as f:
+        f.write(b'%PDF-1.3\n' + os.urandom(args.pdf_kb * 1024))
+
+    results = [
+        {'emp_id': f"EMP{i:05d}", 'name': f"Employee {i}", 'month': 'December 2025',
+         'net_pay': 50000.0, 'pdf_path': pdf_path}
+        for i in range(args.messages)
+    ]
+    emails = {r['emp_id']: f"{r['emp_id'].lower()}@company.com" for r in results}
+    settings = {'host': '127.0.0.1', 'port': sink.server_address[1], 'sender': 'payroll@company.com',
+                'ssl': False, 'starttls': False}
+    mailer = PayslipMailer(settings, workers=args.workers, rate=args.rate,
+                           send_log=SendLog(os.path.join(workdir, 'send_log.db')))
+    summary = mailer.dispatch(results, emails, '2025-12')
+    rerun = mailer.dispatch(results, emails, '2025-12')
+    mailer.close()
+    sink.shutdown()
+
+    print(f"📨 Sent {summary['sent']} payslips in {summary['seconds']}s "
+          f"({summary['sent'] / max(summary['seconds'], 1e-6):.0f}/s) over {summary['connections']} connections")
+    print(f"   Sink received {sink.messages} messages ({sink.bytes / 1024 / 1024:.1f} MB)")
+    print(f"   Re-run skipped {rerun['skipped']}, sent {rerun['sent']}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Payslip email tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sink_parser = sub.add_parser('sink', help='Run a local SMTP stand-in')
+    sink_parser.add_argument('--port', type=int, default=1025)
+    bench = sub.add_parser('bench', help='Measure dispatch throughput against a local sink')
+    bench.add_argument('--port', type=int, default=0, help='Sink port (default: any free port)')
+    bench.add_argument('--messages', type=int, default=200)
+    bench.add_argument('--workers', type=int, default=4)
+    bench.add_argument('--rate', type=float, default=100, help='Messages per second')
+    bench.add_argument('--pdf-kb', type=int, default=2, help='Size of the synthetic payslip')
+    args = parser.parse_args()
+
+    if args.command == 'sink':
+        server = SmtpSink(port=args.port)
+        print(f"📭 SMTP sink listening on 127.0.0.1:{args.port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n📬 Received {server.messages} messages", file=sys.stderr)
+    else:
+        _benchmark(args)
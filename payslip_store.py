@@ -0,0 +1,137 @@
+"""
+Content-addressed payslip storage.
+
+PDFs are keyed by a hash of the payslip data plus TEMPLATE_VERSION (FPDF
+stamps a creation date into every file, so hashing the rendered bytes would
+never match). Unchanged payslips are not re-rendered or rewritten.
+
+Layout under the payslip directory:
+
+    objects/ab/<hash>.pdf                  one file per distinct payslip
+    payslip_EMP001_December_2025.pdf       hard link to the object (the name Node serves)
+    manifests/2025-12.jsonl                emp_id -> hash, size, filename (append-only, last line wins)
+    bundles/payslips_2025-12.zip           per-month download bundle (--bundle)
+
+Manifests are appended one line per write, so parallel shard workers can
+share a month safely.
+"""
+import os
+import json
+import shutil
+import hashlib
+import zipfile
+from datetime import datetime
+
+# Bump when the payslip layout changes so every PDF is re-rendered
+TEMPLATE_VERSION = 1
+
+
+def content_hash(record):
+    canonical = json.dumps({'template': TEMPLATE_VERSION, 'record': record}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _link(src, dst):
+    """Point dst at src, replacing whatever is there (copy where hard links aren't supported)"""
+    tmp = f"{dst}.tmp{os.getpid()}"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class PayslipStore:
+    """Stores payslip PDFs by content hash with a per-month manifest"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._manifests = {}
+        for sub in ('objects', 'manifests'):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.pdf")
+
+    def manifest_path(self, period):
+        return os.path.join(self.directory, 'manifests', f"{period}.jsonl")
+
+    def manifest(self, period):
+        """{emp_id: entry} for a month, loaded once and kept in memory"""
+        if period not in self._manifests:
+            entries = {}
+            path = self.manifest_path(period)
+            if os.path.exists(path):
+                with open(path) as f:
+                    for line in f:
+                        if line.strip().endswith('}'):
+                            entry = json.loads(line)
+                            entries[entry['emp_id']] = entry
+            self._manifests[period] = entries
+        return self._manifests[period]
+
+    def lookup(self, emp_id, period):
+        """Manifest entry for an employee's payslip, or None"""
+        return self.manifest(period).get(str(emp_id))
+
+    def _append(self, period, entry):
+        line = (json.dumps(entry, separators=(',', ':')) + '\n').encode()
+        fd = os.open(self.manifest_path(period), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        self.manifest(period)[entry['emp_id']] = entry
+
+    def put(self, emp_id, period, filename, record, render):
+        """
+        Store a payslip, rendering it only if this content isn't stored yet.
+        Args:
+            record: Payslip data; its hash identifies the PDF
+            render: callable(path) that writes the PDF
+        Returns: (flat path served to clients, True if a PDF was rendered)
+        """
+        emp_id = str(emp_id)
+        digest = content_hash(record)
+        flat_path = os.path.join(self.directory, filename)
+        obj_path = self.object_path(digest)
+
+        entry = self.lookup(emp_id, period)
+        if entry and entry['hash'] == digest and entry['filename'] == filename \
+                and os.path.exists(obj_path) and os.path.exists(flat_path):
+            return flat_path, False
+
+        rendered = False
+        if not os.path.exists(obj_path):
+            os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+            tmp = f"{obj_path}.tmp{os.getpid()}"
+            render(tmp)
+            os.replace(tmp, obj_path)
+            rendered = True
+        _link(obj_path, flat_path)
+
+        self._append(period, {
+            'emp_id': emp_id,
+            'hash': digest,
+            'size': os.path.getsize(obj_path),
+            'filename': filename,
+            'path': os.path.relpath(obj_path, self.directory),
+            'updatedAt': datetime.now().isoformat()
+        })
+        return flat_path, rendered
+
+    def bundle(self, period, path=None):
+        """
+        Zip a month's payslips (plus manifest.json) for bulk download.
+        Returns: bundle path
+        """
+        entries = self.manifest(period)
+        path = path or os.path.join(self.directory, 'bundles', f"payslips_{period}.zip")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as bundle:
+            for entry in sorted(entries.values(), key=lambda e: e['emp_id']):
+                bundle.write(os.path.join(self.directory, entry['path']), entry['filename'])
+            bundle.writestr('manifest.json', json.dumps(sorted(entries.values(), key=lambda e: e['emp_id']), indent=2))
+        os.replace(tmp, path)
+        return path
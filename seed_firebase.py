@@ -1,9 +1,40 @@
+import argparse
+import random
 import firebase_admin
 from firebase_admin import credentials, firestore
 from datetime import datetime
 
-def seed_firebase():
-    """Seed Firebase with employee and office config data"""
+from firestore_bulk import commit_batches, FIRESTORE_BATCH_LIMIT
+
+DESIGNATIONS = ['Developer', 'Designer', 'Analyst', 'Tester', 'Manager', 'Support Engineer']
+# Branch offices are spread ~5km apart along the latitude
+BRANCH_SPACING_DEG = 0.045
+
+
+def synthetic_employee(index, rng):
+    """Test employee EMP<index> with a plausible salary structure"""
+    emp_id = f"EMP{index:03d}"
+    basic = rng.randrange(15000, 90000, 500)
+    return {
+        'emp_id': emp_id,
+        'name': f"Employee {index}",
+        'designation': rng.choice(DESIGNATIONS),
+        'email': f"{emp_id.lower()}@company.com",
+        'salary': {
+            'basic': basic,
+            'hra': round(basic * 0.4),
+            'other_allow': rng.randrange(2000, 12000, 500)
+        }
+    }
+
+
+def seed_firebase(employee_count=3, branches=1, batch_size=FIRESTORE_BATCH_LIMIT, workers=8, seed=None):
+    """
+    Seed Firebase with employee and office config data
+    Args:
+        employee_count: Employees to seed; beyond the 3 named ones they are synthetic
+        branches: Office configs to seed (main_office, branch_2, ...)
+    """
     
     # Initialize Firebase
     if not firebase_admin._apps:
@@ -51,10 +82,21 @@ def seed_firebase():
         }
     ]
     
+    rng = random.Random(seed)
+    employees = employees[:employee_count]
+    employees += [synthetic_employee(i, rng) for i in range(len(employees) + 1, employee_count + 1)]
+
     print("📝 Adding employees...")
-    for emp in employees:
-        db.collection('employees').document(emp['emp_id']).set(emp)
-        print(f"   ✓ Added {emp['name']} ({emp['emp_id']})")
+    written = commit_batches(
+        db,
+        (('set', db.collection('employees').document(emp['emp_id']), emp) for emp in employees),
+        batch_size, workers
+    )
+    if written <= 10:
+        for emp in employees:
+            print(f"   ✓ Added {emp['name']} ({emp['emp_id']})")
+    else:
+        print(f"   ✓ Added {written} employees")
     
     # 2. Seed Office Config
     office_config = {
@@ -65,9 +107,14 @@ def seed_firebase():
         'updatedAt': datetime.now().isoformat()
     }
     
+    offices = [('main_office', office_config)] + [
+        (f"branch_{n}", {**office_config, 'lat': office_config['lat'] + (n - 1) * BRANCH_SPACING_DEG})
+        for n in range(2, branches + 1)
+    ]
+
     print("\n🏢 Setting office configuration...")
-    db.collection('office_config').document('main_office').set(office_config)
-    print("   ✓ Office config saved")
+    commit_batches(db, (('set', db.collection('office_config').document(doc_id), config) for doc_id, config in offices), batch_size, workers)
+    print(f"   ✓ Office config saved ({len(offices)} offices)" if len(offices) > 1 else "   ✓ Office config saved")
     
     print("\n✅ Seeding complete!")
     print("\nYou can now:")
@@ -76,4 +123,12 @@ def seed_firebase():
     print("  3. View data at: https://console.firebase.google.com/project/hrhelpdesk-611cb/firestore")
 
 if __name__ == '__main__':
-    seed_firebase()
+    parser = argparse.ArgumentParser(description='Seed Firebase with employees and office config')
+    parser.add_argument('--employees', type=int, default=3, help='Employees to seed (default: the 3 named test employees)')
+    parser.add_argument('--branches', type=int, default=1, help='Office configs to seed')
+    parser.add_argument('--batch-size', type=int, default=FIRESTORE_BATCH_LIMIT, help='Writes per batch (max 500)')
+    parser.add_argument('--workers', type=int, default=8, help='Batches committed in parallel')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible salaries')
+    args = parser.parse_args()
+
+    seed_firebase(args.employees, args.branches, args.batch_size, args.workers, args.seed)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Root scripts are imported as top-level modules, the way payroll_system.py imports them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
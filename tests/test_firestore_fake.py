@@ -0,0 +1,26 @@
+import pytest
+
+from firestore_fake import FakeFirestore
+
+
+def test_set_merge_field_paths_writes_only_listed_paths():
+    db = FakeFirestore().load({'employees': {'EMP001': {
+        'name': 'Asha', 'salary': {'basic': 30000, 'hra': 12000}, 'email': 'asha@company.com'
+    }}})
+    ref = db.collection('employees').document('EMP001')
+
+    ref.set({'name': 'Ignored', 'salary': {'basic': 32000, 'hra': 0}}, merge=['salary.basic'])
+    assert ref.get().to_dict() == {
+        'name': 'Asha', 'salary': {'basic': 32000, 'hra': 12000}, 'email': 'asha@company.com'
+    }
+
+    # A listed map is replaced whole, not deep-merged
+    ref.set({'salary': {'basic': 1}}, merge=['salary'])
+    assert ref.get().to_dict()['salary'] == {'basic': 1}
+
+
+def test_set_merge_field_paths_must_be_in_data():
+    ref = FakeFirestore().collection('employees').document('EMP001')
+    with pytest.raises(ValueError):
+        ref.set({'name': 'Asha'}, merge=['email'])
+    assert not ref.get().exists
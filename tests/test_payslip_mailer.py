@@ -0,0 +1,120 @@
+import socketserver
+import threading
+
+import pytest
+
+from payslip_mailer import PayslipMailer, SendLog
+
+
+class _ScriptedHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server whose replies to a command can be scripted per occurrence"""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 stub ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            verb = command.split(' ')[0]
+            scripted = self.server.next_reply(verb)
+            if scripted == 'DROP':
+                return
+            if verb == 'EHLO':
+                self.reply('250-stub')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif verb == 'DATA' and not scripted:
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                for data in iter(self.rfile.readline, b''):
+                    if data in (b'.\r\n', b'.\n'):
+                        break
+                self.server.delivered += 1
+                self.reply('250 OK queued')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply(scripted or ('235 OK' if verb == 'AUTH' else '250 OK'))
+
+
+class ScriptedSmtp(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, script):
+        """script: {verb: [reply or None (default) or 'DROP' (close the connection), ...]}"""
+        super().__init__(('127.0.0.1', 0), _ScriptedHandler)
+        self.script = {verb: list(replies) for verb, replies in script.items()}
+        self.connections = 0
+        self.delivered = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def next_reply(self, verb):
+        with self._lock:
+            replies = self.script.get(verb)
+            return replies.pop(0) if replies else None
+
+
+@pytest.fixture
+def payslip(tmp_path):
+    pdf_path = tmp_path / 'EMP001.pdf'
+    pdf_path.write_bytes(b'%PDF-1.3\n')
+    return {'emp_id': 'EMP001', 'name': 'Asha', 'month': 'December 2025', 'net_pay': 50000.0,
+            'pdf_path': str(pdf_path)}
+
+
+def dispatch(server, payslip, tmp_path, user=None):
+    settings = {'host': '127.0.0.1', 'port': server.server_address[1], 'sender': 'payroll@company.com',
+                'ssl': False, 'starttls': False, 'user': user, 'password': 'secret'}
+    log = SendLog(str(tmp_path / 'send_log.db'))
+    mailer = PayslipMailer(settings, workers=1, rate=1000, retries=3, backoff=0, send_log=log)
+    try:
+        summary = mailer.dispatch([payslip], {'EMP001': 'asha@company.com'}, '2025-12')
+        attempts = log.conn.execute('SELECT status, attempts FROM sends').fetchone()
+    finally:
+        mailer.close()
+        server.shutdown()
+        server.server_close()
+    return summary, attempts
+
+
+def test_temporary_reply_is_retried(payslip, tmp_path):
+    server = ScriptedSmtp({'DATA': ['451 Try again later']})
+    summary, attempts = dispatch(server, payslip, tmp_path)
+    assert summary['sent'] == 1
+    assert attempts == ('SENT', 2)
+    assert server.delivered == 1
+
+
+def test_dropped_connection_is_retried(payslip, tmp_path):
+    server = ScriptedSmtp({'MAIL': ['DROP']})
+    summary, attempts = dispatch(server, payslip, tmp_path)
+    assert summary['sent'] == 1
+    assert attempts == ('SENT', 2)
+    assert server.connections == 2
+
+
+@pytest.mark.parametrize('script, user', [
+    ({'RCPT': ['550 No such user']}, None),
+    ({'MAIL': ['553 Sender refused']}, None),
+    ({'DATA': ['554 Message rejected']}, None),
+    ({'AUTH': ['535 Authentication failed'] * 2}, 'payroll')  # smtplib tries PLAIN, then LOGIN
+])
+def test_permanent_failure_is_not_retried(payslip, tmp_path, script, user):
+    server = ScriptedSmtp(script)
+    summary, attempts = dispatch(server, payslip, tmp_path, user)
+    assert summary['failed'] == 1
+    assert attempts == ('FAILED', 1)
+    assert server.delivered == 0
+
+
+def test_retries_stop_with_the_real_attempt_count(payslip, tmp_path):
+    server = ScriptedSmtp({'DATA': ['451 Busy'] * 10})
+    summary, attempts = dispatch(server, payslip, tmp_path)
+    assert summary['failed'] == 1
+    assert attempts == ('FAILED', 4)